@@ -0,0 +1,83 @@
+import argparse
+import os
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from bronze import synthetic_bronze
+from common.sql_backend import ENGINES, Backend, parity_snapshot, run_transforms
+
+# =====================================================
+# SQL BACKEND BENCHMARK (MYSQL vs DUCKDB vs SQLITE)
+# =====================================================
+# Runs the bronze -> silver -> gold SQL on each engine against the same
+# bronze CSV, prints per-layer timings and checks that every engine ends up
+# with the same silver/gold aggregates. MySQL writes to
+# DataWarehouse_*_bench schemas so the real warehouse is left alone.
+
+def same_value(a, b, rel=1e-6):
+    if a is None or b is None:
+        return a is b
+    return abs(a - b) <= rel * max(abs(a), abs(b), 1.0)
+
+def run(engines, rows, csv_path, seed, keep_dir):
+    if csv_path is None:
+        csv_path = synthetic_bronze.cached(rows, seed)
+
+    results, parity = {}, {}
+    for engine in engines:
+        path = None
+        if keep_dir and engine != "mysql":
+            path = os.path.join(keep_dir, f"warehouse.{engine}")
+            if os.path.exists(path):
+                os.remove(path)
+        try:
+            backend = Backend(engine, path=path, schema_suffix="_bench")
+        except Exception as e:
+            print(f"[{engine}] unavailable: {e!r}")
+            continue
+        try:
+            results[engine] = run_transforms(backend, csv_path)
+            parity[engine] = parity_snapshot(backend)
+        finally:
+            backend.close()
+
+    print()
+    print(f"{'engine':<8} {'bronze':>9} {'silver':>9} {'gold':>9} {'frontier':>9} {'sketches':>9} "
+          f"{'views':>9} {'total':>9}")
+    for engine, t in results.items():
+        print(f"{engine:<8} {t['bronze']:>8.2f}s {t['silver']:>8.2f}s {t['gold']:>8.2f}s "
+              f"{t['frontier']:>8.2f}s {t['sketches']:>8.2f}s {t['views']:>8.2f}s {sum(t.values()):>8.2f}s")
+    for layer in ("bronze", "silver", "gold", "views"):
+        if results:
+            best = min(results, key=lambda e: results[e][layer])
+            print(f"fastest {layer:<7}: {best}")
+
+    # Same input, same SQL: beyond float rounding of sums, any difference
+    # is a dialect translation bug
+    ok = True
+    engines_run = list(parity)
+    for engine in engines_run[1:]:
+        for table, snapshot in parity[engine].items():
+            reference = parity[engines_run[0]][table]
+            if not all(same_value(a, b) for a, b in zip(snapshot, reference)):
+                ok = False
+                print(f"PARITY MISMATCH {table}: {engines_run[0]}={reference} {engine}={snapshot}")
+    if len(engines_run) > 1 and ok:
+        print(f"Parity OK across {', '.join(engines_run)}")
+    return ok
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the ETL SQL on MySQL, DuckDB and SQLite")
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=list(ENGINES))
+    parser.add_argument("--rows", type=int, default=1_000_000,
+                        help="synthetic bronze rows (ignored with --csv)")
+    parser.add_argument("--csv", help="use an existing bronze CSV, e.g. bronze/scrapedData.csv")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep", metavar="DIR",
+                        help="write the embedded databases to DIR instead of memory")
+    args = parser.parse_args()
+
+    sys.exit(0 if run(args.engines, args.rows, args.csv, args.seed, args.keep) else 1)
@@ -0,0 +1,153 @@
+import argparse
+import json
+import math
+import os
+import sys
+from datetime import datetime
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from bronze import synthetic_bronze
+from common.sql_backend import ENGINES, Backend, run_transforms
+
+# =====================================================
+# END-TO-END SCALING BENCHMARK
+# =====================================================
+# Runs bronze load -> silver -> gold -> views on synthetic bronze CSVs of
+# growing size (see bronze/synthetic_bronze.py) and reports, per layer:
+#   - seconds and rows/sec at every size
+#   - the scaling exponent between consecutive sizes: 1.0 is linear,
+#     2.0 means 10x the rows take 100x as long
+#
+# Regression gates (exit code 1 when one fails):
+#   --baseline FILE --max-regression 0.25   no layer more than 25% slower
+#                                           than the saved baseline
+#   --max-exponent 1.3                      no layer growing faster than
+#                                           n^1.3 between sizes
+# Save a baseline with --save FILE. MySQL runs write to the
+# DataWarehouse_*_bench schemas, never to the real warehouse.
+
+LAYERS = ("bronze", "silver", "gold", "frontier", "sketches", "views")
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+# Timings below this are mostly noise and never fail a gate
+NOISE_SECONDS = 0.5
+
+def run_size(engine, rows, seed, log):
+    csv_path = synthetic_bronze.cached(rows, seed)
+    backend = Backend(engine, schema_suffix="_bench")
+    try:
+        timings = run_transforms(backend, csv_path, log=log)
+        specs = backend.scalar("SELECT COUNT(*) FROM DataWarehouse_silver.silver_specs;")
+    finally:
+        backend.close()
+    return {"seconds": {k: round(v, 4) for k, v in timings.items()}, "silver_rows": specs}
+
+def exponent(n1, t1, n2, t2):
+    if t1 < NOISE_SECONDS / 10 or t2 <= 0:
+        return None
+    return math.log(t2 / t1) / math.log(n2 / n1)
+
+def report(results):
+    sizes = sorted(results)
+    print()
+    print(f"{'rows':>11} " + " ".join(f"{layer:>9}" for layer in LAYERS) + f" {'total':>9} {'rows/s':>10}")
+    for n in sizes:
+        t = results[n]["seconds"]
+        total = sum(t.values())
+        print(f"{n:>11,} " + " ".join(f"{t[layer]:>8.2f}s" for layer in LAYERS)
+              + f" {total:>8.2f}s {n / total:>10,.0f}")
+
+    if len(sizes) > 1:
+        print()
+        print("scaling exponent (1.0 = linear)")
+        for a, b in zip(sizes, sizes[1:]):
+            cells = []
+            for layer in LAYERS:
+                k = exponent(a, results[a]["seconds"][layer], b, results[b]["seconds"][layer])
+                cells.append(f"{k:>9.2f}" if k is not None else f"{'n/a':>9}")
+            print(f"{a:>,} -> {b:>,}".rjust(23) + " " + " ".join(cells))
+
+def check_baseline(results, baseline, max_regression):
+    failures = []
+    for n, result in results.items():
+        base = baseline["results"].get(str(n))
+        if not base:
+            continue
+        for layer in LAYERS:
+            now, before = result["seconds"][layer], base["seconds"].get(layer)
+            if before is None or now < NOISE_SECONDS:
+                continue
+            if now > before * (1 + max_regression):
+                failures.append(f"{layer} at {n:,} rows: {now:.2f}s vs baseline {before:.2f}s "
+                                f"(+{(now / before - 1) * 100:.0f}%, limit +{max_regression * 100:.0f}%)")
+    return failures
+
+def check_exponent(results, max_exponent):
+    failures = []
+    sizes = sorted(results)
+    for a, b in zip(sizes, sizes[1:]):
+        for layer in LAYERS:
+            ta, tb = results[a]["seconds"][layer], results[b]["seconds"][layer]
+            k = exponent(a, ta, b, tb)
+            if k is not None and tb >= NOISE_SECONDS and k > max_exponent:
+                failures.append(f"{layer} {a:,} -> {b:,} rows grows as n^{k:.2f} (limit n^{max_exponent})")
+    return failures
+
+def run(engine, sizes, seed, baseline_path=None, max_regression=0.25, max_exponent=None,
+        save_path=None, quiet=False):
+    log = (lambda msg: None) if quiet else print
+    results = {}
+    for n in sorted(sizes):
+        results[n] = run_size(engine, n, seed, log)
+    report(results)
+
+    if save_path:
+        with open(save_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "engine": engine,
+                "seed": seed,
+                "measured_at": datetime.now().isoformat(timespec="seconds"),
+                "results": {str(n): r for n, r in results.items()},
+            }, f, indent=2)
+        print(f"\nSaved results to {save_path}")
+
+    failures = []
+    if baseline_path:
+        with open(baseline_path, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("engine") != engine:
+            print(f"\nWARNING: baseline was measured on {baseline.get('engine')}, this run on {engine}")
+        failures += check_baseline(results, baseline, max_regression)
+    if max_exponent is not None:
+        failures += check_exponent(results, max_exponent)
+
+    if failures:
+        print("\nREGRESSIONS:")
+        for f in failures:
+            print(f"  - {f}")
+        return False
+    if baseline_path or max_exponent is not None:
+        print("\nNo regressions.")
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End-to-end scaling benchmark on synthetic bronze data")
+    parser.add_argument("--engine", choices=ENGINES, default="mysql")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help=f"bronze row counts (default {DEFAULT_SIZES}; add 10000000 for 10M)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--save", metavar="FILE", help="write the results as a baseline JSON")
+    parser.add_argument("--baseline", metavar="FILE", help="compare against a saved baseline")
+    parser.add_argument("--max-regression", type=float, default=0.25,
+                        help="allowed slowdown vs the baseline per layer and size (default 0.25 = 25%%)")
+    parser.add_argument("--max-exponent", type=float,
+                        help="fail when a layer scales worse than n^X between sizes")
+    parser.add_argument("--quiet", action="store_true", help="only print the summary")
+    args = parser.parse_args()
+
+    ok = run(args.engine, args.sizes, args.seed, args.baseline, args.max_regression,
+             args.max_exponent, args.save, args.quiet)
+    sys.exit(0 if ok else 1)
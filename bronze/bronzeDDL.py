@@ -1,44 +1,23 @@
-import mysql.connector
 import os
-from datetime import datetime
+import sys
 
-# ========= LOGGING SETUP =========
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, ".."))
-LOG_DIR = os.path.join(PROJECT_ROOT, "logs")
-
-os.makedirs(LOG_DIR, exist_ok=True)
-
-log_file = os.path.join(LOG_DIR, f"bronzeDDL_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log")
-
-def log(msg):
-    ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    line = f"[{ts}] {msg}"
-    print(line)
-    with open(log_file, "a") as f:
-        f.write(line + "\n")
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
 
-# ========= MYSQL CONNECTION =========
-conn = mysql.connector.connect(
-    host="localhost",
-    user="EV_specs",
-    password="MDIS@2025"
-)
-cursor = conn.cursor()
+from common import db, metrics, pipeline_log
+from common.context import get_context
 
-log("Starting Bronze DDL...")
+HEAVY_IMPORTS = ("mysql.connector",)
 
-# ========= CREATE DB =========
-cursor.execute("CREATE DATABASE IF NOT EXISTS DataWarehouse_bronze;")
-log("Database DataWarehouse_bronze ensured.")
-
-cursor.execute("USE DataWarehouse_bronze;")
+# ========= LOGGING SETUP =========
+logger = pipeline_log.get_logger("bronze_ddl")
 
-# ========= DROP OLD TABLE =========
-cursor.execute("DROP TABLE IF EXISTS ev_specs_bronze;")
-log("Dropped old ev_specs_bronze table.")
+def log(msg, level=pipeline_log.INFO):
+    logger.log(level, msg)
 
-# ========= CREATE NEW TABLE (UPDATED WITH price_raw) =========
+# ========= TABLE DEFINITION (UPDATED WITH price_raw, market) =========
 create_sql = """
 CREATE TABLE ev_specs_bronze (
     id INT AUTO_INCREMENT PRIMARY KEY,
@@ -57,14 +36,59 @@ CREATE TABLE ev_specs_bronze (
     rapidcharge VARCHAR(50),
     towing VARCHAR(50),
     boot_space VARCHAR(50),
-    price_range VARCHAR(50)
+    price_range VARCHAR(50),
+    market VARCHAR(8) NOT NULL DEFAULT 'uk',
+    shard INT,
+    INDEX idx_bronze_shard (shard)
+);
+"""
+
+# ========= SHARD LOAD STATE =========
+# One row per bronze shard loaded by bronze_load.py (see
+# common/bronze_shards.py); a shard whose digest still matches is skipped
+shard_state_sql = """
+CREATE TABLE bronze_shard_state (
+    shard INT PRIMARY KEY,
+    shards INT NOT NULL,
+    digest CHAR(64) NOT NULL,
+    row_count INT NOT NULL,
+    run_id VARCHAR(32),
+    loaded_at DATETIME NOT NULL
 );
 """
 
-cursor.execute(create_sql)
-conn.commit()
+# ========= STAGE ENTRY POINT =========
+def run(ctx=None):
+    ctx = get_context(ctx)
+    pipeline_log.configure(ctx, "bronze_ddl", "bronzeDDL")
+
+    # ========= MYSQL CONNECTION =========
+    conn = db.connect()
+    cursor = conn.cursor()
+
+    log("Starting Bronze DDL...")
+
+    # ========= CREATE DB =========
+    cursor.execute("CREATE DATABASE IF NOT EXISTS DataWarehouse_bronze;")
+    log("Database DataWarehouse_bronze ensured.")
+
+    cursor.execute("USE DataWarehouse_bronze;")
+
+    # ========= DROP OLD TABLE =========
+    # The shard state describes the table's rows, so it goes with it
+    cursor.execute("DROP TABLE IF EXISTS ev_specs_bronze;")
+    cursor.execute("DROP TABLE IF EXISTS bronze_shard_state;")
+    log("Dropped old ev_specs_bronze and bronze_shard_state tables.")
+
+    # ========= CREATE NEW TABLES =========
+    cursor.execute(create_sql)
+    cursor.execute(shard_state_sql)
+    conn.commit()
+
+    log("Bronze tables created successfully")
+    cursor.close()
 
-log("Bronze table created successfully")
-cursor.close()
+    conn.close()
 
-conn.close()
+if __name__ == "__main__":
+    metrics.run_stage(get_context(), logger.stage, run)
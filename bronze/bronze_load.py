@@ -1,59 +1,60 @@
-import mysql.connector
-import pandas as pd
+import hashlib
 import os
-from datetime import datetime
+import sys
+import time
 import traceback
 
-# ========= LOGGING =========
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, ".."))
-LOG_DIR = os.path.join(PROJECT_ROOT, "logs")
-os.makedirs(LOG_DIR, exist_ok=True)
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from common import bronze_shards, db, markets, metrics, pipeline_log, slow_query
+from common.context import get_context
+
+HEAVY_IMPORTS = ("mysql.connector", "pandas")
 
-log_path = os.path.join(LOG_DIR, f"bronze_load_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log")
+# ========= LOGGING =========
+logger = pipeline_log.get_logger("bronze_load")
 
-def log(msg):
-    ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    line = f"[{ts}] {msg}"
-    print(line)
-    with open(log_path, "a") as f:
-        f.write(line + "\n")
+def log(msg, level=pipeline_log.INFO):
+    logger.log(level, msg)
 
 # ========= SAFE EXECUTION HELPERS =========
 def safe_execute(cursor, sql, params=None, step="UNKNOWN"):
+    status = slow_query.before(logger.stage, cursor)
+    start = time.perf_counter()
     try:
         if params is None:
             cursor.execute(sql)
         else:
             cursor.execute(sql, params)
     except Exception as e:
-        log(f" ERROR during {step}: {e}")
+        log(f" ERROR during {step}: {e}", pipeline_log.ERROR)
         traceback.print_exc()
         raise
+    elapsed = time.perf_counter() - start
+    metrics.record_sql(logger.stage, step, elapsed, cursor.rowcount)
+    slow_query.after(logger.stage, step, cursor, sql, params, elapsed, status)
 
 def safe_executemany(cursor, sql, rows, step="UNKNOWN"):
+    status = slow_query.before(logger.stage, cursor)
+    start = time.perf_counter()
     try:
         cursor.executemany(sql, rows)
     except Exception as e:
-        log(f" ERROR during {step}: {e}")
+        log(f" ERROR during {step}: {e}", pipeline_log.ERROR)
         traceback.print_exc()
         raise
+    elapsed = time.perf_counter() - start
+    metrics.record_sql(logger.stage, step, elapsed, cursor.rowcount)
+    # A batch of single-row INSERTs has no plan worth explaining
+    slow_query.after(logger.stage, step, cursor, sql, None, elapsed, status, plan=False)
 
-# ========= CSV PATH =========
-CSV_PATH = os.path.join(PROJECT_ROOT, "bronze", "scrapedData.csv")
-
-log("=========== BRONZE LOAD START ===========")
-log(f"CSV path: {CSV_PATH}")
-
-# ========= LOAD CSV =========
-try:
-    df = pd.read_csv(CSV_PATH)
-    log(f"Loaded CSV with {len(df)} rows.")
-except Exception as e:
-    log(" FAILED TO LOAD CSV")
-    log(str(e))
-    traceback.print_exc()
-    raise SystemExit("Failed to load scrapedData.csv")
+# ========= CSV PARTITIONS =========
+# One CSV per market (see common/markets.py); bronze/scrapedData.csv is uk.
+# Each partition is also cut into shards by company (common/bronze_shards.py),
+# and the shards are what is loaded here.
 
 # ========= EXPECTED COLUMNS =========
 required_cols = [
@@ -65,57 +66,204 @@ required_cols = [
     "boot_space", "price_range"
 ]
 
-missing = [c for c in required_cols if c not in df.columns]
-if missing:
-    log(" MISSING REQUIRED COLUMNS:")
-    for col in missing:
-        log(f" - {col}")
-    raise SystemExit("CSV does not match expected schema.")
-
-# ========= CLEAN DATA =========
-df = df[required_cols]
-
-def clean_val(x):
-    if pd.isna(x): return None
-    x = str(x).strip()
-    return None if x == "" else x
-
-df = df.applymap(clean_val)
-
-# ========= MYSQL LOAD =========
-conn = mysql.connector.connect(
-    host="localhost",
-    user="EV_specs",
-    password="MDIS@2025"
-)
-cursor = conn.cursor()
-
-safe_execute(cursor, "USE DataWarehouse_bronze;", step="USE Bronze DB")
-safe_execute(cursor, "TRUNCATE TABLE ev_specs_bronze;", step="TRUNCATE Bronze table")
-
 insert_sql = """
 INSERT INTO ev_specs_bronze (
     company, model, drivetrain, class, seat,
     price_raw, range_raw, efficiency, weight,
     zero_to_sixty, one_stop_range, battery,
-    rapidcharge, towing, boot_space, price_range
+    rapidcharge, towing, boot_space, price_range,
+    market, shard
 )
 VALUES (
     %s, %s, %s, %s, %s,
     %s, %s, %s, %s,
     %s, %s, %s,
-    %s, %s, %s, %s
+    %s, %s, %s, %s,
+    %s, %s
 );
 """
 
-safe_executemany(cursor, insert_sql, df.values.tolist(), step="INSERT rows")
+mark_loaded_sql = """
+REPLACE INTO bronze_shard_state (shard, shards, digest, row_count, run_id, loaded_at)
+VALUES (%s, %s, %s, %s, %s, NOW());
+"""
+
+# ========= PARALLEL SHARD LOAD =========
+# Shard k of every selected market is loaded as one unit, on its own pooled
+# connection and in one transaction: its old rows are deleted, its CSVs
+# inserted in market order, and the shard is marked loaded with a digest
+# of those CSVs. Shards already loaded with the same digest are skipped,
+# so a failed shard is retried on its own by simply re-running the stage.
+#
+# A company always falls into one shard, and its rows are inserted by one
+# connection in partition order, so bronze ids keep the relative order of
+# a serial load wherever silver depends on it (per company, see
+# silver_dedupe.SELECT_BRONZE_SQL).
+#
+# EV_BRONZE_WORKERS=N (default 4) bounds the concurrent shards; one pooled
+# connection is always left for the stage itself.
+
+WORKERS_ENV = "EV_BRONZE_WORKERS"
+DEFAULT_WORKERS = 4
+
+# Shards that failed in the parallel pass are tried once more, one by one
+SHARD_RETRIES = 1
+
+def bronze_workers():
+    try:
+        return max(1, int(os.environ.get(WORKERS_ENV, DEFAULT_WORKERS)))
+    except ValueError:
+        return DEFAULT_WORKERS
+
+def clean_val(x):
+    x = x.strip()
+    return None if x == "" else x
+
+def shard_digest(shards, parts):
+    # parts: [(market, file, sha256)] in market order
+    h = hashlib.sha256(str(shards).encode("utf-8"))
+    for market, _, sha in parts:
+        h.update(f"|{market}:{sha}".encode("utf-8"))
+    return h.hexdigest()
+
+def load_shard(shard, shards, parts, digest, run_id):
+    # Returns the number of rows inserted
+    conn = db.connect()
+    try:
+        if db.bulk_enabled():
+            db.apply_bulk_session(conn)
+        cursor = conn.cursor()
+        # Shards never touch each other's rows; READ COMMITTED keeps
+        # InnoDB from gap-locking the shard index between them
+        safe_execute(cursor, "SET SESSION TRANSACTION ISOLATION LEVEL READ COMMITTED;",
+                     step="SET isolation")
+        safe_execute(cursor, "USE DataWarehouse_bronze;", step="USE Bronze DB")
+        safe_execute(cursor, "DELETE FROM ev_specs_bronze WHERE shard = %s;", (shard,),
+                     step=f"DELETE shard {shard}")
+
+        rows = 0
+        for market, file, _ in parts:
+            df = bronze_shards.read_partition(os.path.join(bronze_shards.SHARD_DIR, file))
+            if df.empty:
+                continue
+            # Partitions scraped before markets existed have no market column
+            values = [[clean_val(x) for x in row] + [market, shard]
+                      for row in df[required_cols].itertuples(index=False)]
+            safe_executemany(cursor, insert_sql, values, step=f"INSERT shard {shard} ({market})")
+            rows += len(values)
+
+        safe_execute(cursor, mark_loaded_sql, (shard, shards, digest, rows, run_id),
+                     step=f"MARK shard {shard}")
+        conn.commit()
+        cursor.close()
+        return rows
+    finally:
+        # An uncommitted shard is rolled back when the pool resets the
+        # connection
+        conn.close()
+
+# ========= STAGE ENTRY POINT =========
+def run(ctx=None):
+    from concurrent.futures import ThreadPoolExecutor
+
+    ctx = get_context(ctx)
+    pipeline_log.configure(ctx, "bronze_load", "bronze_load")
+
+    log("=========== BRONZE LOAD START ===========")
+
+    # ========= SHARD MANIFESTS =========
+    shards = bronze_shards.shard_count()
+    selected = markets.selected_markets()
+    manifests = {}
+    for market in selected:
+        csv_path = markets.csv_path(market)
+        log(f"[{market}] CSV path: {csv_path}")
+        try:
+            manifests[market] = bronze_shards.ensure_shards(market, shards)
+        except Exception as e:
+            log(f" FAILED TO LOAD CSV for market {market}", pipeline_log.ERROR)
+            log(str(e), pipeline_log.ERROR)
+            traceback.print_exc()
+            raise SystemExit(f"Failed to load {os.path.basename(csv_path)}")
+
+        missing = [c for c in required_cols if c not in manifests[market]["columns"]]
+        if missing:
+            log(" MISSING REQUIRED COLUMNS:", pipeline_log.ERROR)
+            for col in missing:
+                log(f" - {col}", pipeline_log.ERROR)
+            raise SystemExit("CSV does not match expected schema.")
+
+        rows = sum(p["rows"] for p in manifests[market]["parts"])
+        log(f"[{market}] {rows} rows in {shards} shards.")
+
+    parts = {shard: [] for shard in range(shards)}
+    for market in selected:
+        for part in manifests[market]["parts"]:
+            parts[part["shard"]].append((market, part["file"], part["sha256"]))
+    digests = {shard: shard_digest(shards, p) for shard, p in parts.items()}
+
+    # ========= MYSQL LOAD =========
+    conn = db.connect()
+    cursor = conn.cursor()
+
+    safe_execute(cursor, "USE DataWarehouse_bronze;", step="USE Bronze DB")
+
+    # Rows of shards outside the current shard count (the count changed,
+    # or they predate sharding)
+    safe_execute(cursor, "DELETE FROM ev_specs_bronze WHERE shard IS NULL OR shard >= %s;",
+                 (shards,), step="DELETE stale shards")
+    safe_execute(cursor, "DELETE FROM bronze_shard_state WHERE shard >= %s;", (shards,),
+                 step="DELETE stale shard state")
+    conn.commit()
+
+    safe_execute(cursor, "SELECT shard, shards, digest FROM bronze_shard_state;",
+                 step="SELECT shard state")
+    loaded = {shard: (count, digest) for shard, count, digest in cursor.fetchall()}
+    pending = [s for s in range(shards) if loaded.get(s) != (shards, digests[s])]
+    log(f"{shards - len(pending)} of {shards} shards already loaded; loading {len(pending)}.")
+
+    workers = max(1, min(bronze_workers(), int(db.load_config()["pool_size"]) - 1))
+    inserted, failed = 0, []
+
+    def load(shard):
+        return load_shard(shard, shards, parts[shard], digests[shard], ctx.run_id)
+
+    if pending:
+        log(f"Loading with {min(workers, len(pending))} worker(s).")
+        with ThreadPoolExecutor(max_workers=min(workers, len(pending))) as pool:
+            futures = {shard: pool.submit(load, shard) for shard in pending}
+            for shard, future in futures.items():
+                try:
+                    rows = future.result()
+                    inserted += rows
+                    log(f"[shard {shard}] {rows} rows inserted.")
+                except Exception as e:
+                    failed.append(shard)
+                    log(f"[shard {shard}] load failed: {e}", pipeline_log.WARNING)
 
-conn.commit()
+    for attempt in range(SHARD_RETRIES):
+        retry, failed = failed, []
+        for shard in retry:
+            log(f"[shard {shard}] retrying ({attempt + 1}/{SHARD_RETRIES})...")
+            try:
+                rows = load(shard)
+                inserted += rows
+                log(f"[shard {shard}] {rows} rows inserted.")
+            except Exception as e:
+                failed.append(shard)
+                log(f"[shard {shard}] load failed: {e}", pipeline_log.ERROR)
+                traceback.print_exc()
 
-log(f" Bronze load complete. {cursor.rowcount} rows inserted.")
+    cursor.close()
+    conn.close()
 
-cursor.close()
-conn.close()
+    if failed:
+        raise SystemExit(f"Bronze shards failed to load: {', '.join(map(str, failed))} "
+                         "(re-run the stage to retry only these)")
 
-log("=========== BRONZE LOAD FINISHED ===========")
+    log(f" Bronze load complete. {inserted} rows inserted.")
+    log("=========== BRONZE LOAD FINISHED ===========")
+    return inserted
 
+if __name__ == "__main__":
+    metrics.run_stage(get_context(), logger.stage, run)
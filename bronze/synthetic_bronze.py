@@ -0,0 +1,194 @@
+import argparse
+import csv
+import os
+import random
+import sys
+import time
+from collections import deque
+from itertools import accumulate
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from bronze.bronze_load import required_cols
+
+# =====================================================
+# SYNTHETIC BRONZE CSV GENERATOR
+# =====================================================
+# Writes bronze CSVs of any size in exactly the format web_scrape.py
+# produces ("£44,990", "1,822 kg", "219 Wh/mi", ...), for load testing
+# beyond the ~850 rows a real scrape returns. Mixes and rates below were
+# measured on bronze/scrapedData.csv:
+#   - drivetrain, class and seat mixes
+#   - 'unknown' towing / boot space and '- /mi' price per mile
+#   - prices flagged with '*' (estimated)
+#   - about 16% of rows repeat a model name with different specs and
+#     price (model-year and battery variants), at most 4 times per name
+#
+# Model names are drawn from a bounded vocabulary (base name, number, one
+# or two trim words, sometimes a model year), so names recur by chance as
+# they do in a real catalogue, and a share of the repeats is spelt with one
+# typo in one word ("Perfromance"). That keeps silver's exact-key and
+# fuzzy-name merges (silver/silver_dedupe.py) busy at every size.
+#
+# python -m bronze.synthetic_bronze --rows 1000000 --out /tmp/bronze_1m.csv
+
+COMPANIES = [
+    "Tesla", "BMW", "Mercedes-Benz", "Audi", "Volkswagen", "Hyundai", "Kia",
+    "Polestar", "Volvo", "Renault", "Peugeot", "Nissan", "MG", "BYD", "Skoda",
+    "CUPRA", "Ford", "Porsche", "Lotus", "Fiat", "Smart", "Genesis", "Lucid",
+    "Citroën", "Mini", "Toyota", "Xpeng", "Zeekr", "DS Automobiles", "Jaguar",
+]
+BASE_NAMES = ["e-", "EV", "Born ", "ID.", "Model ", "iX", "EQ", "Q", "Ioniq ", "Niro ",
+              "Enyaq ", "Ariya ", "Seal ", "Atto ", "Zoe ", "Taycan ", "Eletre ", "Cooper "]
+MODEL_NUMBERS = [str(n) for n in range(1, 10)] + ["40", "50", "60", "80", "90", "100", "250", "350", "450"]
+TRIMS = ["Standard Range", "Long Range", "Performance", "Pro", "Max", "Twin Motor",
+         "AWD", "RWD", "GT", "Comfort", "Plus", "Sport", "Edition", "Launch",
+         "Premium", "Exclusive", "Business", "Extended Range"]
+MODEL_YEARS = ["(MY21)", "(MY22)", "(MY23)", "(MY24)", "(MY25)", "(MY22-23)", "(MY24-25)"]
+SECOND_TRIM_RATE = 0.35
+MODEL_YEAR_RATE = 0.3
+
+def mix(values, weights):
+    # (values, cumulative weights): rng.choices skips re-summing the
+    # weights on every call
+    return values, list(accumulate(weights))
+
+DRIVETRAINS = mix(["All Wheel Drive", "Front Wheel Drive", "Rear Wheel Drive"], [0.407, 0.304, 0.289])
+CLASSES = mix(["C", "D", "F", "B", "E", "N", "A", "S"], [0.301, 0.184, 0.168, 0.142, 0.099, 0.073, 0.032, 0.002])
+SEATS = mix([5, 4, 7, 9, 2, 8, 6], [0.812, 0.069, 0.068, 0.033, 0.011, 0.005, 0.004])
+
+UNKNOWN_TOWING_RATE = 0.061
+UNKNOWN_BOOT_RATE = 0.023
+UNKNOWN_PRICE_PER_MILE_RATE = 0.023
+ESTIMATED_PRICE_RATE = 0.015
+DUPLICATE_RATE = 0.157
+MAX_COPIES = 4
+# Share of repeated names written with one typo
+TYPO_RATE = 0.05
+# Only words this long get a typo, as silver_dedupe.TYPO_MIN_LENGTH only
+# compares those
+TYPO_MIN_LENGTH = 4
+# Duplicates are drawn from the most recent models only, so memory stays
+# flat even for 10M rows
+RECENT_MODELS = 2_000
+
+SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+
+def model_name(rng):
+    trims = rng.sample(TRIMS, 2 if rng.random() < SECOND_TRIM_RATE else 1)
+    name = f"{rng.choice(BASE_NAMES)}{rng.choice(MODEL_NUMBERS)} {' '.join(trims)}"
+    if rng.random() < MODEL_YEAR_RATE:
+        name += " " + rng.choice(MODEL_YEARS)
+    return name
+
+def misspell(rng, name):
+    # One swap, drop, doubling or substitution inside one long word; the
+    # name is returned unchanged when it has no such word
+    words = name.split(" ")
+    candidates = [i for i, w in enumerate(words) if w.isalpha() and len(w) >= TYPO_MIN_LENGTH]
+    if not candidates:
+        return name
+    i = rng.choice(candidates)
+    word = words[i]
+    # Never the first letter, so the word still reads as the same word
+    pos = rng.randrange(1, len(word) - 1)
+    kind = rng.randrange(4)
+    if kind == 0:
+        word = word[:pos] + word[pos + 1] + word[pos] + word[pos + 2:]
+    elif kind == 1:
+        word = word[:pos] + word[pos + 1:]
+    elif kind == 2:
+        word = word[:pos] + word[pos] + word[pos:]
+    else:
+        word = word[:pos] + rng.choice("aeiourstn".replace(word[pos].lower(), "")) + word[pos + 1:]
+    words[i] = word
+    return " ".join(words)
+
+def vehicle(rng):
+    company = rng.choice(COMPANIES)
+    model = model_name(rng)
+    return [
+        company,
+        model,
+        rng.choices(DRIVETRAINS[0], cum_weights=DRIVETRAINS[1])[0],
+        rng.choices(CLASSES[0], cum_weights=CLASSES[1])[0],
+        rng.choices(SEATS[0], cum_weights=SEATS[1])[0],
+    ]
+
+def specs(rng):
+    price = int(rng.lognormvariate(10.8, 0.4) // 5 * 5)
+    range_miles = max(50, int(60 + price / 500 + rng.gauss(0, 45)))
+    efficiency = rng.randint(180, 460)
+    battery = range_miles * efficiency / 1000
+    towing = "unknown" if rng.random() < UNKNOWN_TOWING_RATE \
+        else f"{rng.choice([0, 0, 500, 750, 1000, 1200, 1500, 1800, 2500]):,} kg"
+    boot = "unknown" if rng.random() < UNKNOWN_BOOT_RATE else f"{rng.randint(150, 1100):,} L"
+    per_mile = "- /mi" if rng.random() < UNKNOWN_PRICE_PER_MILE_RATE else f"£{price // range_miles} /mi"
+    return [
+        f"£{price:,}" + (" *" if rng.random() < ESTIMATED_PRICE_RATE else ""),
+        f"{range_miles} mi",
+        f"{efficiency} Wh/mi",
+        f"{rng.randint(1_100, 3_200):,} kg",
+        f"{rng.uniform(2.1, 16.0):.1f} sec",
+        f"{int(range_miles * rng.uniform(1.05, 1.3))} mi",
+        f"{battery:.1f} kWh",
+        f"{rng.randint(30, 320)} kW",
+        towing,
+        boot,
+        per_mile,
+    ]
+
+def generate(path, rows, seed=42):
+    rng = random.Random(seed)
+    # [vehicle columns, times used] of recent models, for duplicate names
+    recent = deque(maxlen=RECENT_MODELS)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(required_cols)
+        for _ in range(rows):
+            entry = None
+            if recent and rng.random() < DUPLICATE_RATE:
+                entry = recent[rng.randrange(len(recent))]
+                if entry[1] >= MAX_COPIES:
+                    entry = None
+            if entry is None:
+                entry = [vehicle(rng), 0]
+                recent.append(entry)
+                columns = entry[0]
+            elif rng.random() < TYPO_RATE:
+                columns = list(entry[0])
+                columns[1] = misspell(rng, columns[1])
+            else:
+                columns = entry[0]
+            entry[1] += 1
+            writer.writerow(columns + specs(rng))
+    return path
+
+def cached(rows, seed=42, directory=None):
+    # Generating 10M rows takes a while; reuse the file across runs
+    import tempfile
+
+    path = os.path.join(directory or tempfile.gettempdir(), f"synthetic_bronze_{rows}_{seed}.csv")
+    if not os.path.exists(path):
+        start = time.perf_counter()
+        generate(path + ".tmp", rows, seed)
+        os.replace(path + ".tmp", path)
+        print(f"Generated {rows:,} synthetic bronze rows in {time.perf_counter() - start:.1f}s -> {path}")
+    return path
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic bronze CSV")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="output CSV (default: cached file in the temp directory)")
+    args = parser.parse_args()
+
+    if args.out:
+        start = time.perf_counter()
+        generate(args.out, args.rows, args.seed)
+        print(f"Wrote {args.rows:,} rows to {args.out} in {time.perf_counter() - start:.1f}s")
+    else:
+        print(cached(args.rows, args.seed))
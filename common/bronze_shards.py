@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+import zlib
+from datetime import datetime
+
+from common import markets
+from common.keys import company_key
+
+# =====================================================
+# BRONZE SHARDS
+# =====================================================
+# web_scrape.py writes each market partition a second time, cut into
+# EV_BRONZE_SHARDS shards by a hash of the company name, so bronze_load.py
+# can load them in parallel:
+#
+#   bronze/shards/<market>_shard_<k>.csv    rows whose company hashes to k,
+#                                           in partition order
+#   bronze/shards/<market>_manifest.json    one entry per shard: file, rows,
+#                                           sha256; plus the SHA-256 of the
+#                                           partition it was cut from
+#
+# The company is hashed as the dedupe's company key (case, accents,
+# spacing and punctuation ignored: "Mercedes-Benz" = "Mercedes Benz"), so
+# every listing that silver may compare with another lands in the same
+# shard number in every market. The market CSV stays the source of truth:
+# a manifest that is missing, cut into a different shard count, on another
+# key or from another version of the CSV, or whose shard files no longer
+# match it, is rebuilt from the CSV (ensure_shards).
+
+SHARDS_ENV = "EV_BRONZE_SHARDS"
+DEFAULT_SHARDS = 8
+
+SHARD_DIR = os.path.join(markets.BRONZE_DIR, "shards")
+
+# Recorded in each manifest; shards cut on another key are re-cut
+SHARD_KEY = "company_key"
+
+def shard_count():
+    value = os.environ.get(SHARDS_ENV, "").strip()
+    shards = int(value) if value else DEFAULT_SHARDS
+    if shards < 1:
+        raise ValueError(f"{SHARDS_ENV} must be at least 1, got {shards}")
+    return shards
+
+def company_shard(company, shards):
+    # crc32, not hash(): stable across processes and runs
+    return zlib.crc32(company_key(company).encode("utf-8")) % shards
+
+def part_path(market, shard):
+    return os.path.join(SHARD_DIR, f"{market}_shard_{shard:03d}.csv")
+
+def manifest_path(market):
+    return os.path.join(SHARD_DIR, f"{market}_manifest.json")
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def read_manifest(market):
+    try:
+        with open(manifest_path(market), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def write_shards(market, df, shards=None, source=None):
+    # Cuts one market partition (a DataFrame) into shards and writes its
+    # manifest; every shard is written, empty ones as a header only.
+    # source: the partition CSV the frame was read from / saved to
+    shards = shards or shard_count()
+    source = source or markets.csv_path(market)
+    os.makedirs(SHARD_DIR, exist_ok=True)
+
+    keys = df["company"].map(lambda company: company_shard(company, shards))
+    parts = []
+    for shard in range(shards):
+        part = df[keys == shard]
+        path = part_path(market, shard)
+        tmp_path = path + ".tmp"
+        part.to_csv(tmp_path, index=False, encoding="utf-8")
+        os.replace(tmp_path, path)
+        parts.append({
+            "shard": shard,
+            "file": os.path.basename(path),
+            "rows": len(part),
+            "sha256": file_sha256(path),
+        })
+
+    # Shards of an earlier, larger shard count
+    for name in os.listdir(SHARD_DIR):
+        if name.startswith(f"{market}_shard_") and name.endswith(".csv"):
+            if int(name[len(f"{market}_shard_"):-len(".csv")]) >= shards:
+                os.remove(os.path.join(SHARD_DIR, name))
+
+    manifest = {
+        "market": market,
+        "shards": shards,
+        "key": SHARD_KEY,
+        "columns": list(df.columns),
+        "source_sha256": file_sha256(source) if os.path.exists(source) else None,
+        "written_at": datetime.now().isoformat(timespec="seconds"),
+        "parts": parts,
+    }
+    path = manifest_path(market)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+    return manifest
+
+def read_partition(path):
+    # Every value as text, exactly as scraped; an empty cell stays ""
+    import pandas as pd
+
+    return pd.read_csv(path, dtype=str, keep_default_na=False)
+
+def parts_intact(manifest):
+    for part in manifest["parts"]:
+        path = os.path.join(SHARD_DIR, part["file"])
+        if not os.path.exists(path) or file_sha256(path) != part["sha256"]:
+            return False
+    return True
+
+def ensure_shards(market, shards=None):
+    # The market's manifest, re-cut from its CSV first when it is missing,
+    # stale or a shard file no longer matches it
+    shards = shards or shard_count()
+    source = markets.csv_path(market)
+    manifest = read_manifest(market)
+    if (manifest is None or manifest["shards"] != shards
+            or manifest.get("key") != SHARD_KEY
+            or manifest["source_sha256"] != file_sha256(source)
+            or not parts_intact(manifest)):
+        manifest = write_shards(market, read_partition(source), shards, source)
+    return manifest
@@ -0,0 +1,33 @@
+import os
+from datetime import datetime
+
+# =====================================================
+# SHARED PIPELINE CONTEXT
+# =====================================================
+# One context is created per pipeline run and handed to every stage's
+# run(ctx). Stages started on their own (python -m gold.gold_load) get a
+# fresh context of their own.
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+LOG_DIR = os.path.join(PROJECT_ROOT, "logs")
+
+# Set by run_pipeline.py for stages it starts as subprocesses, so their
+# log files carry the same run id as the in-process ones
+RUN_ID_ENV = "EV_PIPELINE_RUN_ID"
+
+class PipelineContext:
+    def __init__(self, run_id=None):
+        # All stage log files of one run share this suffix
+        self.run_id = (run_id or os.environ.get(RUN_ID_ENV)
+                       or datetime.now().strftime("%Y%m%d_%H%M%S"))
+        self.project_root = PROJECT_ROOT
+        self.log_dir = LOG_DIR
+        # stage name -> value returned by its run()
+        self.results = {}
+
+    def log_path(self, prefix):
+        os.makedirs(self.log_dir, exist_ok=True)
+        return os.path.join(self.log_dir, f"{prefix}_{self.run_id}.log")
+
+def get_context(ctx=None):
+    return ctx if ctx is not None else PipelineContext()
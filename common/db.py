@@ -0,0 +1,152 @@
+import configparser
+import os
+import threading
+import time
+
+# =====================================================
+# SHARED MYSQL CONNECTION POOL
+# =====================================================
+# Every stage and the gold read API get their connections from here
+# instead of calling mysql.connector.connect() themselves. Pools are
+# created once per process, so a pipeline run in one interpreter does
+# the MySQL handshake once per pooled connection, not once per stage.
+#
+# Credentials come from, in increasing priority:
+#   1. the defaults below
+#   2. db_config.ini in the project root ([mysql] section)
+#   3. EV_DB_HOST / EV_DB_PORT / EV_DB_USER / EV_DB_PASSWORD / EV_DB_POOL_SIZE
+# There is no default password: without one from 2. or 3., creating a pool
+# fails with a message saying where to set it.
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+CONFIG_PATH = os.environ.get("EV_DB_CONFIG", os.path.join(PROJECT_ROOT, "db_config.ini"))
+
+DEFAULTS = {
+    "host": "localhost",
+    "port": "3306",
+    "user": "EV_specs",
+    "password": "",
+    "pool_size": "5",
+}
+
+ENV_OVERRIDES = {
+    "host": "EV_DB_HOST",
+    "port": "EV_DB_PORT",
+    "user": "EV_DB_USER",
+    "password": "EV_DB_PASSWORD",
+    "pool_size": "EV_DB_POOL_SIZE",
+}
+
+# How long connect() waits for a free pooled connection
+POOL_WAIT_SECONDS = 30.0
+
+# Bulk loads are opt-in (EV_BULK_LOAD=1): by default every stage loads
+# with all checks on and is written to the binary log like any other
+# session. In bulk mode the session runs with the settings below.
+BULK_ENV = "EV_BULK_LOAD"
+BULK_SESSION_SETTINGS = [
+    ("unique_checks", 0),
+    ("foreign_key_checks", 0),
+]
+
+# Leaving the load out of the binary log means replicas never see it, so
+# that needs its own opt-in (EV_BULK_SKIP_BINLOG=1, on top of bulk mode).
+# sql_log_bin needs extra privileges (SUPER / SYSTEM_VARIABLES_ADMIN) and is
+# skipped when not allowed.
+SKIP_BINLOG_ENV = "EV_BULK_SKIP_BINLOG"
+
+def load_config():
+    config = dict(DEFAULTS)
+    if os.path.exists(CONFIG_PATH):
+        parser = configparser.ConfigParser()
+        parser.read(CONFIG_PATH, encoding="utf-8")
+        if parser.has_section("mysql"):
+            config.update({k: v for k, v in parser.items("mysql") if k in DEFAULTS})
+    for key, env in ENV_OVERRIDES.items():
+        if os.environ.get(env):
+            config[key] = os.environ[env]
+    return config
+
+# =====================================================
+# POOLS
+# =====================================================
+
+pools = {}
+pools_lock = threading.Lock()
+stats = {"checkouts": 0, "waits": 0}
+
+def get_pool(name="pipeline", size=None, database=None):
+    from mysql.connector import pooling
+
+    with pools_lock:
+        if name not in pools:
+            config = load_config()
+            if not config["password"]:
+                raise RuntimeError(
+                    f"No MySQL password configured: set EV_DB_PASSWORD, or password in the "
+                    f"[mysql] section of {CONFIG_PATH} (see db_config.example.ini)"
+                )
+            kwargs = {
+                "pool_name": name,
+                "pool_size": int(size or config["pool_size"]),
+                "host": config["host"],
+                "port": int(config["port"]),
+                "user": config["user"],
+                "password": config["password"],
+            }
+            if database:
+                kwargs["database"] = database
+            pools[name] = pooling.MySQLConnectionPool(**kwargs)
+        return pools[name]
+
+def connect(pool="pipeline", database=None, wait=POOL_WAIT_SECONDS):
+    # Returns a pooled connection; close() hands it back to the pool,
+    # which resets the session so bulk settings never leak to the next user.
+    from mysql.connector import errors
+
+    pool_obj = get_pool(pool)
+    deadline = time.monotonic() + wait
+    while True:
+        try:
+            conn = pool_obj.get_connection()
+            break
+        except errors.PoolError:
+            if time.monotonic() >= deadline:
+                raise
+            with pools_lock:
+                stats["waits"] += 1
+            time.sleep(0.05)
+    with pools_lock:
+        stats["checkouts"] += 1
+
+    if database:
+        conn.database = database
+    return conn
+
+def bulk_enabled():
+    return os.environ.get(BULK_ENV, "0") == "1"
+
+def apply_bulk_session(conn):
+    # Returns the names of the settings that were actually applied
+    from mysql.connector import errors
+
+    settings = list(BULK_SESSION_SETTINGS)
+    if os.environ.get(SKIP_BINLOG_ENV, "0") == "1":
+        settings.append(("sql_log_bin", 0))
+
+    applied = []
+    cursor = conn.cursor()
+    for name, value in settings:
+        try:
+            cursor.execute(f"SET SESSION {name} = {value};")
+            applied.append(name)
+        except errors.Error:
+            # Not permitted for this account; carry on without it
+            pass
+    cursor.close()
+    return applied
+
+def pool_stats():
+    with pools_lock:
+        sizes = {name: p.pool_size for name, p in pools.items()}
+    return {"pools": sizes, **stats}
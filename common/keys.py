@@ -0,0 +1,25 @@
+import re
+import unicodedata
+
+# =====================================================
+# COMPANY KEY
+# =====================================================
+# One normalised key per manufacturer name, shared by the bronze shards
+# (common/bronze_shards.py), which hash it to pick a shard, and the silver
+# dedupe (silver/silver_dedupe.py), which sorts and compares on it. Both
+# must agree, or listings silver compares would land in different shards.
+
+WORD = re.compile(r"[a-z]+|\d+(?:\.\d+)?")
+
+def fold(text):
+    # Lower case, accents stripped: "Citroën" -> "citroen"
+    text = (text or "").strip()
+    if text.isascii():
+        return text.lower()
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in text if not unicodedata.combining(c)).lower()
+
+def company_key(company):
+    # Spacing, punctuation, case and accents ignored: "Mercedes-Benz" ->
+    # "mercedesbenz"
+    return "".join(WORD.findall(fold(company)))
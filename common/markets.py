@@ -0,0 +1,56 @@
+import os
+
+# =====================================================
+# MARKETS + CURRENCIES
+# =====================================================
+# One entry per ev-database.org market. web_scrape.py fetches every
+# selected market in parallel and writes one bronze partition (CSV) per
+# market; silver uses the market's currency to parse prices and converts
+# them to GBP with the rates below.
+#
+# Select markets with EV_SCRAPE_MARKETS, e.g. EV_SCRAPE_MARKETS=uk,de,nl.
+# The default (uk only) reproduces the original single-market pipeline.
+
+QUERY = ("#group=vehicle-group&rs-pr=10000_100000&rs-er=0_500&rs-ld=0_500&rs-ac=2_23"
+         "&rs-dcfc=0_400&rs-ub=10_200&rs-tw=0_2500&rs-ef=150_600&rs-sa=-1_5"
+         "&rs-w=1000_3500&rs-c=0_5000&rs-y=2010_2030&s=1&p=82-10")
+
+MARKETS = {
+    "uk": {"url": "https://ev-database.org/uk/" + QUERY, "currency": "GBP"},
+    "de": {"url": "https://ev-database.org/de/" + QUERY, "currency": "EUR"},
+    "nl": {"url": "https://ev-database.org/nl/" + QUERY, "currency": "EUR"},
+}
+
+# Conversion to GBP for gold, which reports every price as price_gbp.
+# Reference rates; update alongside the markets they serve.
+CURRENCIES = {
+    "GBP": {"symbol": "£", "gbp_rate": 1.0},
+    "EUR": {"symbol": "€", "gbp_rate": 0.85},
+}
+
+MARKETS_ENV = "EV_SCRAPE_MARKETS"
+DEFAULT_MARKETS = "uk"
+
+BRONZE_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bronze"))
+
+def selected_markets():
+    names = [m.strip().lower() for m in os.environ.get(MARKETS_ENV, DEFAULT_MARKETS).split(",")]
+    names = [m for m in names if m]
+    unknown = [m for m in names if m not in MARKETS]
+    if unknown:
+        raise ValueError(f"Unknown market(s) in {MARKETS_ENV}: {', '.join(unknown)}")
+    return names
+
+def csv_path(market):
+    # The UK partition keeps the historical file name
+    if market == "uk":
+        return os.path.join(BRONZE_DIR, "scrapedData.csv")
+    return os.path.join(BRONZE_DIR, f"scrapedData_{market}.csv")
+
+def currency_symbol(market):
+    return CURRENCIES[MARKETS[market]["currency"]]["symbol"]
+
+def market_rows():
+    # (market, currency, gbp_rate) for silver_market
+    return [(m, conf["currency"], CURRENCIES[conf["currency"]]["gbp_rate"])
+            for m, conf in MARKETS.items()]
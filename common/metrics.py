@@ -0,0 +1,230 @@
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+from common import pipeline_log, slow_query
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# =====================================================
+# STAGE PERFORMANCE METRICS
+# =====================================================
+# Every stage runs inside run_stage(), which records its wall time, status
+# and peak memory. The safe_execute / safe_executemany helpers report each
+# statement through record_sql(), so a stage also carries how long it spent
+# waiting on MySQL and how many rows its statements touched, in total and
+# per step.
+#
+# The process that ran the stage writes logs/metrics_<stage>_<run_id>.json.
+# run_pipeline.py merges every stage of the run into
+#   logs/metrics_<run_id>.json   one document per run, for charting trends
+#   logs/metrics_<run_id>.prom   the same numbers in Prometheus text format
+#
+# Peak RSS is the process high-water mark, so with several stages in one
+# interpreter it includes whatever ran before. Python heap peaks come from
+# tracemalloc, which slows allocation-heavy code down noticeably and is
+# therefore only on with EV_METRICS_TRACEMALLOC=1.
+
+TRACEMALLOC_ENV = "EV_METRICS_TRACEMALLOC"
+PROM_PREFIX = "ev_pipeline"
+
+lock = threading.Lock()
+stages = {}
+
+def new_stage(name):
+    return {
+        "stage": name,
+        "status": "running",
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "wall_seconds": 0.0,
+        "sql_seconds": 0.0,
+        "sql_statements": 0,
+        "rows": 0,
+        "rows_per_second": None,
+        "peak_rss_bytes": None,
+        "python_peak_bytes": None,
+        "steps": {},
+    }
+
+# =====================================================
+# RECORDING
+# =====================================================
+
+def record_sql(stage, step, seconds, rowcount):
+    # rowcount is -1 for SELECTs and 0 for DDL; only real row counts add up
+    rows = rowcount if rowcount and rowcount > 0 else 0
+    with lock:
+        m = stages.get(stage)
+        if m is None:
+            m = stages[stage] = new_stage(stage)
+        m["sql_seconds"] += seconds
+        m["sql_statements"] += 1
+        m["rows"] += rows
+        s = m["steps"].setdefault(step, {"calls": 0, "seconds": 0.0, "rows": 0})
+        s["calls"] += 1
+        s["seconds"] += seconds
+        s["rows"] += rows
+
+def add_rows(stage, rows):
+    # For stages whose rows never go through SQL (the scrape)
+    with lock:
+        m = stages.get(stage)
+        if m is None:
+            m = stages[stage] = new_stage(stage)
+        m["rows"] += rows
+
+def peak_rss_bytes():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def run_stage(ctx, name, fn):
+    trace = os.environ.get(TRACEMALLOC_ENV) == "1"
+    if trace:
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        else:
+            tracemalloc.start()
+
+    slow_query.configure(ctx, name)
+    with lock:
+        stages[name] = new_stage(name)
+    start = time.perf_counter()
+    status = "failed"
+    try:
+        result = fn(ctx)
+        status = "ok"
+        return result
+    finally:
+        elapsed = time.perf_counter() - start
+        with lock:
+            m = stages[name]
+            m["status"] = status
+            m["wall_seconds"] = round(elapsed, 4)
+            m["sql_seconds"] = round(m["sql_seconds"], 4)
+            for step in m["steps"].values():
+                step["seconds"] = round(step["seconds"], 4)
+            if elapsed > 0:
+                m["rows_per_second"] = round(m["rows"] / elapsed, 1)
+            m["peak_rss_bytes"] = peak_rss_bytes()
+            if trace:
+                m["python_peak_bytes"] = tracemalloc.get_traced_memory()[1]
+            snapshot = json.loads(json.dumps(m))
+        try:
+            write_json(stage_path(ctx, name), snapshot)
+        except OSError as e:
+            pipeline_log.get_logger(name).warning(f"Could not write metrics: {e!r}")
+        pipeline_log.get_logger(name).info(f"Metrics: {summary(snapshot)}")
+
+# =====================================================
+# OUTPUT
+# =====================================================
+
+def run_path(ctx, name, ext):
+    os.makedirs(ctx.log_dir, exist_ok=True)
+    return os.path.join(ctx.log_dir, f"{name}_{ctx.run_id}.{ext}")
+
+def stage_path(ctx, name):
+    return run_path(ctx, f"metrics_{name}", "json")
+
+def write_json(path, doc):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(doc, f, indent=2)
+    os.replace(tmp, path)
+
+def load_stage(ctx, name):
+    path = stage_path(ctx, name)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def summary(m):
+    rss = m["peak_rss_bytes"]
+    text = (f"{m['wall_seconds']:.2f}s wall, {m['sql_seconds']:.2f}s in MySQL "
+            f"({m['sql_statements']} statements), {m['rows']:,} rows")
+    if m["rows_per_second"]:
+        text += f" ({m['rows_per_second']:,.0f} rows/s)"
+    if rss:
+        text += f", peak RSS {rss / 2**20:.0f} MB"
+    if m["python_peak_bytes"]:
+        text += f", Python peak {m['python_peak_bytes'] / 2**20:.1f} MB"
+    return text
+
+def label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def prometheus_text(doc):
+    run_id = label(doc["run_id"])
+    series = [
+        ("stage_wall_seconds", "Stage wall-clock time", "wall_seconds"),
+        ("stage_sql_seconds", "Time the stage spent waiting on MySQL", "sql_seconds"),
+        ("stage_sql_statements", "Statements run through safe_execute", "sql_statements"),
+        ("stage_rows", "Rows affected by the stage", "rows"),
+        ("stage_rows_per_second", "Rows affected per wall-clock second", "rows_per_second"),
+        ("stage_peak_rss_bytes", "Process peak resident set size at stage end", "peak_rss_bytes"),
+        ("stage_python_peak_bytes", "tracemalloc peak during the stage", "python_peak_bytes"),
+    ]
+    lines = []
+    for metric, help_text, key in series:
+        lines.append(f"# HELP {PROM_PREFIX}_{metric} {help_text}")
+        lines.append(f"# TYPE {PROM_PREFIX}_{metric} gauge")
+        for m in doc["stages"]:
+            if m.get(key) is None:
+                continue
+            lines.append(f'{PROM_PREFIX}_{metric}{{run_id="{run_id}",stage="{label(m["stage"])}",'
+                         f'status="{label(m["status"])}"}} {m[key]}')
+
+    step_series = [
+        ("step_seconds", "Time spent in one safe_execute step", "seconds"),
+        ("step_rows", "Rows affected by one safe_execute step", "rows"),
+        ("step_calls", "Statements run for one safe_execute step", "calls"),
+    ]
+    for metric, help_text, key in step_series:
+        lines.append(f"# HELP {PROM_PREFIX}_{metric} {help_text}")
+        lines.append(f"# TYPE {PROM_PREFIX}_{metric} gauge")
+        for m in doc["stages"]:
+            for step, s in m.get("steps", {}).items():
+                lines.append(f'{PROM_PREFIX}_{metric}{{run_id="{run_id}",stage="{label(m["stage"])}",'
+                             f'step="{label(step)}"}} {s[key]}')
+
+    lines.append(f"# HELP {PROM_PREFIX}_run_wall_seconds Whole pipeline wall-clock time")
+    lines.append(f"# TYPE {PROM_PREFIX}_run_wall_seconds gauge")
+    lines.append(f'{PROM_PREFIX}_run_wall_seconds{{run_id="{run_id}"}} {doc["wall_seconds"]}')
+    return "\n".join(lines) + "\n"
+
+def write_run(ctx, names, results, timings, total):
+    # Merges the stage files of this run; stages that were skipped or
+    # unchanged only get their status and orchestrator-side time
+    docs = []
+    for name in names:
+        m = load_stage(ctx, name)
+        if m is None or results.get(name) != m["status"]:
+            m = new_stage(name)
+            m["status"] = results.get(name, "skipped")
+            m["wall_seconds"] = round(timings.get(name, 0.0), 4)
+            m["started_at"] = None
+        docs.append(m)
+
+    doc = {
+        "run_id": ctx.run_id,
+        "finished_at": datetime.now().isoformat(timespec="seconds"),
+        "wall_seconds": round(total, 3),
+        "stages": docs,
+    }
+    json_path = run_path(ctx, "metrics", "json")
+    prom_path = run_path(ctx, "metrics", "prom")
+    write_json(json_path, doc)
+    with open(prom_path, "w", encoding="utf-8") as f:
+        f.write(prometheus_text(doc))
+    return json_path, prom_path
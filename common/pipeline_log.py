@@ -0,0 +1,209 @@
+import atexit
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+
+# =====================================================
+# SHARED PIPELINE LOGGING
+# =====================================================
+# Every stage logs through here instead of reopening its log file for
+# each line. A log call only puts a tuple on a queue; one background
+# writer thread drains the queue in batches and writes:
+#   - the console, as "[YYYY-mm-dd HH:MM:SS] message" like before
+#   - the stage's text log, logs/<prefix>_<run_id>.log (kept open, buffered)
+#   - logs/run_<run_id>.jsonl, one JSON object per record with ts, level,
+#     run_id, stage, msg and any structured fields passed as keywords
+#
+# Files are flushed whenever the queue runs empty (at most every
+# FLUSH_SECONDS under sustained load), on every WARNING or worse, and when
+# the process exits.
+#
+# EV_LOG_LEVEL sets the minimum level (DEBUG, INFO, WARNING, ERROR;
+# default INFO).
+
+DEBUG, INFO, WARNING, ERROR = 10, 20, 30, 40
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING", ERROR: "ERROR"}
+
+LEVEL_ENV = "EV_LOG_LEVEL"
+FLUSH_SECONDS = 1.0
+FILE_BUFFER_BYTES = 64 * 1024
+
+def level_from_env():
+    name = os.environ.get(LEVEL_ENV, "INFO").upper()
+    return {v: k for k, v in LEVEL_NAMES.items()}.get(name, INFO)
+
+min_level = level_from_env()
+
+# =====================================================
+# STAGE LOGGER
+# =====================================================
+
+class StageLogger:
+    """Cheap front end: filters by level and enqueues, nothing else."""
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def log(self, level, msg, **fields):
+        if level < min_level:
+            return
+        if writer is None:
+            start()
+        log_queue.put((time.time(), level, self.stage, run_ids.get(self.stage), msg, fields))
+
+    def debug(self, msg, **fields):
+        self.log(DEBUG, msg, **fields)
+
+    def info(self, msg, **fields):
+        self.log(INFO, msg, **fields)
+
+    def warning(self, msg, **fields):
+        self.log(WARNING, msg, **fields)
+
+    def error(self, msg, **fields):
+        self.log(ERROR, msg, **fields)
+
+# =====================================================
+# WRITER THREAD
+# =====================================================
+
+def text_line(created, level, msg):
+    ts = datetime.fromtimestamp(created).strftime("%Y-%m-%d %H:%M:%S")
+    if level == INFO:
+        return f"[{ts}] {msg}"
+    return f"[{ts}] {LEVEL_NAMES.get(level, level)}: {msg}"
+
+def json_line(created, level, stage, run_id, msg, fields):
+    entry = {
+        "ts": datetime.fromtimestamp(created).isoformat(timespec="milliseconds"),
+        "level": LEVEL_NAMES.get(level, level),
+        "run_id": run_id,
+        "stage": stage,
+        "msg": msg,
+    }
+    if fields:
+        entry.update(fields)
+    return json.dumps(entry, ensure_ascii=False, default=str)
+
+class Writer(threading.Thread):
+    def __init__(self, log_dir):
+        super().__init__(name="pipeline-log-writer", daemon=True)
+        self.log_dir = log_dir
+        self.files = {}
+        self.last_flush = time.monotonic()
+
+    def open(self, path):
+        f = self.files.get(path)
+        if f is None:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            f = self.files[path] = open(path, "a", encoding="utf-8", buffering=FILE_BUFFER_BYTES)
+        return f
+
+    def flush(self):
+        sys.stdout.flush()
+        for f in self.files.values():
+            f.flush()
+        self.last_flush = time.monotonic()
+
+    def write_batch(self, batch):
+        console = []
+        urgent = False
+        for created, level, stage, run_id, msg, fields in batch:
+            line = text_line(created, level, msg)
+            console.append(line)
+            path = stage_paths.get(stage)
+            if path:
+                self.open(path).write(line + "\n")
+            if run_id:
+                path = os.path.join(self.log_dir, f"run_{run_id}.jsonl")
+                self.open(path).write(json_line(created, level, stage, run_id, msg, fields) + "\n")
+            urgent = urgent or level >= WARNING
+        sys.stdout.write("\n".join(console) + "\n")
+        return urgent
+
+    def run(self):
+        stop = False
+        while not stop:
+            item = log_queue.get()
+            batch, events = [], []
+            # Drain whatever else is already queued into the same batch
+            while True:
+                if item is STOP:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    events.append(item)
+                else:
+                    batch.append(item)
+                try:
+                    item = log_queue.get_nowait()
+                except queue.Empty:
+                    break
+            try:
+                urgent = self.write_batch(batch) if batch else False
+                if urgent or events or stop or log_queue.empty() \
+                        or time.monotonic() - self.last_flush >= FLUSH_SECONDS:
+                    self.flush()
+            except Exception as e:
+                sys.stderr.write(f"pipeline_log: write failed: {e!r}\n")
+            for event in events:
+                event.set()
+        for f in self.files.values():
+            f.close()
+        self.files = {}
+
+STOP = object()
+
+# =====================================================
+# SETUP
+# =====================================================
+
+setup_lock = threading.Lock()
+log_queue = queue.SimpleQueue()
+writer = None
+run_ids = {}
+stage_paths = {}
+
+def start(log_dir=None):
+    global writer
+
+    with setup_lock:
+        if writer is not None:
+            return
+        if log_dir is None:
+            from common.context import LOG_DIR
+            log_dir = LOG_DIR
+        writer = Writer(log_dir)
+        writer.start()
+        atexit.register(shutdown)
+
+def get_logger(stage):
+    return StageLogger(stage)
+
+def configure(ctx, stage, file_prefix=None):
+    # Called at the start of a stage's run(): ties the stage to this run and
+    # (lazily) opens logs/<file_prefix>_<run_id>.log for it
+    start(ctx.log_dir)
+    run_ids[stage] = ctx.run_id
+    stage_paths[stage] = ctx.log_path(file_prefix or stage)
+    return get_logger(stage)
+
+def flush(timeout=5.0):
+    # Blocks until every record queued so far has been written
+    if writer is None:
+        return
+    done = threading.Event()
+    log_queue.put(done)
+    done.wait(timeout)
+
+def shutdown():
+    global writer
+    with setup_lock:
+        if writer is None:
+            return
+        log_queue.put(STOP)
+        writer.join(timeout=5.0)
+        writer = None
@@ -0,0 +1,204 @@
+import glob
+import hashlib
+import importlib.util
+import os
+import re
+from datetime import datetime
+
+# =====================================================
+# STAGE FINGERPRINTS + RUN STATE
+# =====================================================
+# Each pipeline stage records a fingerprint of what it read and what it
+# produced in DataWarehouse_meta.pipeline_stage_state. run_pipeline.py
+# skips a stage when its last run succeeded, its inputs hash the same and
+# its outputs have not been touched since, and resumes from the first
+# failed or dirty stage otherwise.
+#
+# A fingerprint is a SHA-256 over a list of (kind, target) specs:
+#   ("file", path)              file contents
+#   ("files", pattern)          contents of every file matching a glob
+#   ("env", name)               value of an environment variable
+#   ("date", "%Y-%m-%d")        today's date in that format, so the stage
+#                               is repeated once per day (or hour, ...)
+#   ("module", "gold.gold_load") module source, i.e. code + embedded SQL
+#   ("tables", ["db.t", ...])   create and update time of each table from
+#                               information_schema; CHECKSUM TABLE of the
+#                               contents with verify=True
+#   ("schema", ["db.t", ...])   SHOW CREATE TABLE without AUTO_INCREMENT
+#   ("views", "db")             definitions of every view in a database
+#
+# The table times cost one information_schema query however big the
+# tables are: a reload recreates or swaps the tables (new create time) and
+# any later write moves the update time. InnoDB keeps update times in
+# memory only, so after a MySQL restart the first checked run reruns from
+# the first stage with table outputs. Estimated TABLE_ROWS is left out: it
+# changes when InnoDB recalculates statistics in the background, without
+# any write. CHECKSUM TABLE reads every row, so it is only used by
+# run_pipeline.py --verify and recorded separately (output_checksum).
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+STATE_DB = "DataWarehouse_meta"
+
+state_ddl = f"""
+CREATE TABLE IF NOT EXISTS {STATE_DB}.pipeline_stage_state (
+    stage VARCHAR(64) PRIMARY KEY,
+    status VARCHAR(16) NOT NULL,
+    input_fingerprint CHAR(64),
+    output_fingerprint CHAR(64),
+    output_checksum CHAR(64),
+    run_id VARCHAR(32),
+    started_at DATETIME,
+    finished_at DATETIME,
+    duration_sec DECIMAL(10,3)
+);
+"""
+
+# =====================================================
+# FINGERPRINTS
+# =====================================================
+
+def file_digest(path):
+    if not os.path.isabs(path):
+        path = os.path.join(PROJECT_ROOT, path)
+    if not os.path.exists(path):
+        return "missing"
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def files_digest(pattern):
+    if not os.path.isabs(pattern):
+        pattern = os.path.join(PROJECT_ROOT, pattern)
+    return [f"{os.path.basename(p)}={file_digest(p)}" for p in sorted(glob.glob(pattern))]
+
+def module_digest(module):
+    spec = importlib.util.find_spec(module)
+    if spec is None or not spec.origin:
+        return "missing"
+    return file_digest(spec.origin)
+
+def table_checksums(cursor, tables):
+    cursor.execute("CHECKSUM TABLE " + ", ".join(tables) + ";")
+    # Missing tables come back with a NULL checksum
+    return [f"{name}={checksum}" for name, checksum in cursor.fetchall()]
+
+def table_times(cursor, tables):
+    from mysql.connector import errors
+
+    # MySQL 8 caches information_schema table statistics for a day by
+    # default; this session must see the current update times
+    try:
+        cursor.execute("SET SESSION information_schema_stats_expiry = 0;")
+    except errors.Error:
+        pass  # MySQL 5.7: no cache
+    names = [table.split(".", 1) for table in tables]
+    cursor.execute(
+        "SELECT table_schema, table_name, create_time, update_time "
+        "FROM information_schema.tables WHERE "
+        + " OR ".join("(table_schema = %s AND table_name = %s)" for _ in names) + ";",
+        [part for name in names for part in name],
+    )
+    times = {f"{schema}.{name}".lower(): (created, updated)
+             for schema, name, created, updated in cursor.fetchall()}
+    parts = []
+    for table in tables:
+        created, updated = times.get(table.lower(), ("missing", None))
+        parts.append(f"{table}={created}/{updated}")
+    return parts
+
+def table_schemas(cursor, tables):
+    from mysql.connector import errors
+
+    parts = []
+    for table in tables:
+        try:
+            cursor.execute(f"SHOW CREATE TABLE {table};")
+            ddl = cursor.fetchone()[1]
+            parts.append(re.sub(r"\s*AUTO_INCREMENT=\d+", "", ddl))
+        except errors.ProgrammingError:
+            parts.append(f"{table}=missing")
+    return parts
+
+def view_definitions(cursor, database):
+    cursor.execute("""
+    SELECT table_name, view_definition
+    FROM information_schema.views
+    WHERE table_schema = %s
+    ORDER BY table_name;
+    """, (database,))
+    return [f"{name}={definition}" for name, definition in cursor.fetchall()]
+
+def fingerprint(cursor, specs, extra=(), verify=False):
+    # verify=True hashes table contents (CHECKSUM TABLE) instead of times
+    h = hashlib.sha256()
+    for kind, target in specs:
+        if kind == "file":
+            parts = [file_digest(target)]
+        elif kind == "files":
+            parts = files_digest(target)
+        elif kind == "env":
+            parts = [os.environ.get(target, "")]
+        elif kind == "date":
+            parts = [datetime.now().strftime(target)]
+        elif kind == "module":
+            parts = [module_digest(target)]
+        elif kind == "tables":
+            parts = table_checksums(cursor, target) if verify else table_times(cursor, target)
+        elif kind == "schema":
+            parts = table_schemas(cursor, target)
+        elif kind == "views":
+            parts = view_definitions(cursor, target)
+        else:
+            raise ValueError(f"Unknown fingerprint kind: {kind}")
+        h.update(f"{kind}:{target}".encode("utf-8"))
+        for part in parts:
+            h.update(b"\0" + str(part).encode("utf-8"))
+    # Upstream output fingerprints, so upstream changes dirty this stage
+    for value in extra:
+        h.update(b"\0" + str(value).encode("utf-8"))
+    return h.hexdigest()
+
+# =====================================================
+# STATE TABLE
+# =====================================================
+
+def ensure_state_table(cursor):
+    cursor.execute(f"CREATE DATABASE IF NOT EXISTS {STATE_DB};")
+    cursor.execute(state_ddl)
+
+STATE_COLUMNS = ["status", "input_fingerprint", "output_fingerprint", "output_checksum",
+                 "run_id", "finished_at"]
+
+def load_state(cursor, stage):
+    cursor.execute(f"""
+    SELECT {", ".join(STATE_COLUMNS)}
+    FROM {STATE_DB}.pipeline_stage_state
+    WHERE stage = %s;
+    """, (stage,))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    return dict(zip(STATE_COLUMNS, row))
+
+def save_state(cursor, stage, status, run_id, started_at, duration,
+               input_fp=None, output_fp=None, output_checksum=None):
+    cursor.execute(f"""
+    INSERT INTO {STATE_DB}.pipeline_stage_state (
+        stage, status, input_fingerprint, output_fingerprint, output_checksum,
+        run_id, started_at, finished_at, duration_sec
+    )
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        status = VALUES(status),
+        input_fingerprint = VALUES(input_fingerprint),
+        output_fingerprint = VALUES(output_fingerprint),
+        output_checksum = VALUES(output_checksum),
+        run_id = VALUES(run_id),
+        started_at = VALUES(started_at),
+        finished_at = VALUES(finished_at),
+        duration_sec = VALUES(duration_sec);
+    """, (stage, status, input_fp, output_fp, output_checksum, run_id, started_at,
+          datetime.now(), round(duration, 3)))
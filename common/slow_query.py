@@ -0,0 +1,209 @@
+import json
+import os
+import re
+import threading
+from datetime import datetime
+
+from common import pipeline_log
+
+# =====================================================
+# SLOW-QUERY CAPTURE
+# =====================================================
+# Optional profiling for the safe_execute helpers. For a profiled stage
+# every statement is bracketed by SHOW SESSION STATUS snapshots; any
+# statement slower than the threshold is written to
+# logs/slow_queries_<run_id>.log together with:
+#   - its duration and the non-zero handler / sort / tmp-table deltas
+#   - EXPLAIN ANALYZE of its SELECT (for INSERT ... SELECT, the SELECT
+#     part), which runs that SELECT a second time
+#   - EXPLAIN FORMAT=JSON of the statement itself
+#   - findings pulled from the plan: full scans, filesorts, temp tables
+#
+# Off by default. Switch it on per stage:
+#   EV_SLOW_QUERY_STAGES=silver_load,gold_load   (or "all")
+#   EV_SLOW_QUERY_SECONDS=0.5                    (threshold, default 1.0)
+# run_pipeline.py sets both from --profile-sql / --slow-query-seconds.
+#
+# The plan is taken after the statement ran, so for loads into a table
+# the optimizer now sees that table's new rows.
+
+STAGES_ENV = "EV_SLOW_QUERY_STAGES"
+SECONDS_ENV = "EV_SLOW_QUERY_SECONDS"
+DEFAULT_SECONDS = 1.0
+
+# Statements EXPLAIN accepts; DDL is only timed
+EXPLAINABLE = ("SELECT", "WITH", "INSERT", "REPLACE", "UPDATE", "DELETE")
+
+STATUS_SQL = ("SHOW SESSION STATUS WHERE Variable_name LIKE 'Handler\\_%' "
+              "OR Variable_name LIKE 'Select\\_%' OR Variable_name LIKE 'Sort\\_%' "
+              "OR Variable_name LIKE 'Created\\_tmp\\_%';")
+
+report_lock = threading.Lock()
+contexts = {}
+
+def configure(ctx, stage):
+    contexts[stage] = ctx
+
+def enabled(stage):
+    selected = {s.strip() for s in os.environ.get(STAGES_ENV, "").split(",") if s.strip()}
+    return "all" in selected or stage in selected
+
+def threshold():
+    try:
+        return float(os.environ.get(SECONDS_ENV, DEFAULT_SECONDS))
+    except ValueError:
+        return DEFAULT_SECONDS
+
+# =====================================================
+# SESSION HELPERS
+# =====================================================
+
+def session_cursor(cursor):
+    # A second cursor on the same connection (= same session counters), so
+    # the caller's cursor keeps its rowcount and pending results
+    conn = getattr(cursor, "_connection", None) or getattr(cursor, "_cnx", None)
+    return conn.cursor()
+
+def session_status(cursor):
+    aux = session_cursor(cursor)
+    try:
+        aux.execute(STATUS_SQL)
+        return {name: int(value) for name, value in aux.fetchall() if str(value).isdigit()}
+    finally:
+        aux.close()
+
+def before(stage, cursor):
+    # Status snapshot for a profiled stage, None otherwise (the common case)
+    if not enabled(stage):
+        return None
+    try:
+        return session_status(cursor)
+    except Exception as e:
+        pipeline_log.get_logger(stage).warning(f"Slow-query capture unavailable: {e!r}")
+        return None
+
+def select_part(sql):
+    # The top-level SELECT/WITH of a statement, or None. Skips
+    # parenthesised column lists and string literals.
+    depth, quote = 0, None
+    for m in re.finditer(r"'|\"|\(|\)|\b(SELECT|WITH)\b", sql, re.IGNORECASE):
+        token = m.group(0)
+        if quote:
+            if token == quote:
+                quote = None
+        elif token in ("'", '"'):
+            quote = token
+        elif token == "(":
+            depth += 1
+        elif token == ")":
+            depth -= 1
+        elif depth == 0:
+            return sql[m.start():]
+    return None
+
+def explain(cursor, sql, params=None):
+    aux = session_cursor(cursor)
+    try:
+        if params:
+            aux.execute(sql, params)
+        else:
+            aux.execute(sql)
+        return aux.fetchall()
+    finally:
+        aux.close()
+
+# =====================================================
+# PLAN FINDINGS
+# =====================================================
+
+def plan_findings(node, found=None):
+    found = [] if found is None else found
+    if isinstance(node, dict):
+        table = node.get("table_name")
+        if table and node.get("access_type") == "ALL":
+            rows = node.get("rows_examined_per_scan")
+            found.append(f"full table scan of {table}" + (f" (~{rows} rows per scan)" if rows else ""))
+        if node.get("using_filesort"):
+            found.append("filesort")
+        if node.get("using_temporary_table"):
+            found.append("temporary table")
+        if table and node.get("using_join_buffer"):
+            found.append(f"join buffer ({node['using_join_buffer']}) on {table}: no usable index")
+        for value in node.values():
+            plan_findings(value, found)
+    elif isinstance(node, list):
+        for value in node:
+            plan_findings(value, found)
+    return found
+
+def status_findings(deltas):
+    found = []
+    if deltas.get("Select_full_join"):
+        found.append(f"{deltas['Select_full_join']} join(s) without an index (Select_full_join)")
+    if deltas.get("Sort_merge_passes"):
+        found.append(f"sort spilled to disk ({deltas['Sort_merge_passes']} merge passes)")
+    if deltas.get("Created_tmp_disk_tables"):
+        found.append("temporary table on disk")
+    return found
+
+# =====================================================
+# REPORT
+# =====================================================
+
+def report_path(stage):
+    ctx = contexts.get(stage)
+    if ctx is None:
+        from common.context import get_context
+        ctx = contexts[stage] = get_context()
+    os.makedirs(ctx.log_dir, exist_ok=True)
+    return os.path.join(ctx.log_dir, f"slow_queries_{ctx.run_id}.log")
+
+def after(stage, step, cursor, sql, params, seconds, status_before, plan=True):
+    # Called by safe_execute once the statement finished; never raises
+    if status_before is None or seconds < threshold():
+        return
+    logger = pipeline_log.get_logger(stage)
+    try:
+        status_after = session_status(cursor)
+        deltas = {k: v - status_before.get(k, 0) for k, v in status_after.items()
+                  if v - status_before.get(k, 0)}
+
+        sections = []
+        findings = status_findings(deltas)
+        if plan and sql.lstrip().split(None, 1)[0].upper() in EXPLAINABLE:
+            query = select_part(sql)
+            if query:
+                try:
+                    rows = explain(cursor, "EXPLAIN ANALYZE " + query, params)
+                    sections.append(("EXPLAIN ANALYZE (SELECT part)", "\n".join(r[0] for r in rows)))
+                except Exception as e:
+                    sections.append(("EXPLAIN ANALYZE (SELECT part)", f"not available: {e}"))
+            try:
+                rows = explain(cursor, "EXPLAIN FORMAT=JSON " + sql.strip(), params)
+                json_plan = json.loads(rows[0][0])
+                findings = plan_findings(json_plan) + findings
+                sections.append(("EXPLAIN FORMAT=JSON", json.dumps(json_plan, indent=2)))
+            except Exception as e:
+                sections.append(("EXPLAIN FORMAT=JSON", f"not available: {e}"))
+
+        lines = [
+            "=" * 70,
+            f"[{datetime.now():%Y-%m-%d %H:%M:%S}] {stage} / {step}: {seconds:.3f}s",
+            "Findings: " + ("; ".join(dict.fromkeys(findings)) or "none"),
+            "-" * 70,
+            sql.strip(),
+            "-" * 70,
+            "Session status deltas:",
+        ]
+        lines += [f"  {k:<28} {v:>14,}" for k, v in sorted(deltas.items())] or ["  (none)"]
+        for title, body in sections:
+            lines += ["-" * 70, title + ":", body]
+
+        path = report_path(stage)
+        with report_lock, open(path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n\n")
+        logger.warning(f"Slow statement: {step} took {seconds:.2f}s "
+                       f"({'; '.join(dict.fromkeys(findings)) or 'no findings'}), see {path}",
+                       step=step, seconds=round(seconds, 3))
+    except Exception as e:
+        logger.warning(f"Slow-query capture failed for {step}: {e!r}")
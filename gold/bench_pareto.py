@@ -0,0 +1,64 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from gold.gold_pareto import dominates, frontier
+
+# =====================================================
+# PARETO FRONTIER BENCHMARK
+# =====================================================
+# Times the 2-D sweep and the d-dimensional skyline on synthetic vehicles
+# and cross-checks both against the naive O(n²) definition on small sizes.
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+NAIVE_CHECK_LIMIT = 2_000
+
+def synthetic_points(n, dims, seed):
+    # Price and range are correlated like real EVs; the other metrics are
+    # noisy so the frontier stays realistically small.
+    rng = random.Random(seed)
+    points = []
+    for i in range(n):
+        price = rng.uniform(15_000, 150_000)
+        range_miles = 80 + price / 600 + rng.gauss(0, 40)
+        values = [price, -range_miles]
+        for _ in range(dims - 2):
+            values.append(rng.uniform(0, 100))
+        points.append((tuple(values), i))
+    return points
+
+def naive_frontier(points):
+    return [key for values, key in points
+            if not any(dominates(other, values) for other, _ in points)]
+
+def run(sizes, dims_list, seed):
+    print(f"{'dims':>4} {'vehicles':>10} {'frontier':>9} {'seconds':>9}")
+    for dims in dims_list:
+        for n in sizes:
+            points = synthetic_points(n, dims, seed)
+
+            start = time.perf_counter()
+            result = frontier(points)
+            elapsed = time.perf_counter() - start
+
+            if n <= NAIVE_CHECK_LIMIT:
+                assert sorted(result) == sorted(naive_frontier(points)), \
+                    f"frontier mismatch for dims={dims}, n={n}"
+
+            print(f"{dims:>4} {n:>10,} {len(result):>9,} {elapsed:>9.3f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark Pareto frontier computation")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--dims", type=int, nargs="+", default=[2, 3, 4])
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    run([NAIVE_CHECK_LIMIT] + args.sizes, args.dims, args.seed)
@@ -1,57 +1,32 @@
-import mysql.connector
 import os
-from datetime import datetime
-
-# ============================
-# Logging setup
-# ============================
+import sys
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, ".."))
-LOG_DIR = os.path.join(PROJECT_ROOT, "logs")
-os.makedirs(LOG_DIR, exist_ok=True)
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
 
-log_filename = f"goldDDL_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
-log_path = os.path.join(LOG_DIR, log_filename)
+from common import db, metrics, pipeline_log
+from common.context import get_context
+from gold import gold_tables
 
-def log(msg: str):
-    ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    line = f"[{ts}] {msg}"
-    print(line)
-    with open(log_path, "a", encoding="utf-8") as f:
-        f.write(line + "\n")
+HEAVY_IMPORTS = ("mysql.connector",)
 
 # ============================
-# MYSQL CONNECTION
-# ============================
-
-conn = mysql.connector.connect(
-    host="localhost",
-    user="EV_specs",
-    password="MDIS@2025"
-)
-cursor = conn.cursor()
-
-log("Starting Gold DDL...")
-
-# ============================
-# CREATE DATABASE
+# Logging setup
 # ============================
 
-cursor.execute("CREATE DATABASE IF NOT EXISTS DataWarehouse_gold;")
-cursor.execute("USE DataWarehouse_gold;")
-log("Database created/selected: DataWarehouse_gold")
+logger = pipeline_log.get_logger("gold_ddl")
 
-# Drop tables if exist
-cursor.execute("DROP TABLE IF EXISTS gold_brand_summary;")
-cursor.execute("DROP TABLE IF EXISTS gold_ev_summary;")
+def log(msg: str, level=pipeline_log.INFO):
+    logger.log(level, msg)
 
 # ============================
-# CREATE gold_ev_summary TABLE
+# TABLE DEFINITIONS
 # ============================
 
 ev_summary_sql = """
-CREATE TABLE gold_ev_summary (
+CREATE TABLE IF NOT EXISTS gold_ev_summary (
     ev_id INT AUTO_INCREMENT PRIMARY KEY,
     manufacturer_name VARCHAR(100),
     model_name VARCHAR(200),
@@ -77,18 +52,21 @@ CREATE TABLE gold_ev_summary (
     performance_score DECIMAL(10,4),
     efficiency_score DECIMAL(10,4),
     charging_score DECIMAL(10,4),
-    price_per_weight DECIMAL(10,4)
+    price_per_weight DECIMAL(10,4),
+
+    -- Stable row key across generations (silver vehicle id + hash of the
+    -- listing's specs without its price), used by gold_cdc.py
+    vehicle_id INT,
+    variant INT
 );
 """
-cursor.execute(ev_summary_sql)
-log("Created table: gold_ev_summary")
 
-# ============================
-# CREATE gold_brand_summary TABLE
-# ============================
+# Columns added to gold_ev_summary after its first release; ALTERed onto
+# an existing live table so no --recreate is needed
+ev_summary_added_columns = [("vehicle_id", "INT"), ("variant", "INT")]
 
 brand_summary_sql = """
-CREATE TABLE gold_brand_summary (
+CREATE TABLE IF NOT EXISTS gold_brand_summary (
     brand_id INT AUTO_INCREMENT PRIMARY KEY,
     manufacturer_name VARCHAR(100),
     model_count INT,
@@ -98,15 +76,193 @@ CREATE TABLE gold_brand_summary (
     avg_efficiency_whpm DECIMAL(10,2),
     avg_zero_to_sixty_sec DECIMAL(10,2),
     min_price_gbp INT,
-    max_price_gbp INT
+    max_price_gbp INT,
+    median_price_gbp DECIMAL(10,2),
+    p90_price_gbp DECIMAL(10,2),
+    median_range_miles DECIMAL(10,2),
+    median_efficiency_whpm DECIMAL(10,2),
+    cumulative_models INT
+);
+"""
+
+# Quantile / model-count columns, read from gold_brand_sketch
+brand_summary_added_columns = [
+    ("median_price_gbp", "DECIMAL(10,2)"), ("p90_price_gbp", "DECIMAL(10,2)"),
+    ("median_range_miles", "DECIMAL(10,2)"), ("median_efficiency_whpm", "DECIMAL(10,2)"),
+    ("cumulative_models", "INT"),
+]
+
+# Mergeable sketches per manufacturer and class (gold_sketches.py); the
+# row with class NULL covers the whole brand
+brand_sketch_sql = """
+CREATE TABLE IF NOT EXISTS gold_brand_sketch (
+    sketch_id INT AUTO_INCREMENT PRIMARY KEY,
+    manufacturer_name VARCHAR(100),
+    class VARCHAR(50),
+    listings INT,
+    price_digest TEXT,
+    range_digest TEXT,
+    efficiency_digest TEXT,
+    models_hll TEXT,
+    cumulative_models INT,
+    INDEX idx_brand_sketch (manufacturer_name, class)
+);
+"""
+
+pareto_sql = """
+CREATE TABLE IF NOT EXISTS gold_pareto_frontier (
+    frontier_row_id INT AUTO_INCREMENT PRIMARY KEY,
+    frontier_name VARCHAR(64),
+    class VARCHAR(50),
+    ev_id INT,
+    manufacturer_name VARCHAR(100),
+    model_name VARCHAR(200),
+    INDEX idx_frontier_class (frontier_name, class)
+);
+"""
+
+# Append-only change feed written by gold_cdc.py; never dropped
+changes_sql = """
+CREATE TABLE IF NOT EXISTS gold_ev_changes (
+    event_id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    generation BIGINT NOT NULL,
+    run_id VARCHAR(64),
+    event_type VARCHAR(6) NOT NULL,
+    vehicle_id INT NOT NULL,
+    variant INT NOT NULL,
+    manufacturer_name VARCHAR(100),
+    model_name VARCHAR(200),
+    changed_columns VARCHAR(1000),
+    before_values JSON,
+    after_values JSON,
+    captured_at DATETIME,
+    INDEX idx_changes_generation (generation),
+    INDEX idx_changes_vehicle (vehicle_id, variant)
 );
 """
-cursor.execute(brand_summary_sql)
-log("Created table: gold_brand_summary")
 
-conn.commit()
-cursor.close()
-conn.close()
+# One row per generation whose changes were captured, even when there were
+# none; gold_load.py checks it before dropping *_prev
+cdc_capture_sql = """
+CREATE TABLE IF NOT EXISTS gold_cdc_capture (
+    generation BIGINT PRIMARY KEY,
+    run_id VARCHAR(64),
+    events INT NOT NULL,
+    captured_at DATETIME
+);
+"""
+
+generation_sql = """
+CREATE TABLE IF NOT EXISTS gold_load_generation (
+    id TINYINT PRIMARY KEY,
+    generation BIGINT NOT NULL,
+    loaded_at DATETIME
+);
+"""
+
+def add_missing_columns(cursor, table, columns):
+    cursor.execute(f"""
+    SELECT column_name
+    FROM information_schema.columns
+    WHERE table_schema = 'DataWarehouse_gold' AND table_name = '{table}';
+    """)
+    existing = {r[0].lower() for r in cursor.fetchall()}
+    for column, column_type in columns:
+        if column not in existing:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type};")
+            log(f"Added column: {table}.{column}")
+
+# ============================
+# STAGE ENTRY POINT
+# ============================
+
+def run(ctx=None, recreate=False):
+    ctx = get_context(ctx)
+    pipeline_log.configure(ctx, "gold_ddl", "goldDDL")
+
+    # ============================
+    # MYSQL CONNECTION
+    # ============================
+
+    conn = db.connect()
+    cursor = conn.cursor()
+
+    log("Starting Gold DDL...")
+
+    # ============================
+    # CREATE DATABASE
+    # ============================
+
+    cursor.execute("CREATE DATABASE IF NOT EXISTS DataWarehouse_gold;")
+    cursor.execute("USE DataWarehouse_gold;")
+    log("Database created/selected: DataWarehouse_gold")
+
+    # Tables are only created when missing, so rerunning the DDL never empties
+    # what dashboards are reading. Pass --recreate to drop every generation
+    # (live, shadow and previous) after a schema change.
+    if recreate:
+        for table in gold_tables.GOLD_TABLES:
+            for name in (table, gold_tables.shadow(table), gold_tables.prev(table)):
+                cursor.execute(f"DROP TABLE IF EXISTS {name};")
+        log("Dropped all gold table generations (--recreate).")
+
+    # ============================
+    # CREATE gold_ev_summary TABLE
+    # ============================
+
+    cursor.execute(ev_summary_sql)
+    add_missing_columns(cursor, "gold_ev_summary", ev_summary_added_columns)
+    log("Ensured table: gold_ev_summary")
+
+    # ============================
+    # CREATE gold_brand_summary TABLE
+    # ============================
+
+    cursor.execute(brand_summary_sql)
+    add_missing_columns(cursor, "gold_brand_summary", brand_summary_added_columns)
+    log("Ensured table: gold_brand_summary")
+
+    # ============================
+    # CREATE gold_brand_sketch TABLE
+    # ============================
+
+    cursor.execute(brand_sketch_sql)
+    log("Ensured table: gold_brand_sketch")
+
+    # ============================
+    # CREATE gold_pareto_frontier TABLE
+    # ============================
+
+    cursor.execute(pareto_sql)
+    log("Ensured table: gold_pareto_frontier")
+
+    # ============================
+    # CREATE gold_ev_changes TABLE
+    # ============================
+
+    cursor.execute(changes_sql)
+    log("Ensured table: gold_ev_changes")
+
+    cursor.execute(cdc_capture_sql)
+    log("Ensured table: gold_cdc_capture")
+
+    # ============================
+    # CREATE gold_load_generation TABLE
+    # ============================
+    # Single-row counter bumped by gold_load.py on every successful commit.
+    # gold_api.py watches it to invalidate its result cache. The table is
+    # never dropped, so the counter keeps increasing across DDL reruns.
+
+    cursor.execute(generation_sql)
+    cursor.execute("INSERT IGNORE INTO gold_load_generation (id, generation, loaded_at) VALUES (1, 0, NULL);")
+    log("Ensured table: gold_load_generation")
+
+    conn.commit()
+    cursor.close()
+    conn.close()
 
-log("Gold DDL completed successfully.")
+    log("Gold DDL completed successfully.")
 
+if __name__ == "__main__":
+    recreate = "--recreate" in sys.argv
+    metrics.run_stage(get_context(), logger.stage, lambda ctx: run(ctx, recreate=recreate))
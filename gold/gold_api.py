@@ -0,0 +1,425 @@
+import mysql.connector
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import OrderedDict, deque
+from datetime import datetime, date
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, unquote
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from common import db, pipeline_log
+from common.context import get_context
+from gold import gold_neighbours, gold_sketches
+
+# ============================
+# Logging setup
+# ============================
+
+logger = pipeline_log.get_logger("gold_api")
+
+def log(msg: str, level=pipeline_log.INFO):
+    logger.log(level, msg)
+
+# ============================
+# Settings
+# ============================
+
+API_HOST = os.environ.get("EV_API_HOST", "127.0.0.1")
+API_PORT = int(os.environ.get("EV_API_PORT", "8080"))
+
+POOL_SIZE = int(os.environ.get("EV_API_POOL_SIZE", "5"))
+
+CACHE_MAX_ENTRIES = int(os.environ.get("EV_API_CACHE_ENTRIES", "256"))
+CACHE_TTL_SECONDS = float(os.environ.get("EV_API_CACHE_TTL", "300"))
+
+# How often the load generation is re-read from MySQL. Requests inside
+# this window reuse the last known generation instead of paying a query.
+GENERATION_POLL_SECONDS = float(os.environ.get("EV_API_GENERATION_POLL", "1.0"))
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+# Views from gold_views.sql that may be queried by name.
+GOLD_VIEWS = {
+    "vw_top_value_evs",
+    "vw_best_price_per_kwh",
+    "vw_top_performance",
+    "vw_best_efficiency",
+    "vw_range_vs_price",
+    "vw_top_charging_vehicles",
+    "vw_cheapest_evs",
+    "vw_premium_evs",
+    "vw_brand_averages",
+    "vw_best_price_per_weight",
+    "vw_ev_analytics",
+    "vw_pareto_frontiers",
+}
+
+# Query-string filters accepted by /summary -> gold_ev_summary column.
+SUMMARY_FILTERS = {
+    "manufacturer": "manufacturer_name",
+    "model": "model_name",
+    "class": "class",
+    "drivetrain": "drivetrain",
+}
+
+# ============================
+# MYSQL CONNECTION POOL
+# ============================
+
+# Created by serve() from the shared pool module (common/db.py), so
+# importing this module opens no connections
+db_pool = None
+
+def create_pool():
+    return db.get_pool("gold_api", size=POOL_SIZE, database="DataWarehouse_gold")
+
+def fetch_all(sql, params=None):
+    # db.connect() waits for a free slot, so a burst of requests larger
+    # than the pool queues instead of failing with PoolError (503)
+    conn = db.connect("gold_api")
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(sql, params or ())
+        rows = cursor.fetchall()
+        cursor.close()
+        # End the implicit read transaction so the next query sees new loads
+        conn.rollback()
+        return rows
+    finally:
+        conn.close()
+
+# ============================
+# LOAD GENERATION WATCHER
+# ============================
+
+class GenerationWatcher:
+    def __init__(self, poll_seconds):
+        self.poll_seconds = poll_seconds
+        self.generation = None
+        self.checked_at = 0.0
+        self.lock = threading.Lock()
+
+    def current(self):
+        with self.lock:
+            if time.monotonic() - self.checked_at < self.poll_seconds:
+                return self.generation
+            rows = fetch_all("SELECT generation FROM gold_load_generation WHERE id = 1;")
+            self.generation = rows[0]["generation"] if rows else 0
+            self.checked_at = time.monotonic()
+            return self.generation
+
+# ============================
+# LRU / TTL RESULT CACHE
+# ============================
+
+class ResultCache:
+    def __init__(self, max_entries, ttl_seconds):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict()
+        self.generation = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.lock = threading.Lock()
+
+    def _check_generation(self, generation):
+        if generation != self.generation:
+            if self.entries:
+                self.invalidations += 1
+            self.entries.clear()
+            self.generation = generation
+
+    def get(self, key, generation):
+        with self.lock:
+            self._check_generation(generation)
+            entry = self.entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl_seconds:
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, generation, value):
+        with self.lock:
+            # A load finished while this query ran: don't cache a stale result
+            if generation != self.generation:
+                return
+            self.entries[key] = (time.monotonic(), value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "invalidations": self.invalidations,
+                "generation": self.generation,
+            }
+
+# ============================
+# LATENCY TRACKING
+# ============================
+
+class LatencyTracker:
+    def __init__(self, window=10000):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def record(self, seconds):
+        with self.lock:
+            self.samples.append(seconds)
+            self.count += 1
+
+    def percentile(self, ordered, pct):
+        if not ordered:
+            return None
+        idx = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+        return round(ordered[idx] * 1000, 3)
+
+    def stats(self):
+        with self.lock:
+            ordered = sorted(self.samples)
+            count = self.count
+        return {
+            "requests": count,
+            "window": len(ordered),
+            "p50_ms": self.percentile(ordered, 50),
+            "p99_ms": self.percentile(ordered, 99),
+            "max_ms": round(ordered[-1] * 1000, 3) if ordered else None,
+        }
+
+generation_watcher = GenerationWatcher(GENERATION_POLL_SECONDS)
+result_cache = ResultCache(CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS)
+latency = LatencyTracker()
+
+# ============================
+# QUERIES
+# ============================
+
+def parse_limit(params):
+    try:
+        limit = int(params.get("limit", [DEFAULT_LIMIT])[0])
+        offset = int(params.get("offset", [0])[0])
+    except ValueError:
+        raise ApiError(400, "limit and offset must be integers")
+    return max(1, min(limit, MAX_LIMIT)), max(0, offset)
+
+def query_summary(params):
+    where = []
+    args = []
+    for key, column in SUMMARY_FILTERS.items():
+        if key in params:
+            where.append(f"{column} = %s")
+            args.append(params[key][0])
+    limit, offset = parse_limit(params)
+
+    sql = "SELECT * FROM gold_ev_summary"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY ev_id LIMIT %s OFFSET %s;"
+    return fetch_all(sql, args + [limit, offset])
+
+def query_brands(params):
+    limit, offset = parse_limit(params)
+    return fetch_all(
+        "SELECT * FROM gold_brand_summary ORDER BY manufacturer_name LIMIT %s OFFSET %s;",
+        [limit, offset]
+    )
+
+def query_brand_quantiles(manufacturer, params):
+    # Answered from the brand's t-digest in gold_brand_sketch, never from
+    # the fact rows: ?metric=price|range|efficiency&q=0.5,0.9[&class=...]
+    metric = params.get("metric", ["price"])[0]
+    if metric not in gold_sketches.METRICS.values():
+        raise ApiError(400, f"metric must be one of: {', '.join(gold_sketches.METRICS.values())}")
+    try:
+        quantiles = [float(q) for value in params.get("q", ["0.5"]) for q in value.split(",")]
+    except ValueError:
+        raise ApiError(400, "q must be a number between 0 and 1")
+    if not all(0 <= q <= 1 for q in quantiles):
+        raise ApiError(400, "q must be a number between 0 and 1")
+
+    vehicle_class = params.get("class", [None])[0]
+    sql = ("SELECT manufacturer_name, class, listings, cumulative_models, "
+           f"{metric}_digest AS digest FROM gold_brand_sketch WHERE manufacturer_name = %s AND ")
+    if vehicle_class is None:
+        rows = fetch_all(sql + "class IS NULL;", [manufacturer])
+    else:
+        rows = fetch_all(sql + "class = %s;", [manufacturer, vehicle_class])
+    if not rows:
+        raise ApiError(404, f"no sketch for {manufacturer}" + (f" / {vehicle_class}" if vehicle_class else ""))
+
+    row = rows[0]
+    digest = gold_sketches.TDigest.from_json(row.pop("digest"))
+    values = {str(q): digest.quantile(q) for q in quantiles}
+    return {**row, "metric": metric,
+            "quantiles": {q: None if v is None else round(v, 2) for q, v in values.items()}}
+
+def query_view(name, params):
+    if name not in GOLD_VIEWS:
+        raise ApiError(404, f"unknown view: {name}")
+    limit, offset = parse_limit(params)
+    # View name is whitelisted above, so it is safe to format in
+    return fetch_all(f"SELECT * FROM {name} LIMIT %s OFFSET %s;", [limit, offset])
+
+# The comparable-vehicles index is reloaded from disk whenever the
+# load generation changes, since gold_load.py rewrites it on every run.
+neighbour_state = {"generation": None, "index": None}
+neighbour_lock = threading.Lock()
+
+def query_comparable(params):
+    try:
+        ev_id = int(params["ev_id"][0])
+        k = int(params.get("k", [10])[0])
+    except (KeyError, ValueError):
+        raise ApiError(400, "ev_id (integer) is required; k must be an integer")
+    k = max(1, min(k, MAX_LIMIT))
+
+    generation = generation_watcher.current()
+    with neighbour_lock:
+        if neighbour_state["index"] is None or neighbour_state["generation"] != generation:
+            try:
+                neighbour_state["index"] = gold_neighbours.load_index()
+            except FileNotFoundError:
+                raise ApiError(503, "comparable-vehicles index not built yet")
+            neighbour_state["generation"] = generation
+        index = neighbour_state["index"]
+
+    try:
+        return gold_neighbours.nearest(
+            index, ev_id, k,
+            vehicle_class=params.get("class", [None])[0],
+            drivetrain=params.get("drivetrain", [None])[0]
+        )
+    except KeyError:
+        raise ApiError(404, f"unknown ev_id: {ev_id}")
+
+def cached(key, loader):
+    generation = generation_watcher.current()
+    rows = result_cache.get(key, generation)
+    if rows is None:
+        rows = loader()
+        result_cache.put(key, generation, rows)
+    return rows
+
+# ============================
+# HTTP HANDLER
+# ============================
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+def json_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+class GoldApiHandler(BaseHTTPRequestHandler):
+    server_version = "EVGoldAPI/1.0"
+
+    def do_GET(self):
+        start = time.perf_counter()
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        parts = [p for p in url.path.split("/") if p]
+        # Sorted so that ?a=1&b=2 and ?b=2&a=1 share a cache entry
+        cache_key = (url.path, tuple(sorted((k, tuple(v)) for k, v in params.items())))
+
+        try:
+            if parts == ["health"]:
+                status, body = 200, {"status": "ok"}
+            elif parts == ["metrics"]:
+                status, body = 200, {
+                    "latency": latency.stats(),
+                    "cache": result_cache.stats(),
+                }
+            elif parts == ["summary"]:
+                status, body = 200, cached(cache_key, lambda: query_summary(params))
+            elif parts == ["brands"]:
+                status, body = 200, cached(cache_key, lambda: query_brands(params))
+            elif len(parts) == 3 and parts[0] == "brands" and parts[2] == "quantiles":
+                status, body = 200, cached(
+                    cache_key, lambda: query_brand_quantiles(unquote(parts[1]), params))
+            elif parts == ["comparable"]:
+                status, body = 200, query_comparable(params)
+            elif len(parts) == 2 and parts[0] == "views":
+                status, body = 200, cached(cache_key, lambda: query_view(parts[1], params))
+            else:
+                raise ApiError(404, f"unknown path: {url.path}")
+        except ApiError as e:
+            status, body = e.status, {"error": e.message}
+        except mysql.connector.Error as e:
+            log(f" SQL ERROR serving {self.path}: {e}", pipeline_log.ERROR)
+            status, body = 503, {"error": "database unavailable"}
+        except Exception as e:
+            log(f" ERROR serving {self.path}: {e}", pipeline_log.ERROR)
+            traceback.print_exc()
+            status, body = 500, {"error": "internal error"}
+
+        payload = json.dumps(body, default=json_default).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+        if parts != ["metrics"]:
+            latency.record(time.perf_counter() - start)
+
+    def log_message(self, format, *args):
+        # Per-request access logging is skipped; /metrics carries the numbers
+        pass
+
+# ============================
+# MAIN
+# ============================
+
+def serve(ctx=None):
+    global db_pool
+
+    ctx = get_context(ctx)
+    pipeline_log.configure(ctx, "gold_api", "gold_api")
+    db_pool = create_pool()
+
+    log("Starting Gold read API...")
+    log(f"Listening on http://{API_HOST}:{API_PORT} (pool size {POOL_SIZE}, "
+        f"cache {CACHE_MAX_ENTRIES} entries / {CACHE_TTL_SECONDS}s TTL)")
+
+    server = ThreadingHTTPServer((API_HOST, API_PORT), GoldApiHandler)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        log("Shutting down Gold read API...")
+    finally:
+        server.server_close()
+        log(f"Final metrics: {json.dumps({'latency': latency.stats(), 'cache': result_cache.stats()}, default=json_default)}")
+
+if __name__ == "__main__":
+    serve()
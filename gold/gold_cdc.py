@@ -0,0 +1,361 @@
+import hashlib
+import json
+import os
+import sys
+import time
+import traceback
+from datetime import datetime
+from decimal import Decimal
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from common import db, metrics, pipeline_log, slow_query
+from common.context import get_context
+from gold import gold_tables
+
+HEAVY_IMPORTS = ("mysql.connector",)
+
+# =====================================================
+# GOLD CHANGE-DATA CAPTURE (PRICE / SPEC CHANGES)
+# =====================================================
+# After every gold load, diffs the live gold_ev_summary against the
+# generation it replaced (gold_ev_summary_prev) and records one event per
+# vehicle variant that appeared, changed or disappeared:
+#   - insert: after_values holds the new row
+#   - update: changed_columns lists what moved; before/after hold only those
+#   - delete: before_values holds the row that was dropped
+#
+# Rows are matched on (vehicle_id, variant), the stable silver vehicle id
+# and a hash of the listing's specs without its price (gold_load.py), never
+# on names or on a listing's position. Listings of one vehicle that differ
+# only in price share a key, so a key holds a list of rows. Each row is
+# reduced to an 8-byte hash of its values, so the diff is:
+#   1. stream _prev      -> key -> [hash, ...]   (ints only in memory)
+#   2. stream live       -> a hash still under its key is unchanged; one
+#                           new row against one old row left under a key,
+#                           or else within the vehicle, is an update; other
+#                           new rows are inserts, old rows left are deletes
+#   3. stream _prev again for the before-values of updated / deleted rows
+#
+# Events are appended to gold_ev_changes (never truncated) and written to
+# gold/output/cdc/gold_ev_changes_<generation>.ndjson, and the generation
+# is recorded in gold_cdc_capture, even with no events. A recorded
+# generation is skipped, so re-running the stage is harmless, and
+# gold_load.py captures an unrecorded one itself before dropping *_prev.
+# Without a usable _prev (first load, or a _prev from before vehicle_id
+# existed) every live row is emitted as an insert.
+
+CDC_DIR = os.path.join(SCRIPT_DIR, "output", "cdc")
+
+KEY_COLUMNS = ["vehicle_id", "variant"]
+VALUE_COLUMNS = [
+    "manufacturer_name", "model_name", "drivetrain", "class", "seat",
+    "range_miles", "battery_kwh", "efficiency_whpm", "zero_to_sixty_sec",
+    "weight_kg", "rapidcharge_kw", "towing_kg", "boot_space_liters", "price_gbp",
+    "price_per_kwh", "price_per_mile", "value_score", "performance_score",
+    "efficiency_score", "charging_score", "price_per_weight",
+]
+
+FETCH_ROWS = 10_000
+
+SOURCE_TABLE = gold_tables.GOLD_TABLES[0]
+
+insert_change_sql = """
+INSERT INTO gold_ev_changes (
+    generation, run_id, event_type, vehicle_id, variant,
+    manufacturer_name, model_name, changed_columns,
+    before_values, after_values, captured_at
+)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s);
+"""
+
+insert_capture_sql = """
+INSERT INTO gold_cdc_capture (generation, run_id, events, captured_at)
+VALUES (%s, %s, %s, %s);
+"""
+
+# ============================
+# Logging setup
+# ============================
+
+logger = pipeline_log.get_logger("gold_cdc")
+
+def log(msg: str, level=pipeline_log.INFO):
+    logger.log(level, msg)
+
+def safe_execute(cursor, sql, step="UNKNOWN"):
+    status = slow_query.before(logger.stage, cursor)
+    start = time.perf_counter()
+    try:
+        cursor.execute(sql)
+    except Exception as e:
+        log(f" ERROR during {step}: {e}", pipeline_log.ERROR)
+        traceback.print_exc()
+        raise
+    elapsed = time.perf_counter() - start
+    metrics.record_sql(logger.stage, step, elapsed, cursor.rowcount)
+    slow_query.after(logger.stage, step, cursor, sql, None, elapsed, status)
+
+def safe_executemany(cursor, sql, rows, step="UNKNOWN"):
+    status = slow_query.before(logger.stage, cursor)
+    start = time.perf_counter()
+    try:
+        cursor.executemany(sql, rows)
+    except Exception as e:
+        log(f" ERROR during {step}: {e}", pipeline_log.ERROR)
+        traceback.print_exc()
+        raise
+    elapsed = time.perf_counter() - start
+    metrics.record_sql(logger.stage, step, elapsed, cursor.rowcount)
+    slow_query.after(logger.stage, step, cursor, sql, None, elapsed, status, plan=False)
+
+# =====================================================
+# DIFF
+# =====================================================
+
+def row_hash(values):
+    h = hashlib.blake2b(digest_size=8)
+    for value in values:
+        h.update(b"\x00" if value is None else str(value).encode("utf-8"))
+        h.update(b"\x1f")
+    return int.from_bytes(h.digest(), "big")
+
+def plain(value):
+    # JSON-safe value; DECIMAL columns arrive as Decimal
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+def as_dict(columns, values):
+    return {c: plain(v) for c, v in zip(columns, values)}
+
+def select_sql(table):
+    return ("SELECT " + ", ".join(KEY_COLUMNS + VALUE_COLUMNS) + f" FROM {table} "
+            "WHERE vehicle_id IS NOT NULL ORDER BY vehicle_id, variant;")
+
+def stream(cursor, sql, batch_rows=FETCH_ROWS):
+    # (key, values) per row, fetched in batches
+    cursor.execute(sql)
+    width = len(KEY_COLUMNS)
+    while True:
+        rows = cursor.fetchmany(batch_rows)
+        if not rows:
+            break
+        for row in rows:
+            yield tuple(row[:width]), row[width:]
+
+def diff(cursor, live, prev):
+    # (event_type, key, (manufacturer, model), before dict or None, after
+    # dict or None) per event; prev is None when there is nothing to
+    # compare against. Names come from the live row, or the old one for
+    # a delete.
+    previous = {}
+    if prev:
+        for key, values in stream(cursor, select_sql(prev)):
+            previous.setdefault(key, []).append(row_hash(values))
+
+    added = {}        # key -> live rows whose hash is not under the key
+    for key, values in stream(cursor, select_sql(live)):
+        old = previous.get(key)
+        h = row_hash(values)
+        if old and h in old:
+            old.remove(h)
+        else:
+            added.setdefault(key, []).append(values)
+
+    # One new row against one old row is the same listing changed: first
+    # under the same key (a price change), then within the vehicle (a spec
+    # change, which moves the listing to another variant)
+    updated = {}      # (old key, old hash) -> (key, after values), until the before values are read
+    vehicles = {}     # vehicle id -> [new rows left], [old rows left]
+    for key, rows in added.items():
+        old = previous.get(key)
+        if old and len(old) == 1 and len(rows) == 1:
+            updated[(key, old.pop())] = (key, rows[0])
+            continue
+        vehicles.setdefault(key[0], ([], []))[0].extend((key, values) for values in rows)
+    for key, old in previous.items():
+        if old and key[0] in vehicles:
+            vehicles[key[0]][1].extend((key, h) for h in old)
+
+    events = []
+    for new_rows, old_rows in vehicles.values():
+        if len(new_rows) == 1 and len(old_rows) == 1:
+            old_key, h = old_rows[0]
+            previous[old_key].remove(h)
+            updated[(old_key, h)] = new_rows[0]
+            continue
+        for key, values in new_rows:
+            events.append(("insert", key, values[:2], None, as_dict(VALUE_COLUMNS, values)))
+    # Hashes still in previous were not in the live table
+    deleted = {key: old for key, old in previous.items() if old}
+
+    if updated or deleted:
+        for key, values in stream(cursor, select_sql(prev)):
+            h = row_hash(values)
+            if (key, h) in updated:
+                new_key, after = updated.pop((key, h))
+                changed = [i for i, (a, b) in enumerate(zip(values, after)) if a != b]
+                columns = [VALUE_COLUMNS[i] for i in changed]
+                events.append(("update", new_key, after[:2],
+                               as_dict(columns, [values[i] for i in changed]),
+                               as_dict(columns, [after[i] for i in changed])))
+            elif h in deleted.get(key, ()):
+                deleted[key].remove(h)
+                events.append(("delete", key, values[:2], as_dict(VALUE_COLUMNS, values), None))
+    return events
+
+def change_rows(events, generation, run_id, captured_at):
+    rows = []
+    for event_type, (vehicle_id, variant), (manufacturer, model), before, after in events:
+        changed = list(after) if event_type == "update" else []
+        rows.append({
+            "generation": generation,
+            "run_id": run_id,
+            "event_type": event_type,
+            "vehicle_id": vehicle_id,
+            "variant": variant,
+            "manufacturer_name": manufacturer,
+            "model_name": model,
+            "changed_columns": ",".join(changed) or None,
+            "before_values": before,
+            "after_values": after,
+            "captured_at": captured_at,
+        })
+    return rows
+
+# =====================================================
+# OUTPUT
+# =====================================================
+
+def write_ndjson(rows, generation, directory=CDC_DIR):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"gold_ev_changes_{generation}.ndjson")
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, default=str, separators=(",", ":")) + "\n")
+    os.replace(tmp_path, path)
+    return path
+
+def db_params(row):
+    return (
+        row["generation"], row["run_id"], row["event_type"], row["vehicle_id"],
+        row["variant"], row["manufacturer_name"], row["model_name"], row["changed_columns"],
+        None if row["before_values"] is None else json.dumps(row["before_values"]),
+        None if row["after_values"] is None else json.dumps(row["after_values"]),
+        row["captured_at"],
+    )
+
+# =====================================================
+# CAPTURE
+# =====================================================
+
+def capture(cursor, run_id):
+    # Diffs the live generation against *_prev and records its events and
+    # its gold_cdc_capture row; the caller commits. Returns the number of
+    # events, or None when the generation was already captured. Also called
+    # by gold_load.py before it drops *_prev, so a generation whose
+    # gold_cdc stage never ran is not lost.
+    cursor.execute("SELECT generation FROM gold_load_generation WHERE id = 1;")
+    generation = cursor.fetchone()[0]
+
+    cursor.execute("SELECT events FROM gold_cdc_capture WHERE generation = %s;", (generation,))
+    recorded = cursor.fetchone()
+    if recorded:
+        log(f"Generation {generation} already captured ({recorded[0]} events); nothing to do.")
+        return None
+
+    # ============================
+    # PREVIOUS GENERATION
+    # ============================
+
+    cursor.execute("""
+    SELECT table_name, column_name
+    FROM information_schema.columns
+    WHERE table_schema = 'DataWarehouse_gold';
+    """)
+    columns = {}
+    for table, column in cursor.fetchall():
+        columns.setdefault(table.lower(), set()).add(column.lower())
+
+    prev = gold_tables.prev(SOURCE_TABLE)
+    if not set(KEY_COLUMNS) <= columns.get(prev, set()):
+        log(f"No comparable {prev}; emitting the live table as inserts.", pipeline_log.WARNING)
+        prev = None
+
+    # ============================
+    # DIFF LIVE vs PREVIOUS
+    # ============================
+
+    log(f"Diffing {SOURCE_TABLE} against {prev or 'nothing'}...")
+
+    start = time.perf_counter()
+    try:
+        events = diff(cursor, SOURCE_TABLE, prev)
+    except Exception as e:
+        log(f" ERROR during DIFF {SOURCE_TABLE}: {e}", pipeline_log.ERROR)
+        traceback.print_exc()
+        raise
+    elapsed = time.perf_counter() - start
+
+    counts = {"insert": 0, "update": 0, "delete": 0}
+    for event in events:
+        counts[event[0]] += 1
+    log(f"Generation {generation}: {counts['insert']} inserts, {counts['update']} updates, "
+        f"{counts['delete']} deletes ({elapsed:.2f}s)")
+
+    # ============================
+    # WRITE EVENTS
+    # ============================
+    # The NDJSON file is written first: if the insert below fails the stage
+    # can simply be re-run, and the file is rewritten for the same generation.
+
+    captured_at = datetime.now().replace(microsecond=0)
+    rows = change_rows(events, generation, run_id, captured_at)
+    path = write_ndjson(rows, generation)
+    log(f"Change events written: {path}")
+
+    if rows:
+        safe_executemany(cursor, insert_change_sql, [db_params(r) for r in rows],
+                         "INSERT gold_ev_changes")
+    cursor.execute(insert_capture_sql, (generation, run_id, len(rows), captured_at))
+    log(f"gold_ev_changes rows inserted: {len(rows)}")
+    return len(rows)
+
+# ============================
+# STAGE ENTRY POINT
+# ============================
+
+def run(ctx=None):
+    ctx = get_context(ctx)
+    pipeline_log.configure(ctx, "gold_cdc", "gold_cdc")
+
+    # ============================
+    # MYSQL CONNECTION
+    # ============================
+
+    log("Starting Gold CDC...")
+
+    conn = db.connect()
+    cursor = conn.cursor()
+
+    safe_execute(cursor, "USE DataWarehouse_gold;", "USE DataWarehouse_gold")
+
+    captured = capture(cursor, ctx.run_id)
+    conn.commit()
+
+    cursor.close()
+    conn.close()
+
+    if captured is None:
+        return 0
+
+    log("Gold CDC completed successfully.")
+    return captured
+
+if __name__ == "__main__":
+    metrics.run_stage(get_context(), logger.stage, run)
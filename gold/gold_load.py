@@ -1,63 +1,60 @@
-import mysql.connector
 import traceback
 import os
-from datetime import datetime
+import sys
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from common import db, metrics, pipeline_log, slow_query
+from common.context import get_context
+from gold import gold_cdc, gold_neighbours, gold_pareto, gold_sketches, gold_tables
+
+HEAVY_IMPORTS = ("mysql.connector",)
 
 # ============================
 # Logging setup
 # ============================
 
-SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-PROJECT_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, ".."))
-LOG_DIR = os.path.join(PROJECT_ROOT, "logs")
-os.makedirs(LOG_DIR, exist_ok=True)
-
-log_filename = f"gold_load_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
-log_path = os.path.join(LOG_DIR, log_filename)
+logger = pipeline_log.get_logger("gold_load")
 
-def log(msg: str):
-    ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    line = f"[{ts}] {msg}"
-    print(line)
-    with open(log_path, "a", encoding="utf-8") as f:
-        f.write(line + "\n")
+def log(msg: str, level=pipeline_log.INFO):
+    logger.log(level, msg)
 
 def safe_execute(cursor, sql, step="UNKNOWN"):
+    status = slow_query.before(logger.stage, cursor)
+    start = time.perf_counter()
     try:
         cursor.execute(sql)
     except Exception as e:
-        log(f" ERROR during {step}: {e}")
+        log(f" ERROR during {step}: {e}", pipeline_log.ERROR)
         traceback.print_exc()
         raise
+    elapsed = time.perf_counter() - start
+    metrics.record_sql(logger.stage, step, elapsed, cursor.rowcount)
+    slow_query.after(logger.stage, step, cursor, sql, None, elapsed, status)
 
-# ============================
-# MYSQL CONNECTION
-# ============================
-
-log("Starting Gold Load...")
-
-conn = mysql.connector.connect(
-    host="localhost",
-    user="EV_specs",
-    password="MDIS@2025"
-)
-cursor = conn.cursor()
-
-safe_execute(cursor, "CREATE DATABASE IF NOT EXISTS DataWarehouse_gold;", "CREATE DB")
-safe_execute(cursor, "USE DataWarehouse_gold;", "USE DataWarehouse_gold")
-
-# Clear tables
-safe_execute(cursor, "TRUNCATE TABLE gold_ev_summary;", "TRUNCATE gold_ev_summary")
-safe_execute(cursor, "TRUNCATE TABLE gold_brand_summary;", "TRUNCATE gold_brand_summary")
+def safe_executemany(cursor, sql, rows, step="UNKNOWN"):
+    status = slow_query.before(logger.stage, cursor)
+    start = time.perf_counter()
+    try:
+        cursor.executemany(sql, rows)
+    except Exception as e:
+        log(f" ERROR during {step}: {e}", pipeline_log.ERROR)
+        traceback.print_exc()
+        raise
+    elapsed = time.perf_counter() - start
+    metrics.record_sql(logger.stage, step, elapsed, cursor.rowcount)
+    slow_query.after(logger.stage, step, cursor, sql, None, elapsed, status, plan=False)
 
 # ============================
-# LOAD gold_ev_summary
+# GOLD SQL
 # ============================
 
-log("Loading gold_ev_summary...")
-
 ev_sql = """
-INSERT INTO gold_ev_summary (
+INSERT INTO gold_ev_summary_shadow (
     manufacturer_name,
     model_name,
     drivetrain,
@@ -78,7 +75,9 @@ INSERT INTO gold_ev_summary (
     performance_score,
     efficiency_score,
     charging_score,
-    price_per_weight
+    price_per_weight,
+    vehicle_id,
+    variant
 )
 SELECT
     m.manufacturer_name,
@@ -129,7 +128,28 @@ SELECT
     -- price per kg
     CASE WHEN s.weight_kg > 0 AND s.price_gbp > 0
         THEN ROUND(s.price_gbp / s.weight_kg, 4)
-        ELSE NULL END
+        ELSE NULL END,
+
+    -- row key for gold_cdc.py: vehicle ids are stable across runs, and the
+    -- variant is a hash of the listing's own specs, never its position
+    -- among the vehicle's listings, so adding or dropping a listing leaves
+    -- the others' keys alone. Drivetrain and market belong to the vehicle;
+    -- price is left out, so a price change is an update of the same
+    -- variant. Listings that differ only in price share a variant and are
+    -- told apart by gold_cdc.py. 31 bits for the INT column; NULL becomes ''
+    -- so it keeps its place in the key.
+    v.vehicle_id,
+    CRC32(CONCAT_WS('|',
+        COALESCE(CAST(s.battery_kwh AS CHAR), ''),
+        COALESCE(CAST(s.range_miles AS CHAR), ''),
+        COALESCE(CAST(s.efficiency_whpm AS CHAR), ''),
+        COALESCE(CAST(s.weight_kg AS CHAR), ''),
+        COALESCE(CAST(s.zero_to_sixty_sec AS CHAR), ''),
+        COALESCE(CAST(s.one_stop_range_miles AS CHAR), ''),
+        COALESCE(CAST(s.rapidcharge_kw AS CHAR), ''),
+        COALESCE(CAST(s.towing_kg AS CHAR), ''),
+        COALESCE(CAST(s.boot_space_liters AS CHAR), '')
+    )) & 2147483647
 
 FROM DataWarehouse_silver.silver_vehicle v
 JOIN DataWarehouse_silver.silver_manufacturer m
@@ -138,20 +158,8 @@ JOIN DataWarehouse_silver.silver_specs s
     ON s.vehicle_id = v.vehicle_id;
 """
 
-safe_execute(cursor, ev_sql, "INSERT gold_ev_summary")
-conn.commit()
-
-cursor.execute("SELECT COUNT(*) FROM gold_ev_summary;")
-log(f"gold_ev_summary rows inserted: {cursor.fetchone()[0]}")
-
-# ============================
-# LOAD gold_brand_summary
-# ============================
-
-log("Loading gold_brand_summary...")
-
 brand_sql = """
-INSERT INTO gold_brand_summary (
+INSERT INTO gold_brand_summary_shadow (
     manufacturer_name,
     model_count,
     avg_price_gbp,
@@ -172,19 +180,224 @@ SELECT
     ROUND(AVG(zero_to_sixty_sec), 2),
     MIN(price_gbp),
     MAX(price_gbp)
-FROM gold_ev_summary
+FROM gold_ev_summary_shadow
 WHERE price_gbp IS NOT NULL
 GROUP BY manufacturer_name;
 """
 
-safe_execute(cursor, brand_sql, "INSERT gold_brand_summary")
-conn.commit()
+brand_sketch_sql = """
+INSERT INTO gold_brand_sketch_shadow (
+    manufacturer_name, class, listings, price_digest, range_digest,
+    efficiency_digest, models_hll, cumulative_models
+)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s);
+"""
+
+brand_quantiles_sql = """
+UPDATE gold_brand_summary_shadow
+SET median_price_gbp = %s,
+    p90_price_gbp = %s,
+    median_range_miles = %s,
+    median_efficiency_whpm = %s,
+    cumulative_models = %s
+WHERE manufacturer_name = %s;
+"""
+
+pareto_sql = """
+INSERT INTO gold_pareto_frontier_shadow (
+    frontier_name, class, ev_id, manufacturer_name, model_name
+)
+VALUES (%s, %s, %s, %s, %s);
+"""
+
+generation_sql = """
+UPDATE gold_load_generation
+SET generation = generation + 1,
+    loaded_at = NOW()
+WHERE id = 1;
+"""
+
+# ============================
+# STAGE ENTRY POINT
+# ============================
+
+def run(ctx=None):
+    ctx = get_context(ctx)
+    pipeline_log.configure(ctx, "gold_load", "gold_load")
+
+    # ============================
+    # MYSQL CONNECTION
+    # ============================
+
+    log("Starting Gold Load...")
+
+    conn = db.connect()
+    if db.bulk_enabled():
+        bulk_settings = db.apply_bulk_session(conn)
+        log(f"Bulk mode: session settings applied: {', '.join(bulk_settings) or 'none'}")
+    cursor = conn.cursor()
+
+    safe_execute(cursor, "CREATE DATABASE IF NOT EXISTS DataWarehouse_gold;", "CREATE DB")
+    safe_execute(cursor, "USE DataWarehouse_gold;", "USE DataWarehouse_gold")
+
+    # Load into shadow copies; the live tables stay readable until the swap
+    for table in gold_tables.GOLD_TABLES:
+        for sql in gold_tables.prepare_shadow_sql(table):
+            safe_execute(cursor, sql, f"PREPARE {gold_tables.shadow(table)}")
+
+    # ============================
+    # LOAD gold_ev_summary
+    # ============================
+
+    log("Loading gold_ev_summary_shadow...")
+
+    safe_execute(cursor, ev_sql, "INSERT gold_ev_summary_shadow")
+    conn.commit()
+
+    cursor.execute("SELECT COUNT(*) FROM gold_ev_summary_shadow;")
+    log(f"gold_ev_summary rows inserted: {cursor.fetchone()[0]}")
+
+    # ============================
+    # LOAD gold_brand_summary
+    # ============================
+
+    log("Loading gold_brand_summary_shadow...")
+
+    safe_execute(cursor, brand_sql, "INSERT gold_brand_summary_shadow")
+    conn.commit()
+
+    cursor.execute("SELECT COUNT(*) FROM gold_brand_summary_shadow;")
+    log(f"gold_brand_summary rows inserted: {cursor.fetchone()[0]}")
+
+    # ============================
+    # LOAD gold_brand_sketch
+    # ============================
+    # Quantiles and model counts come from mergeable sketches built in one
+    # pass over the new priced rows (gold_sketches.py); the live table still
+    # holds the previous generation, whose model HLLs are merged in. Its
+    # digests are not: they describe the rows this load replaces.
+
+    log("Building brand sketches...")
+
+    cursor.execute("SELECT manufacturer_name, class, models_hll FROM gold_brand_sketch;")
+    previous = {(m, c): hll for m, c, hll in cursor.fetchall()}
+
+    cursor.execute(
+        "SELECT " + ", ".join(gold_sketches.SKETCH_COLUMNS) + " FROM gold_ev_summary_shadow "
+        "WHERE price_gbp IS NOT NULL ORDER BY ev_id;"
+    )
+    try:
+        sketches = gold_sketches.build(
+            [dict(zip(gold_sketches.SKETCH_COLUMNS, r)) for r in cursor.fetchall()], previous
+        )
+    except Exception as e:
+        log(f" ERROR during BUILD brand sketches: {e}", pipeline_log.ERROR)
+        traceback.print_exc()
+        raise
+    sketch_rows = gold_sketches.sketch_rows(sketches)
+    safe_executemany(cursor, brand_sketch_sql, sketch_rows, "INSERT gold_brand_sketch_shadow")
+    safe_executemany(cursor, brand_quantiles_sql, gold_sketches.summary_rows(sketches),
+                     "UPDATE gold_brand_summary_shadow quantiles")
+    conn.commit()
+
+    log(f"gold_brand_sketch rows inserted: {len(sketch_rows)} "
+        f"(previous generation: {len(previous)} sketches)")
+
+    # ============================
+    # BUILD COMPARABLE-VEHICLES INDEX
+    # ============================
+
+    log("Building comparable-vehicles index...")
+
+    cursor.execute(
+        "SELECT " + ", ".join(gold_neighbours.INDEX_COLUMNS) + " FROM gold_ev_summary_shadow;"
+    )
+    index_rows = [dict(zip(gold_neighbours.INDEX_COLUMNS, r)) for r in cursor.fetchall()]
+
+    try:
+        neighbour_index = gold_neighbours.build_index(index_rows)
+    except Exception as e:
+        log(f" ERROR during BUILD comparable index: {e}", pipeline_log.ERROR)
+        traceback.print_exc()
+        raise
+
+    # Written now, swapped in right after the tables: a failure to write
+    # it must not leave the new tables live without their generation bump
+    try:
+        index_tmp_path = gold_neighbours.write_index(neighbour_index)
+    except Exception as e:
+        log(f" ERROR during WRITE comparable index: {e}", pipeline_log.ERROR)
+        traceback.print_exc()
+        raise
+
+    log(f"Comparable-vehicles index built ({len(index_rows)} vehicles)")
+
+    # ============================
+    # LOAD gold_pareto_frontier
+    # ============================
+
+    log("Computing Pareto frontiers...")
+
+    cursor.execute(
+        "SELECT " + ", ".join(gold_pareto.FRONTIER_COLUMNS) + " FROM gold_ev_summary_shadow;"
+    )
+    frontier_rows = gold_pareto.compute_frontiers(
+        [dict(zip(gold_pareto.FRONTIER_COLUMNS, r)) for r in cursor.fetchall()]
+    )
+
+    safe_executemany(cursor, pareto_sql, frontier_rows, "INSERT gold_pareto_frontier_shadow")
+    conn.commit()
+
+    log(f"gold_pareto_frontier_shadow rows inserted: {len(frontier_rows)}")
+
+    # ============================
+    # PUBLISH NEW GENERATION
+    # ============================
+    # One RENAME TABLE swaps every shadow in at once; readers see either the
+    # old or the new generation, never an empty or half-filled table. The
+    # previous generation stays behind as *_prev for gold_rollback.py.
+    # The generation is bumped and committed straight after the RENAME,
+    # which tells readers (gold_api.py) that their cached results are
+    # stale; nothing that can fail runs between the two. The index, already
+    # written, is then swapped in with one os.replace.
+
+    log("Publishing new gold generation...")
+
+    # Dropping *_prev loses the changes of the generation now live unless
+    # they were captured; capture them here when gold_cdc has not run since
+    # the last load
+    missed = gold_cdc.capture(cursor, ctx.run_id)
+    conn.commit()
+    if missed is not None:
+        log(f"Captured {missed} change events of the outgoing generation before dropping *_prev",
+            pipeline_log.WARNING)
+
+    for sql in gold_tables.drop_prev_sql():
+        safe_execute(cursor, sql, "DROP previous generation")
+    safe_execute(cursor, gold_tables.publish_sql(), "RENAME shadow -> live")
+    safe_execute(cursor, generation_sql, "BUMP gold_load_generation")
+    conn.commit()
+
+    log(f"Published: {', '.join(gold_tables.GOLD_TABLES)}")
+
+    try:
+        gold_neighbours.publish_index(index_tmp_path)
+    except Exception as e:
+        log(f" ERROR during PUBLISH comparable index: {e}", pipeline_log.ERROR)
+        traceback.print_exc()
+        raise
+
+    log(f"Comparable-vehicles index written: {gold_neighbours.INDEX_PATH}")
 
-cursor.execute("SELECT COUNT(*) FROM gold_brand_summary;")
-log(f"gold_brand_summary rows inserted: {cursor.fetchone()[0]}")
+    cursor.execute("SELECT generation FROM gold_load_generation WHERE id = 1;")
+    generation = cursor.fetchone()[0]
+    log(f"Gold load generation: {generation}")
 
-cursor.close()
-conn.close()
+    cursor.close()
+    conn.close()
 
-log("Gold Load completed successfully.")
+    log("Gold Load completed successfully.")
+    return generation
 
+if __name__ == "__main__":
+    metrics.run_stage(get_context(), logger.stage, run)
@@ -0,0 +1,250 @@
+import heapq
+import math
+import os
+import pickle
+import sys
+import time
+from datetime import datetime
+
+# =====================================================
+# "COMPARABLE VEHICLES" NEAREST-NEIGHBOUR INDEX
+# =====================================================
+# A KD-tree over standardized gold_ev_summary specs. gold_load.py builds
+# it after every load and writes it next to the gold outputs; gold_api.py
+# and the CLI below answer top-k "cars like this one" queries from it
+# instead of self-joining gold_ev_summary in SQL.
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+INDEX_DIR = os.path.join(SCRIPT_DIR, "output")
+INDEX_PATH = os.path.join(INDEX_DIR, "comparable_vehicles.idx")
+# Index of the previous gold generation, kept for gold_rollback.py
+PREV_INDEX_PATH = os.path.join(INDEX_DIR, "comparable_vehicles_prev.idx")
+
+INDEX_VERSION = 1
+
+FEATURES = [
+    "range_miles",
+    "battery_kwh",
+    "efficiency_whpm",
+    "zero_to_sixty_sec",
+    "price_gbp",
+    "weight_kg",
+    "boot_space_liters",
+]
+
+# Columns gold_load.py must select, in this order
+INDEX_COLUMNS = ["ev_id", "manufacturer_name", "model_name", "class", "drivetrain"] + FEATURES
+
+LEAF_SIZE = 8
+
+# =====================================================
+# BUILD
+# =====================================================
+
+def standardize(rows):
+    # z-score each feature; missing values are imputed with the mean (0.0)
+    columns = list(zip(*[[row[f] for f in FEATURES] for row in rows])) if rows else [[] for _ in FEATURES]
+    means, stds = [], []
+    for values in columns:
+        present = [float(v) for v in values if v is not None]
+        mean = sum(present) / len(present) if present else 0.0
+        var = sum((v - mean) ** 2 for v in present) / len(present) if present else 0.0
+        means.append(mean)
+        stds.append(math.sqrt(var) or 1.0)
+
+    points = []
+    for row in rows:
+        points.append(tuple(
+            0.0 if row[f] is None else (float(row[f]) - means[i]) / stds[i]
+            for i, f in enumerate(FEATURES)
+        ))
+    return points, means, stds
+
+def build_tree(points):
+    # Flat-array KD-tree. Internal nodes split on the axis with the widest
+    # spread; leaves hold up to LEAF_SIZE point indices.
+    tree = {"axis": [], "split": [], "left": [], "right": [], "leaf": []}
+
+    def new_node():
+        for key in tree:
+            tree[key].append(None)
+        return len(tree["axis"]) - 1
+
+    def build(idxs):
+        node = new_node()
+        if len(idxs) <= LEAF_SIZE:
+            tree["leaf"][node] = idxs
+            return node
+
+        dims = len(points[idxs[0]])
+        spreads = []
+        for axis in range(dims):
+            vals = [points[i][axis] for i in idxs]
+            spreads.append(max(vals) - min(vals))
+        axis = spreads.index(max(spreads))
+        if spreads[axis] == 0:
+            tree["leaf"][node] = idxs
+            return node
+
+        idxs = sorted(idxs, key=lambda i: points[i][axis])
+        mid = len(idxs) // 2
+        tree["axis"][node] = axis
+        tree["split"][node] = points[idxs[mid]][axis]
+        tree["left"][node] = build(idxs[:mid])
+        tree["right"][node] = build(idxs[mid:])
+        return node
+
+    if points:
+        build(list(range(len(points))))
+    return tree
+
+def build_index(rows):
+    # rows: dicts keyed by INDEX_COLUMNS
+    points, means, stds = standardize(rows)
+    return {
+        "version": INDEX_VERSION,
+        "built_at": datetime.now().isoformat(timespec="seconds"),
+        "features": list(FEATURES),
+        "means": means,
+        "stds": stds,
+        "ev_ids": [row["ev_id"] for row in rows],
+        "meta": [
+            (row["manufacturer_name"], row["model_name"], row["class"], row["drivetrain"])
+            for row in rows
+        ],
+        "points": points,
+        "tree": build_tree(points),
+    }
+
+# =====================================================
+# PERSISTENCE
+# =====================================================
+
+def write_index(index, path=INDEX_PATH):
+    # Writes the index next to the live one; publish_index() swaps it in.
+    # Returns the temporary path.
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return tmp_path
+
+def publish_index(tmp_path, path=INDEX_PATH, prev_path=PREV_INDEX_PATH):
+    if prev_path and os.path.exists(path):
+        os.replace(path, prev_path)
+    # Atomic swap so readers never see a half-written index
+    os.replace(tmp_path, path)
+
+def swap_with_previous(path=INDEX_PATH, prev_path=PREV_INDEX_PATH):
+    if not os.path.exists(prev_path):
+        return False
+    if not os.path.exists(path):
+        os.replace(prev_path, path)
+        return True
+    tmp_path = path + ".swap"
+    os.replace(path, tmp_path)
+    os.replace(prev_path, path)
+    os.replace(tmp_path, prev_path)
+    return True
+
+def load_index(path=INDEX_PATH):
+    with open(path, "rb") as f:
+        index = pickle.load(f)
+    if index.get("version") != INDEX_VERSION:
+        raise ValueError(f"Unsupported index version {index.get('version')} in {path}")
+    index["positions"] = {ev_id: i for i, ev_id in enumerate(index["ev_ids"])}
+    return index
+
+# =====================================================
+# QUERY
+# =====================================================
+
+def nearest(index, ev_id, k=10, vehicle_class=None, drivetrain=None):
+    positions = index.get("positions") or {e: i for i, e in enumerate(index["ev_ids"])}
+    if ev_id not in positions:
+        raise KeyError(f"ev_id {ev_id} is not in the index")
+    origin = positions[ev_id]
+    query = index["points"][origin]
+    points = index["points"]
+    meta = index["meta"]
+    tree = index["tree"]
+
+    def accept(i):
+        if i == origin:
+            return False
+        if vehicle_class is not None and meta[i][2] != vehicle_class:
+            return False
+        if drivetrain is not None and meta[i][3] != drivetrain:
+            return False
+        return True
+
+    # Max-heap of (-dist², i) holding the current best k
+    best = []
+
+    def worst():
+        return -best[0][0] if len(best) == k else math.inf
+
+    def search(node):
+        leaf = tree["leaf"][node]
+        if leaf is not None:
+            for i in leaf:
+                if not accept(i):
+                    continue
+                p = points[i]
+                d = sum((a - b) ** 2 for a, b in zip(query, p))
+                if d < worst():
+                    if len(best) == k:
+                        heapq.heapreplace(best, (-d, i))
+                    else:
+                        heapq.heappush(best, (-d, i))
+            return
+
+        diff = query[tree["axis"][node]] - tree["split"][node]
+        near, far = (tree["left"][node], tree["right"][node]) if diff < 0 else (tree["right"][node], tree["left"][node])
+        search(near)
+        if diff * diff < worst():
+            search(far)
+
+    if points and k > 0:
+        search(0)
+
+    results = []
+    for neg_d, i in sorted(best, reverse=True):
+        manufacturer, model, cls, drive = meta[i]
+        results.append({
+            "ev_id": index["ev_ids"][i],
+            "manufacturer_name": manufacturer,
+            "model_name": model,
+            "class": cls,
+            "drivetrain": drive,
+            "distance": round(math.sqrt(-neg_d), 4),
+        })
+    return results
+
+# =====================================================
+# CLI
+# =====================================================
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Top-k comparable vehicles from the gold index")
+    parser.add_argument("--ev-id", type=int, required=True)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--class", dest="vehicle_class")
+    parser.add_argument("--drivetrain")
+    args = parser.parse_args()
+
+    try:
+        idx = load_index()
+    except FileNotFoundError:
+        sys.exit(f"No index at {INDEX_PATH}; run gold/gold_load.py first.")
+
+    start = time.perf_counter()
+    matches = nearest(idx, args.ev_id, args.k, args.vehicle_class, args.drivetrain)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    for rank, m in enumerate(matches, start=1):
+        print(f"{rank:>3}. [{m['ev_id']}] {m['manufacturer_name']} {m['model_name']} "
+              f"({m['class']}, {m['drivetrain']}) distance={m['distance']}")
+    print(f"Query time: {elapsed_ms:.3f} ms over {len(idx['ev_ids'])} vehicles")
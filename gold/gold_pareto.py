@@ -0,0 +1,120 @@
+from collections import defaultdict
+
+# =====================================================
+# PARETO FRONTIERS (MULTI-METRIC TRADE-OFFS)
+# =====================================================
+# The vw_* views rank one metric at a time. A Pareto frontier keeps every
+# vehicle that no other vehicle in its class beats on all metrics at
+# once, e.g. nothing is both cheaper and longer-ranged.
+#
+# Internally every metric is minimized; "max" metrics are negated.
+
+# frontier name -> [(gold_ev_summary column, "min" | "max"), ...]
+FRONTIERS = {
+    "price_vs_range": [
+        ("price_gbp", "min"),
+        ("range_miles", "max"),
+    ],
+    "price_vs_acceleration_vs_charging": [
+        ("price_gbp", "min"),
+        ("zero_to_sixty_sec", "min"),
+        ("rapidcharge_kw", "max"),
+    ],
+    "price_vs_range_vs_efficiency": [
+        ("price_gbp", "min"),
+        ("range_miles", "max"),
+        ("efficiency_whpm", "min"),
+    ],
+}
+
+# Columns gold_load.py must select, in this order
+FRONTIER_COLUMNS = ["ev_id", "manufacturer_name", "model_name", "class"] + sorted({
+    column for metrics in FRONTIERS.values() for column, _ in metrics
+})
+
+# =====================================================
+# ALGORITHMS
+# =====================================================
+
+def dominates(a, b):
+    strictly_better = False
+    for x, y in zip(a, b):
+        if x > y:
+            return False
+        if x < y:
+            strictly_better = True
+    return strictly_better
+
+def pareto_2d(points):
+    # Sort-and-sweep, O(n log n). points: [(x, y, key), ...]
+    # Returns keys of the non-dominated points (both minimized).
+    frontier = []
+    best_x = best_y = None
+    for x, y, key in sorted(points, key=lambda p: (p[0], p[1])):
+        if best_y is None or y < best_y:
+            frontier.append(key)
+            best_x, best_y = x, y
+        elif y == best_y and x == best_x:
+            # Exact duplicate of a frontier point: neither dominates the other
+            frontier.append(key)
+    return frontier
+
+def skyline(points):
+    # Sort-Filter-Skyline for d >= 3. points: [(values_tuple, key), ...]
+    # Presorting by the coordinate sum (a monotone score) guarantees that
+    # a point can only be dominated by points before it, so the window
+    # only ever grows and each point is compared against the skyline so
+    # far: O(n log n + n * s) for a skyline of size s.
+    # A window point that just dominated something is moved to the front:
+    # a handful of strong points reject most candidates, so this keeps the
+    # average scan short.
+    window = []
+    for values, key in sorted(points, key=lambda p: sum(p[0])):
+        for pos, (w, _) in enumerate(window):
+            if dominates(w, values):
+                if pos:
+                    window.insert(0, window.pop(pos))
+                break
+        else:
+            window.append((values, key))
+    return [key for _, key in window]
+
+def frontier(points):
+    # points: [(values_tuple, key), ...] with every value minimized
+    if not points:
+        return []
+    if len(points[0][0]) == 2:
+        return pareto_2d([(v[0], v[1], key) for v, key in points])
+    return skyline(points)
+
+# =====================================================
+# GOLD STAGE
+# =====================================================
+
+def compute_frontiers(rows):
+    # rows: dicts keyed by FRONTIER_COLUMNS
+    # Returns (frontier_name, class, ev_id, manufacturer_name, model_name)
+    # tuples ready to insert into gold_pareto_frontier.
+    by_class = defaultdict(list)
+    for row in rows:
+        by_class[row["class"]].append(row)
+
+    results = []
+    for name, metrics in FRONTIERS.items():
+        for vehicle_class, class_rows in sorted(by_class.items(), key=lambda kv: str(kv[0])):
+            points = []
+            for row in class_rows:
+                values = [row[column] for column, _ in metrics]
+                if any(v is None for v in values):
+                    continue
+                values = tuple(
+                    float(v) if direction == "min" else -float(v)
+                    for v, (_, direction) in zip(values, metrics)
+                )
+                points.append((values, row["ev_id"]))
+
+            rows_by_id = {row["ev_id"]: row for row in class_rows}
+            for ev_id in frontier(points):
+                row = rows_by_id[ev_id]
+                results.append((name, vehicle_class, ev_id, row["manufacturer_name"], row["model_name"]))
+    return results
@@ -0,0 +1,105 @@
+import traceback
+import os
+import sys
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from common import db, metrics, pipeline_log, slow_query
+from common.context import get_context
+from gold import gold_neighbours, gold_tables
+
+HEAVY_IMPORTS = ("mysql.connector",)
+
+# ============================
+# Logging setup
+# ============================
+
+logger = pipeline_log.get_logger("gold_rollback")
+
+def log(msg: str, level=pipeline_log.INFO):
+    logger.log(level, msg)
+
+def safe_execute(cursor, sql, step="UNKNOWN"):
+    status = slow_query.before(logger.stage, cursor)
+    start = time.perf_counter()
+    try:
+        cursor.execute(sql)
+    except Exception as e:
+        log(f" ERROR during {step}: {e}", pipeline_log.ERROR)
+        traceback.print_exc()
+        raise
+    elapsed = time.perf_counter() - start
+    metrics.record_sql(logger.stage, step, elapsed, cursor.rowcount)
+    slow_query.after(logger.stage, step, cursor, sql, None, elapsed, status)
+
+# ============================
+# STAGE ENTRY POINT
+# ============================
+
+def run(ctx=None):
+    ctx = get_context(ctx)
+    pipeline_log.configure(ctx, "gold_rollback", "gold_rollback")
+
+    # ============================
+    # MYSQL CONNECTION
+    # ============================
+
+    log("Starting Gold Rollback...")
+
+    conn = db.connect()
+    cursor = conn.cursor()
+
+    safe_execute(cursor, "USE DataWarehouse_gold;", "USE DataWarehouse_gold")
+
+    # ============================
+    # CHECK PREVIOUS GENERATION
+    # ============================
+
+    cursor.execute("""
+    SELECT table_name
+    FROM information_schema.tables
+    WHERE table_schema = 'DataWarehouse_gold';
+    """)
+    existing = {r[0].lower() for r in cursor.fetchall()}
+
+    missing = [gold_tables.prev(t) for t in gold_tables.GOLD_TABLES
+               if gold_tables.prev(t).lower() not in existing]
+    if missing:
+        log(" NO PREVIOUS GENERATION TO ROLL BACK TO", pipeline_log.ERROR)
+        for name in missing:
+            log(f" - missing {name}", pipeline_log.ERROR)
+        raise SystemExit("Gold rollback aborted.")
+
+    # ============================
+    # SWAP LIVE <-> PREVIOUS
+    # ============================
+    # Running the rollback twice rolls forward again. The generation is
+    # bumped straight after the RENAME, so readers drop their cached
+    # results even if the index swap below fails.
+
+    safe_execute(cursor, gold_tables.rollback_sql(), "RENAME live <-> prev")
+    safe_execute(cursor, """
+    UPDATE gold_load_generation
+    SET generation = generation + 1,
+        loaded_at = NOW()
+    WHERE id = 1;
+    """, "BUMP gold_load_generation")
+    conn.commit()
+    log(f"Swapped live and previous generations: {', '.join(gold_tables.GOLD_TABLES)}")
+
+    if gold_neighbours.swap_with_previous():
+        log("Swapped comparable-vehicles index with previous generation.")
+    else:
+        log("No previous comparable-vehicles index found; index left unchanged.")
+
+    cursor.close()
+    conn.close()
+
+    log("Gold Rollback completed successfully.")
+
+if __name__ == "__main__":
+    metrics.run_stage(get_context(), logger.stage, run)
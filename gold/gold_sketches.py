@@ -0,0 +1,305 @@
+import base64
+import hashlib
+import json
+import math
+import zlib
+
+# =====================================================
+# MERGEABLE BRAND SKETCHES (T-DIGEST + HYPERLOGLOG)
+# =====================================================
+# gold_brand_sketch keeps, per manufacturer and class, small summaries
+# instead of the rows themselves:
+#   - a t-digest per metric (price, range, efficiency): sorted centroids
+#     (mean, weight), fine at the tails and coarse in the middle, from
+#     which any quantile is read in O(compression), however many rows
+#     went in
+#   - a HyperLogLog of the model names: 2^HLL_PRECISION one-byte
+#     registers, ~3% standard error on the distinct count
+#
+# Both merge without the data they came from. The brand-wide rows (class
+# NULL) are merges of the brand's class rows (vehicles without a class
+# are filed under ''), and every load merges the models HLL of the
+# generation it replaces, so cumulative_models counts the models seen
+# across all snapshots rather than only the current one.
+#
+# The digests are not carried over that way. Gold is rebuilt in full from
+# silver on every load, so each generation's digests already cover every
+# current listing: merging the last generation's in would count each
+# unchanged listing twice and keep delisted prices in the medians for
+# good. An HLL merge has neither problem (a register keeps its maximum, so
+# a model seen twice counts once), which is why only the models carry
+# over. Like gold_brand_summary, the sketches cover priced listings only.
+#
+# Sketches are stored as text (JSON / base64), so the same table works on
+# every engine in common/sql_backend.py.
+
+DIGEST_COMPRESSION = 100
+# Values buffered before they are folded into the centroids
+DIGEST_BUFFER = 500
+
+HLL_PRECISION = 10
+
+# gold_ev_summary column -> sketch name
+METRICS = {
+    "price_gbp": "price",
+    "range_miles": "range",
+    "efficiency_whpm": "efficiency",
+}
+
+# Columns gold_load.py must select, in this order, from rows with a price.
+# It reads them in ev_id (primary key) order: one pass, no sort, and the
+# same digests on every run over the same rows.
+SKETCH_COLUMNS = ["manufacturer_name", "class", "model_name"] + list(METRICS)
+
+# =====================================================
+# T-DIGEST
+# =====================================================
+
+class TDigest:
+    """Merging t-digest with the k1 (arcsine) scale function."""
+
+    def __init__(self, compression=DIGEST_COMPRESSION):
+        self.compression = compression
+        self.centroids = []     # [[mean, weight]] sorted by mean
+        self.buffer = []
+        self.min = None
+        self.max = None
+
+    def add(self, value, weight=1):
+        value = float(value)
+        self.buffer.append([value, weight])
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        if len(self.buffer) >= DIGEST_BUFFER:
+            self.compress()
+
+    def merge(self, other):
+        other.compress()
+        if not other.centroids:
+            return self
+        self.buffer.extend([m, w] for m, w in other.centroids)
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        self.compress()
+        return self
+
+    def k(self, q):
+        return self.compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def k_inverse(self, k):
+        return (math.sin(min(k * 2 * math.pi / self.compression, math.pi / 2)) + 1) / 2
+
+    def compress(self):
+        if not self.buffer:
+            return
+        items = sorted(self.centroids + self.buffer)
+        self.buffer = []
+        total = sum(w for _, w in items)
+
+        merged = [list(items[0])]
+        done = 0.0      # weight left of the current centroid
+        limit = total * self.k_inverse(self.k(0.0) + 1)
+        for mean, weight in items[1:]:
+            current = merged[-1]
+            if done + current[1] + weight <= limit:
+                current[0] += (mean - current[0]) * weight / (current[1] + weight)
+                current[1] += weight
+            else:
+                done += current[1]
+                limit = total * self.k_inverse(self.k(done / total) + 1)
+                merged.append([mean, weight])
+        self.centroids = merged
+
+    def quantile(self, q):
+        # Interpolates between centroid centres; the ends run to the exact
+        # min / max
+        self.compress()
+        if not self.centroids:
+            return None
+        if len(self.centroids) == 1:
+            return self.centroids[0][0]
+        q = min(max(q, 0.0), 1.0)
+        total = sum(w for _, w in self.centroids)
+        index = q * total
+
+        first_mean, first_weight = self.centroids[0]
+        if index < first_weight / 2:
+            return self.min + (first_mean - self.min) * index / (first_weight / 2)
+
+        done = 0.0
+        for (left, left_weight), (right, right_weight) in zip(self.centroids, self.centroids[1:]):
+            start = done + left_weight / 2
+            end = done + left_weight + right_weight / 2
+            if index < end:
+                return left + (right - left) * (index - start) / (end - start)
+            done += left_weight
+
+        last_mean, last_weight = self.centroids[-1]
+        tail = index - (total - last_weight / 2)
+        return last_mean + (self.max - last_mean) * tail / (last_weight / 2)
+
+    def to_json(self):
+        self.compress()
+        if not self.centroids:
+            return None
+        return json.dumps({
+            "compression": self.compression,
+            "min": self.min,
+            "max": self.max,
+            "centroids": [[round(m, 4), w] for m, w in self.centroids],
+        }, separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, text):
+        digest = cls()
+        if text:
+            data = json.loads(text)
+            digest.compression = data["compression"]
+            digest.min, digest.max = data["min"], data["max"]
+            digest.centroids = [list(c) for c in data["centroids"]]
+        return digest
+
+# =====================================================
+# HYPERLOGLOG
+# =====================================================
+
+class HyperLogLog:
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, value):
+        h = int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+        index = h >> (64 - self.precision)
+        rest = h & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLogs of different precision")
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+        return self
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        # Small cardinalities: linear counting is far more accurate
+        if raw <= 2.5 * m and zeros:
+            return round(m * math.log(m / zeros))
+        return round(raw)
+
+    def to_text(self):
+        # Mostly-empty registers compress to a few bytes
+        return f"{self.precision}:" + base64.b64encode(zlib.compress(bytes(self.registers), 9)).decode("ascii")
+
+    @classmethod
+    def from_text(cls, text):
+        if not text:
+            return cls()
+        precision, data = text.split(":", 1)
+        hll = cls(int(precision))
+        hll.registers = bytearray(zlib.decompress(base64.b64decode(data)))
+        return hll
+
+# =====================================================
+# BRAND / CLASS SKETCHES
+# =====================================================
+
+class BrandSketch:
+    def __init__(self):
+        self.listings = 0
+        self.digests = {name: TDigest() for name in METRICS.values()}
+        self.models = HyperLogLog()
+
+    def add(self, row):
+        self.listings += 1
+        for column, name in METRICS.items():
+            if row[column] is not None:
+                self.digests[name].add(row[column])
+        if row["model_name"]:
+            self.models.add(row["model_name"].strip().lower())
+
+    def merge(self, other):
+        self.listings += other.listings
+        for name, digest in self.digests.items():
+            digest.merge(other.digests[name])
+        self.models.merge(other.models)
+        return self
+
+    def quantile(self, metric, q):
+        return self.digests[metric].quantile(q)
+
+    @classmethod
+    def from_row(cls, row):
+        # row: a gold_brand_sketch row as a dict
+        sketch = cls()
+        sketch.listings = row["listings"] or 0
+        for name in METRICS.values():
+            sketch.digests[name] = TDigest.from_json(row[f"{name}_digest"])
+        sketch.models = HyperLogLog.from_text(row["models_hll"])
+        return sketch
+
+def build(rows, previous=None):
+    # rows: dicts with SKETCH_COLUMNS. previous: the last
+    # generation's {(manufacturer, class): models_hll text}, merged into
+    # this generation's model counts. Returns {(manufacturer, class):
+    # BrandSketch}, with a (manufacturer, None) entry per brand merged from
+    # its classes.
+    sketches = {}
+    for row in rows:
+        key = (row["manufacturer_name"], row["class"] or "")
+        if key not in sketches:
+            sketches[key] = BrandSketch()
+        sketches[key].add(row)
+
+    for key, text in (previous or {}).items():
+        if key[1] is not None and key in sketches:
+            sketches[key].models.merge(HyperLogLog.from_text(text))
+
+    brands = {}
+    for (manufacturer, _), sketch in sorted(sketches.items()):
+        if manufacturer not in brands:
+            brands[manufacturer] = BrandSketch()
+        brands[manufacturer].merge(sketch)
+    # Models of classes a brand no longer lists still count for the brand
+    for (manufacturer, vehicle_class), text in (previous or {}).items():
+        if vehicle_class is None and manufacturer in brands:
+            brands[manufacturer].models.merge(HyperLogLog.from_text(text))
+
+    sketches.update({(manufacturer, None): sketch for manufacturer, sketch in brands.items()})
+    return sketches
+
+def sketch_order(item):
+    # Brand-wide row first, then its classes
+    (manufacturer, vehicle_class), _ = item
+    return manufacturer, vehicle_class is not None, vehicle_class or ""
+
+def sketch_rows(sketches):
+    # (manufacturer, class, listings, price/range/efficiency digests,
+    # models_hll, cumulative_models) for gold_brand_sketch
+    rows = []
+    for (manufacturer, vehicle_class), sketch in sorted(sketches.items(), key=sketch_order):
+        rows.append((
+            manufacturer, vehicle_class, sketch.listings,
+            *[sketch.digests[name].to_json() for name in METRICS.values()],
+            sketch.models.to_text(), sketch.models.estimate(),
+        ))
+    return rows
+
+def summary_rows(sketches):
+    # (median price, p90 price, median range, median efficiency,
+    # cumulative models, manufacturer) per brand, for the
+    # gold_brand_summary UPDATE
+    rows = []
+    for (manufacturer, vehicle_class), sketch in sorted(sketches.items(), key=sketch_order):
+        if vehicle_class is not None:
+            continue
+        values = [sketch.quantile("price", 0.5), sketch.quantile("price", 0.9),
+                  sketch.quantile("range", 0.5), sketch.quantile("efficiency", 0.5)]
+        rows.append(tuple(None if v is None else round(v, 2) for v in values)
+                    + (sketch.models.estimate(), manufacturer))
+    return rows
@@ -0,0 +1,52 @@
+# =====================================================
+# GOLD TABLE GENERATIONS (SHADOW / LIVE / PREVIOUS)
+# =====================================================
+# gold_load.py never writes to the live tables. It fills <table>_shadow
+# copies and then swaps every table in with one RENAME TABLE statement,
+# which MySQL applies atomically. The generation that was live before the
+# swap is kept as <table>_prev so gold_rollback.py can switch back.
+
+GOLD_TABLES = [
+    "gold_ev_summary",
+    "gold_brand_summary",
+    "gold_pareto_frontier",
+    "gold_brand_sketch",
+]
+
+SHADOW_SUFFIX = "_shadow"
+PREV_SUFFIX = "_prev"
+SWAP_SUFFIX = "_swap"
+
+def shadow(table):
+    return table + SHADOW_SUFFIX
+
+def prev(table):
+    return table + PREV_SUFFIX
+
+def prepare_shadow_sql(table):
+    # Shadows are cloned from the live table so DDL changes in goldDDL.py
+    # carry over automatically
+    return [
+        f"DROP TABLE IF EXISTS {shadow(table)};",
+        f"CREATE TABLE {shadow(table)} LIKE {table};",
+    ]
+
+def drop_prev_sql():
+    return [f"DROP TABLE IF EXISTS {prev(t)};" for t in GOLD_TABLES]
+
+def publish_sql():
+    # live -> prev, shadow -> live, for every table in a single statement
+    pairs = []
+    for t in GOLD_TABLES:
+        pairs.append(f"{t} TO {prev(t)}")
+        pairs.append(f"{shadow(t)} TO {t}")
+    return "RENAME TABLE " + ", ".join(pairs) + ";"
+
+def rollback_sql():
+    # live <-> prev, for every table in a single statement
+    pairs = []
+    for t in GOLD_TABLES:
+        pairs.append(f"{t} TO {t}{SWAP_SUFFIX}")
+        pairs.append(f"{prev(t)} TO {t}")
+        pairs.append(f"{t}{SWAP_SUFFIX} TO {prev(t)}")
+    return "RENAME TABLE " + ", ".join(pairs) + ";"
@@ -0,0 +1,92 @@
+import traceback
+import os
+import sys
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from common import db, metrics, pipeline_log, slow_query
+from common.context import get_context
+
+HEAVY_IMPORTS = ("mysql.connector",)
+
+# ============================
+# Logging setup
+# ============================
+
+logger = pipeline_log.get_logger("gold_views")
+
+def log(msg: str, level=pipeline_log.INFO):
+    logger.log(level, msg)
+
+def safe_execute(cursor, sql, step="UNKNOWN"):
+    status = slow_query.before(logger.stage, cursor)
+    start = time.perf_counter()
+    try:
+        cursor.execute(sql)
+    except Exception as e:
+        log(f" ERROR during {step}: {e}", pipeline_log.ERROR)
+        traceback.print_exc()
+        raise
+    elapsed = time.perf_counter() - start
+    metrics.record_sql(logger.stage, step, elapsed, cursor.rowcount)
+    slow_query.after(logger.stage, step, cursor, sql, None, elapsed, status)
+
+# ============================
+# READ gold_views.sql
+# ============================
+# Same effect as `SOURCE gold_views.sql;` in the mysql client.
+
+VIEWS_SQL_PATH = os.path.join(SCRIPT_DIR, "gold_views.sql")
+
+def split_statements(text):
+    statements = []
+    current = []
+    for line in text.splitlines():
+        if line.strip().startswith("--"):
+            continue
+        current.append(line)
+        if line.rstrip().endswith(";"):
+            statement = "\n".join(current).strip()
+            if statement:
+                statements.append(statement)
+            current = []
+    return statements
+
+# ============================
+# STAGE ENTRY POINT
+# ============================
+
+def run(ctx=None):
+    ctx = get_context(ctx)
+    pipeline_log.configure(ctx, "gold_views", "gold_views")
+
+    log("Starting Gold Views...")
+
+    with open(VIEWS_SQL_PATH, encoding="utf-8") as f:
+        statements = split_statements(f.read())
+
+    # ============================
+    # MYSQL CONNECTION
+    # ============================
+
+    conn = db.connect()
+    cursor = conn.cursor()
+
+    for statement in statements:
+        first_line = statement.splitlines()[0]
+        safe_execute(cursor, statement, first_line)
+        if statement.upper().startswith("CREATE"):
+            log(f"Applied: {first_line}")
+
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+    log("Gold Views completed successfully.")
+
+if __name__ == "__main__":
+    metrics.run_stage(get_context(), logger.stage, run)
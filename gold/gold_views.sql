@@ -130,7 +130,12 @@ SELECT
     avg_efficiency_whpm,
     avg_zero_to_sixty_sec,
     min_price_gbp,
-    max_price_gbp
+    max_price_gbp,
+    median_price_gbp,
+    p90_price_gbp,
+    median_range_miles,
+    median_efficiency_whpm,
+    cumulative_models
 FROM gold_brand_summary;
 
 -- ======================================================
@@ -175,3 +180,21 @@ SELECT
     charging_score,
     price_per_weight
 FROM gold_ev_summary;
+
+-- ======================================================
+-- VIEW 12: Pareto Frontiers (Multi-Metric Trade-offs)
+-- ======================================================
+CREATE OR REPLACE VIEW vw_pareto_frontiers AS
+SELECT
+    p.frontier_name,
+    p.class,
+    g.manufacturer_name,
+    g.model_name,
+    g.price_gbp,
+    g.range_miles,
+    g.zero_to_sixty_sec,
+    g.rapidcharge_kw,
+    g.efficiency_whpm
+FROM gold_pareto_frontier p
+JOIN gold_ev_summary g
+    ON g.ev_id = p.ev_id;
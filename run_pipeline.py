@@ -0,0 +1,525 @@
+import argparse
+import importlib
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from common import db, metrics, pipeline_log, run_state, slow_query
+from common.context import PipelineContext, RUN_ID_ENV
+
+# =====================================================
+# LOGGING SETUP
+# =====================================================
+
+logger = pipeline_log.get_logger("pipeline")
+print_lock = threading.Lock()
+
+def log(msg, level=pipeline_log.INFO):
+    logger.log(level, msg)
+
+# =====================================================
+# PIPELINE DAG
+# =====================================================
+# name -> (stage module, upstream stages). Listed in a valid topological
+# order. Every module exposes run(ctx). A stage starts as soon as all of
+# its upstream stages have finished, so independent work overlaps: the
+# gold DDL runs alongside the scrape and silver load, and the views are
+# (re)applied while gold is loading.
+
+STAGES = {
+    "scrape":      ("scraping.web_scrape", []),
+    "bronze_ddl":  ("bronze.bronzeDDL",    []),
+    "bronze_load": ("bronze.bronze_load",  ["scrape", "bronze_ddl"]),
+    "silver_load": ("silver.silver_load",  ["bronze_load"]),
+    "gold_ddl":    ("gold.goldDDL",        []),
+    "gold_load":   ("gold.gold_load",      ["silver_load", "gold_ddl"]),
+    "gold_views":  ("gold.gold_views",     ["gold_ddl"]),
+    "gold_cdc":    ("gold.gold_cdc",       ["gold_load"]),
+}
+
+# What each stage reads and writes, for checkpoint/resume (see
+# common/run_state.py). Upstream output fingerprints are folded into every
+# stage's input fingerprint automatically, so only the stage's own code and
+# files are listed under "inputs". The scrape has no upstream: it is only
+# repeated when its code or market list changes, a CSV partition was
+# touched or it is forced.
+
+BRONZE_PARTITIONS = ("files", "bronze/scrapedData*.csv")
+BRONZE_SHARDS = ("files", "bronze/shards/*.csv")
+MARKET_CONFIG = [("module", "common.markets"), ("env", "EV_SCRAPE_MARKETS")]
+
+BRONZE_TABLES = ["DataWarehouse_bronze.ev_specs_bronze", "DataWarehouse_bronze.bronze_shard_state"]
+SILVER_TABLES = [
+    "DataWarehouse_silver.silver_market",
+    "DataWarehouse_silver.silver_manufacturer",
+    "DataWarehouse_silver.silver_bronze_map",
+    "DataWarehouse_silver.silver_vehicle",
+    "DataWarehouse_silver.silver_specs",
+]
+GOLD_TABLES = [
+    "DataWarehouse_gold.gold_ev_summary",
+    "DataWarehouse_gold.gold_brand_summary",
+    "DataWarehouse_gold.gold_pareto_frontier",
+    "DataWarehouse_gold.gold_brand_sketch",
+]
+
+STAGE_FINGERPRINTS = {
+    "scrape": {
+        # The run date: listings change upstream without any local input
+        # changing, so the scrape is repeated on the first run of each day
+        "inputs":  [("module", "scraping.web_scrape"), ("env", "EV_SCRAPE_REPARSE"),
+                    ("date", "%Y-%m-%d")] + MARKET_CONFIG,
+        "outputs": [BRONZE_PARTITIONS, BRONZE_SHARDS],
+    },
+    "bronze_ddl": {
+        "inputs":  [("module", "bronze.bronzeDDL")],
+        "outputs": [("schema", BRONZE_TABLES)],
+    },
+    "bronze_load": {
+        "inputs":  [("module", "bronze.bronze_load"), ("module", "common.bronze_shards"),
+                    BRONZE_PARTITIONS, BRONZE_SHARDS, ("env", "EV_BRONZE_SHARDS")] + MARKET_CONFIG,
+        "outputs": [("tables", BRONZE_TABLES)],
+    },
+    "silver_load": {
+        "inputs":  [("module", "silver.silver_load"), ("module", "silver.silver_dedupe"),
+                    ("module", "silver.silver_keys"), ("module", "common.markets")],
+        "outputs": [("tables", SILVER_TABLES)],
+    },
+    "gold_ddl": {
+        "inputs":  [("module", "gold.goldDDL")],
+        "outputs": [("schema", GOLD_TABLES + ["DataWarehouse_gold.gold_load_generation",
+                                        "DataWarehouse_gold.gold_ev_changes",
+                                        "DataWarehouse_gold.gold_cdc_capture"])],
+    },
+    "gold_load": {
+        "inputs":  [("module", "gold.gold_load"), ("module", "gold.gold_tables"),
+                    ("module", "gold.gold_neighbours"), ("module", "gold.gold_pareto"),
+                    ("module", "gold.gold_sketches"), ("module", "gold.gold_cdc")],
+        "outputs": [("tables", GOLD_TABLES), ("file", "gold/output/comparable_vehicles.idx")],
+    },
+    "gold_views": {
+        "inputs":  [("module", "gold.gold_views"), ("file", "gold/gold_views.sql")],
+        "outputs": [("views", "DataWarehouse_gold")],
+    },
+    "gold_cdc": {
+        "inputs":  [("module", "gold.gold_cdc")],
+        "outputs": [("tables", ["DataWarehouse_gold.gold_ev_changes",
+                                "DataWarehouse_gold.gold_cdc_capture"])],
+    },
+}
+
+def downstream_of(name):
+    found = {name}
+    for stage in STAGES:
+        if any(dep in found for dep in STAGES[stage][1]):
+            found.add(stage)
+    return found
+
+def upstream_of(name):
+    found = {name}
+    for stage in reversed(list(STAGES)):
+        if stage in found:
+            found.update(STAGES[stage][1])
+    return found
+
+def select_stages(start=None, end=None):
+    selected = set(STAGES)
+    if start:
+        selected &= downstream_of(start)
+    if end:
+        selected &= upstream_of(end)
+    return [s for s in STAGES if s in selected]
+
+# =====================================================
+# STAGE EXECUTION
+# =====================================================
+
+running = {}
+running_lock = threading.Lock()
+abort = threading.Event()
+timings = {}
+
+# "unchanged" stages were skipped by the checkpoint and count as done
+DONE = ("ok", "unchanged")
+
+def run_stage_inprocess(name, ctx):
+    # Warm path: the stage runs in this interpreter, reusing modules that
+    # earlier stages already imported (pandas, mysql.connector, ...)
+    module = STAGES[name][0]
+    if abort.is_set():
+        return name, "skipped", 0.0
+
+    log(f"[{name}] START ({module}, in-process)")
+    start = time.perf_counter()
+    try:
+        ctx.results[name] = metrics.run_stage(ctx, name, importlib.import_module(module).run)
+        status = "ok"
+    except BaseException as e:
+        status = "failed"
+        log(f"[{name}] raised {e!r}", pipeline_log.ERROR)
+    elapsed = time.perf_counter() - start
+
+    if status != "ok":
+        log(f"[{name}] FAILED after {elapsed:.2f}s", pipeline_log.ERROR)
+        return name, status, elapsed
+
+    log(f"[{name}] DONE in {elapsed:.2f}s")
+    return name, "ok", elapsed
+
+def run_stage_subprocess(name, ctx):
+    # Cold path: one interpreter per stage, as when chaining the scripts
+    # by hand. Kept for comparison and for isolating a misbehaving stage.
+    module = STAGES[name][0]
+    if abort.is_set():
+        return name, "skipped", 0.0
+
+    log(f"[{name}] START ({module}, subprocess)")
+    start = time.perf_counter()
+
+    proc = subprocess.Popen(
+        [sys.executable, "-u", "-m", module],
+        cwd=PROJECT_ROOT,
+        env={**os.environ, RUN_ID_ENV: ctx.run_id},
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+    )
+    with running_lock:
+        running[name] = proc
+
+    # Prefix every line so concurrent stages stay readable
+    for line in proc.stdout:
+        with print_lock:
+            print(f"  [{name}] {line.rstrip()}")
+    returncode = proc.wait()
+
+    with running_lock:
+        running.pop(name, None)
+
+    elapsed = time.perf_counter() - start
+    if returncode != 0:
+        status = "aborted" if abort.is_set() and returncode < 0 else "failed"
+        log(f"[{name}] {status.upper()} after {elapsed:.2f}s (exit code {returncode})", pipeline_log.ERROR)
+        return name, status, elapsed
+
+    log(f"[{name}] DONE in {elapsed:.2f}s")
+    return name, "ok", elapsed
+
+def stop_running():
+    # Fail fast: stop every stage that is still in flight. In-process
+    # stages cannot be interrupted safely; they finish their current work
+    # but nothing new is started.
+    abort.set()
+    with running_lock:
+        for name, proc in running.items():
+            if proc.poll() is None:
+                log(f"[{name}] terminating (fail-fast)")
+                proc.terminate()
+
+# =====================================================
+# CHECKPOINT / RESUME
+# =====================================================
+# Before a stage runs, its input fingerprint (own code/files + upstream
+# outputs) is compared with the last recorded run. The stage is skipped
+# when that run succeeded, the inputs match and its outputs still hash the
+# same (nobody truncated or edited them since). Anything else -- a failed
+# or interrupted run, a code change, changed upstream data -- reruns it,
+# so a rerun after a failure resumes at the first failed or dirty stage.
+#
+# Output tables are compared by their information_schema times, which is
+# one cheap query. --verify also checksums their contents (a full scan of
+# every output table) and reruns any stage whose contents differ from the
+# checksum recorded by the last --verify run, or that has none recorded.
+
+output_fps = {}
+output_fps_lock = threading.Lock()
+
+def output_fingerprint(cursor, name):
+    # Computed once per run; a stage that reruns drops its cached value
+    with output_fps_lock:
+        if name in output_fps:
+            return output_fps[name]
+    fp = run_state.fingerprint(cursor, STAGE_FINGERPRINTS[name]["outputs"])
+    with output_fps_lock:
+        output_fps[name] = fp
+    return fp
+
+def output_checksum(cursor, name):
+    return run_state.fingerprint(cursor, STAGE_FINGERPRINTS[name]["outputs"], verify=True)
+
+def check_stage(name, verify=False):
+    # Returns (input fingerprint, last state); pooled connection is only
+    # held while hashing so stages never wait on the orchestrator
+    conn = db.connect()
+    cursor = conn.cursor()
+    try:
+        upstream = [output_fingerprint(cursor, d) for d in STAGES[name][1]]
+        input_fp = run_state.fingerprint(cursor, STAGE_FINGERPRINTS[name]["inputs"], upstream)
+        state = run_state.load_state(cursor, name)
+        if state and state["status"] == "ok" and state["input_fingerprint"] == input_fp:
+            state["outputs_intact"] = output_fingerprint(cursor, name) == state["output_fingerprint"]
+            if verify and state["outputs_intact"]:
+                state["outputs_intact"] = output_checksum(cursor, name) == state["output_checksum"]
+        return input_fp, state
+    finally:
+        cursor.close()
+        conn.close()
+
+def record_stage(name, status, ctx, started_at, elapsed, input_fp, verify=False):
+    # A failure to record only costs a rerun next time; never fail the stage
+    try:
+        conn = db.connect()
+        cursor = conn.cursor()
+        output_fp = checksum = None
+        if status == "ok":
+            with output_fps_lock:
+                output_fps.pop(name, None)
+            output_fp = output_fingerprint(cursor, name)
+            if verify:
+                checksum = output_checksum(cursor, name)
+        run_state.save_state(cursor, name, status, ctx.run_id, started_at, elapsed,
+                             input_fp, output_fp, checksum)
+        conn.commit()
+        cursor.close()
+        conn.close()
+    except Exception as e:
+        log(f"[{name}] could not record run state: {e!r}", pipeline_log.WARNING)
+
+def run_stage_checkpointed(run_stage, name, ctx, force, verify=False):
+    if abort.is_set():
+        return name, "skipped", 0.0
+
+    start = time.perf_counter()
+    try:
+        input_fp, state = check_stage(name, verify)
+    except Exception as e:
+        # Cannot fingerprint (e.g. a database is missing): just run it
+        log(f"[{name}] checkpoint check failed ({e!r}), running", pipeline_log.WARNING)
+        input_fp, state = None, None
+
+    if name in force:
+        log(f"[{name}] forced")
+    elif state and state.get("outputs_intact"):
+        log(f"[{name}] UNCHANGED since run {state['run_id']}, skipping "
+            f"({time.perf_counter() - start:.2f}s check)")
+        return name, "unchanged", time.perf_counter() - start
+    elif state and state["status"] != "ok":
+        log(f"[{name}] last run {state['run_id']} ended '{state['status']}', resuming here")
+
+    started_at = datetime.now()
+    record_stage(name, "running", ctx, started_at, 0.0, input_fp)
+    _, status, elapsed = run_stage(name, ctx)
+    if status != "skipped":
+        record_stage(name, status, ctx, started_at, elapsed, input_fp, verify)
+    return name, status, elapsed
+
+def run_dag(stages, workers, ctx, mode="inprocess", checkpoint=False, force=(), verify=False):
+    run_stage = run_stage_inprocess if mode == "inprocess" else run_stage_subprocess
+    if checkpoint:
+        plain = run_stage
+        run_stage = lambda name, ctx: run_stage_checkpointed(plain, name, ctx, set(force), verify)
+    selected = set(stages)
+    results = {}
+    pending = list(stages)
+    in_flight = {}
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while pending or in_flight:
+            if not abort.is_set():
+                # Upstream stages outside the selection count as satisfied
+                ready = [s for s in pending
+                         if all(d not in selected or results.get(d) in DONE for d in STAGES[s][1])]
+                for s in ready:
+                    pending.remove(s)
+                    in_flight[pool.submit(run_stage, s, ctx)] = s
+            elif pending:
+                for s in pending:
+                    results[s] = "skipped"
+                pending = []
+
+            if not in_flight:
+                break
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                in_flight.pop(future)
+                name, status, elapsed = future.result()
+                results[name] = status
+                timings[name] = elapsed
+                if status == "failed":
+                    stop_running()
+
+    for s in pending:
+        results.setdefault(s, "skipped")
+    return results
+
+# =====================================================
+# STARTUP OVERHEAD
+# =====================================================
+# "subprocess": fresh interpreter importing the stage and its heavy
+# dependencies, i.e. what every stage paid when run as its own script.
+# "in-process": the same imports in this interpreter, in DAG order, so
+# each stage only pays for modules no earlier stage has loaded.
+
+def measure_startup(stages, repeats=3):
+    rows = []
+    for name in stages:
+        module = STAGES[name][0]
+        probe = (
+            "import importlib; "
+            f"m = importlib.import_module({module!r}); "
+            "[importlib.import_module(h) for h in m.HEAVY_IMPORTS]"
+        )
+        samples = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            result = subprocess.run([sys.executable, "-c", probe], cwd=PROJECT_ROOT,
+                                    capture_output=True, text=True)
+            samples.append(time.perf_counter() - start)
+            if result.returncode != 0:
+                break
+        cold = None if result.returncode != 0 else min(samples)
+
+        start = time.perf_counter()
+        try:
+            mod = importlib.import_module(module)
+            for heavy in mod.HEAVY_IMPORTS:
+                importlib.import_module(heavy)
+            warm = time.perf_counter() - start
+        except ImportError as e:
+            warm = None
+            cold = None
+            log(f"[{name}] cannot measure: {e}")
+        rows.append((name, cold, warm))
+
+    log("---------- STAGE STARTUP OVERHEAD ----------")
+    log(f"{'stage':<12} {'subprocess':>11} {'in-process':>11}")
+    for name, cold, warm in rows:
+        fmt = lambda v: f"{v * 1000:>9.1f}ms" if v is not None else f"{'n/a':>11}"
+        log(f"{name:<12} {fmt(cold)} {fmt(warm)}")
+    measured = [r for r in rows if r[1] is not None and r[2] is not None]
+    if measured:
+        log(f"{'total':<12} {sum(r[1] for r in measured) * 1000:>9.1f}ms "
+            f"{sum(r[2] for r in measured) * 1000:>9.1f}ms")
+
+# =====================================================
+# MAIN
+# =====================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the EV ETL pipeline")
+    parser.add_argument("--from", dest="start", choices=list(STAGES),
+                        help="first stage to run (upstream stages are assumed up to date)")
+    parser.add_argument("--to", dest="end", choices=list(STAGES),
+                        help="last stage to run")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="maximum number of stages running at once")
+    parser.add_argument("--mode", choices=["inprocess", "subprocess"], default="inprocess",
+                        help="run stages in this interpreter (default) or one process per stage")
+    parser.add_argument("--measure-startup", action="store_true",
+                        help="compare per-stage startup cost of both modes and exit")
+    parser.add_argument("--force", action="append", default=[], choices=list(STAGES),
+                        help="rerun this stage even if its fingerprints are unchanged (repeatable)")
+    parser.add_argument("--force-all", action="store_true",
+                        help="ignore recorded fingerprints and rerun every selected stage")
+    parser.add_argument("--no-checkpoint", action="store_true",
+                        help="neither check nor record stage fingerprints")
+    parser.add_argument("--verify", action="store_true",
+                        help="also checksum the output tables (full scans) and rerun stages "
+                             "whose contents changed")
+    parser.add_argument("--profile-sql", action="append", default=[], metavar="STAGE",
+                        choices=list(STAGES) + ["all"],
+                        help="capture EXPLAIN plans and status deltas of slow statements "
+                             "in this stage (repeatable, or 'all')")
+    parser.add_argument("--slow-query-seconds", type=float,
+                        help=f"slow-statement threshold for --profile-sql "
+                             f"(default {slow_query.DEFAULT_SECONDS}s)")
+    parser.add_argument("--reparse", metavar="YYYY-MM-DD",
+                        help="rebuild the bronze CSVs from the raw HTML archived on or before "
+                             "this date instead of scraping the site")
+    parser.add_argument("--list", action="store_true", help="print the DAG and exit")
+    args = parser.parse_args()
+
+    stages = select_stages(args.start, args.end)
+
+    if args.list:
+        for s in STAGES:
+            deps = ", ".join(STAGES[s][1]) or "-"
+            mark = "*" if s in stages else " "
+            print(f"{mark} {s:<12} <- {deps}")
+        sys.exit(0)
+
+    if not stages:
+        sys.exit(f"No stages between --from {args.start} and --to {args.end}.")
+
+    ctx = PipelineContext()
+    pipeline_log.configure(ctx, "pipeline")
+
+    # Passed through the environment so subprocess stages see them too
+    if args.profile_sql:
+        os.environ[slow_query.STAGES_ENV] = ",".join(args.profile_sql)
+    if args.slow_query_seconds is not None:
+        os.environ[slow_query.SECONDS_ENV] = str(args.slow_query_seconds)
+    if args.reparse:
+        os.environ["EV_SCRAPE_REPARSE"] = args.reparse
+
+    if args.measure_startup:
+        measure_startup(stages)
+        sys.exit(0)
+
+    log("========== PIPELINE START ==========")
+    log(f"Run {ctx.run_id}: {', '.join(stages)} (workers={args.workers}, mode={args.mode})")
+
+    checkpoint = not args.no_checkpoint
+    if checkpoint:
+        try:
+            conn = db.connect()
+            cursor = conn.cursor()
+            run_state.ensure_state_table(cursor)
+            conn.commit()
+            cursor.close()
+            conn.close()
+        except Exception as e:
+            log(f"Run state table unavailable ({e!r}); running without checkpoints", pipeline_log.WARNING)
+            checkpoint = False
+    force = list(stages) if args.force_all else args.force
+
+    pipeline_start = time.perf_counter()
+    results = run_dag(stages, args.workers, ctx, args.mode, checkpoint, force, args.verify)
+    total = time.perf_counter() - pipeline_start
+
+    log("---------- STAGE SUMMARY ----------")
+    for s in stages:
+        # Structured copy in logs/run_<run_id>.jsonl for trend analysis
+        logger.info(f"{s:<12} {results.get(s, 'skipped'):<8} {timings.get(s, 0.0):>8.2f}s",
+                    dag_stage=s, status=results.get(s, "skipped"),
+                    seconds=round(timings.get(s, 0.0), 3))
+    log(f"{'total':<12} {'':<8} {total:>8.2f}s")
+
+    try:
+        paths = metrics.write_run(ctx, stages, results, timings, total)
+        log(f"Metrics: {', '.join(paths)}")
+    except OSError as e:
+        log(f"Could not write run metrics: {e!r}", pipeline_log.WARNING)
+
+    if args.mode == "inprocess":
+        # One handshake per pooled connection for the whole run
+        stats = db.pool_stats()
+        log(f"MySQL pool: {stats['pools']} connections, "
+            f"{stats['checkouts']} checkouts, {stats['waits']} waits")
+
+    if any(r not in DONE for r in results.values()):
+        log("========== PIPELINE FAILED ==========", pipeline_log.ERROR)
+        sys.exit(1)
+
+    log("========== PIPELINE COMPLETE ==========")
@@ -0,0 +1,109 @@
+import argparse
+import gc
+import importlib
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from bronze import synthetic_bronze
+from scraping.scrape_columns import ColumnBuilder
+from scraping.web_scrape import expected_cols
+
+# =====================================================
+# SCRAPE ROW MEMORY BENCHMARK
+# =====================================================
+# Holds N parsed listings the way scrape_market() used to (a list of
+# dicts) and the way it does now (ColumnBuilder), then builds the
+# DataFrame from each. Reports, from tracemalloc:
+#   - held:  memory kept by the rows once every listing is parsed
+#   - peak:  high-water mark up to and including the DataFrame
+# Listings come from bronze/synthetic_bronze.py and every value is a fresh
+# string object, as BeautifulSoup's get_text() returns them.
+
+SIZES = [10_000, 100_000]
+SPEC_COLS = expected_cols[6:16]
+
+def fresh(value):
+    return value.encode("utf-8").decode("utf-8")
+
+def listings(n, seed):
+    rng = random.Random(seed)
+    for i in range(n):
+        company, model, drivetrain, market_class, seat = synthetic_bronze.vehicle(rng)
+        price, *specs = synthetic_bronze.specs(rng)
+        row = {
+            "company": fresh(company),
+            "model": fresh(model),
+            "drivetrain": fresh(drivetrain),
+            "class": fresh(market_class),
+            "seat": fresh(str(seat)),
+            "price_raw": fresh(price),
+        }
+        for col, value in zip(SPEC_COLS, specs):
+            row[col] = fresh(value)
+        row["market"] = fresh("uk")
+        yield row
+
+def as_dicts(n, seed):
+    rows = []
+    for row in listings(n, seed):
+        rows.append(row)
+    return rows
+
+def as_columns(n, seed):
+    rows = ColumnBuilder(expected_cols)
+    for row in listings(n, seed):
+        rows.append(row)
+    return rows
+
+def dicts_to_pandas(rows):
+    import pandas as pd
+
+    df = pd.DataFrame(rows)
+    return df[expected_cols]
+
+def measure(build, convert, n, seed):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    rows = build(n, seed)
+    held = tracemalloc.get_traced_memory()[0]
+    df = convert(rows)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return held, peak, elapsed, df
+
+def run(sizes, seed):
+    # Imported up front so its own memory is not measured
+    importlib.import_module("pandas")
+
+    mb = 2**20
+    print(f"{'rows':>10} {'layout':>8} {'held MB':>9} {'B/row':>7} {'peak MB':>9} {'seconds':>8}")
+    for n in sizes:
+        results = {}
+        for name, build, convert in (("dicts", as_dicts, dicts_to_pandas),
+                                     ("columns", as_columns, ColumnBuilder.to_pandas)):
+            held, peak, elapsed, df = measure(build, convert, n, seed)
+            results[name] = (held, peak, df)
+            print(f"{n:>10,} {name:>8} {held / mb:>9.1f} {held / n:>7.0f} {peak / mb:>9.1f} {elapsed:>8.2f}")
+        dict_df, column_df = results["dicts"][2], results["columns"][2]
+        assert dict_df.to_csv(index=False) == column_df.to_csv(index=False), \
+            f"CSV output differs at {n} rows"
+        print(f"{'':>10} {'ratio':>8} {results['columns'][0] / results['dicts'][0]:>9.2f} "
+              f"{'':>7} {results['columns'][1] / results['dicts'][1]:>9.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memory of dict rows vs the columnar scrape builder")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES,
+                        help=f"listing counts (default {SIZES}; tracemalloc makes 1M take minutes)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    run(args.sizes, args.seed)
@@ -0,0 +1,262 @@
+import argparse
+import hashlib
+import json
+import os
+import threading
+import zlib
+from datetime import date, datetime
+
+# =====================================================
+# RAW HTML ARCHIVE (CONTENT-ADDRESSED)
+# =====================================================
+# web_scrape.py stores every fetched listing page here before parsing it,
+# so a parser fix can be replayed over past scrapes (--reparse) instead of
+# fetching the site again.
+#
+#   objects/<aa>/<sha256>.zst   page body, keyed by the SHA-256 of its raw
+#                               bytes; a page identical to one already
+#                               stored is not written again
+#   dicts/<id>.zdict            zstd dictionaries, trained on chunks of the
+#                               archived pages (the listing pages of different
+#                               days and markets share most of their markup)
+#   snapshots/<date>.jsonl      one line per fetch: market, url, time,
+#                               sha256, size, encoding
+#
+# A dictionary is trained once DICT_MIN_PAGES pages are archived and
+# retrained whenever the archive has doubled since; objects name their
+# dictionary in the zstd frame header, so older dictionaries are kept and
+# every object stays readable. zstd comes from the optional `zstandard`
+# package; without it pages are stored zlib-compressed (.gz), and both
+# kinds are read back either way.
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ARCHIVE_DIR = os.path.join(SCRIPT_DIR, "archive")
+
+ZSTD_LEVEL = 19
+DICT_SIZE = 112 * 1024
+DICT_MIN_PAGES = 3
+# Pages are cut into chunks of this size to give the trainer enough samples
+DICT_SAMPLE_BYTES = 16 * 1024
+# Newest pages used for training
+DICT_TRAIN_PAGES = 50
+
+SUFFIXES = (".zst", ".gz")
+
+store_lock = threading.Lock()
+dict_cache = {}
+
+def zstd():
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+def object_path(root, digest, suffix):
+    return os.path.join(root, "objects", digest[:2], digest + suffix)
+
+def find_object(root, digest):
+    for suffix in SUFFIXES:
+        path = object_path(root, digest, suffix)
+        if os.path.exists(path):
+            return path
+    return None
+
+def write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+# =====================================================
+# DICTIONARIES
+# =====================================================
+
+def state_path(root):
+    return os.path.join(root, "archive.json")
+
+def read_state(root):
+    try:
+        with open(state_path(root), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"dict_id": None, "trained_on": 0}
+
+def load_dictionary(root, dict_id):
+    key = (root, dict_id)
+    if key not in dict_cache:
+        with open(os.path.join(root, "dicts", f"{dict_id}.zdict"), "rb") as f:
+            dict_cache[key] = zstd().ZstdCompressionDict(f.read())
+    return dict_cache[key]
+
+def object_paths(root):
+    objects = os.path.join(root, "objects")
+    if not os.path.isdir(objects):
+        return []
+    return [os.path.join(dirpath, name)
+            for dirpath, _, names in os.walk(objects)
+            for name in names if name.endswith(SUFFIXES)]
+
+def train_dictionary(root):
+    # Returns the new dictionary id, or None when there is too little data
+    zstandard = zstd()
+    paths = sorted(object_paths(root), key=os.path.getmtime)[-DICT_TRAIN_PAGES:]
+    if len(paths) < DICT_MIN_PAGES:
+        return None
+    samples = []
+    for path in paths:
+        page = read_object(root, path)
+        samples += [page[i:i + DICT_SAMPLE_BYTES] for i in range(0, len(page), DICT_SAMPLE_BYTES)]
+    try:
+        trained = zstandard.train_dictionary(DICT_SIZE, samples, level=ZSTD_LEVEL)
+    except zstandard.ZstdError:
+        # Not enough distinct content yet; stay on the current dictionary
+        return None
+    dict_id = trained.dict_id()
+    write_atomic(os.path.join(root, "dicts", f"{dict_id}.zdict"), trained.as_bytes())
+    write_atomic(state_path(root), json.dumps(
+        {"dict_id": dict_id, "trained_on": len(object_paths(root))}).encode("utf-8"))
+    return dict_id
+
+# =====================================================
+# OBJECTS
+# =====================================================
+
+def compress(root, data):
+    # (bytes, suffix)
+    zstandard = zstd()
+    if zstandard is None:
+        return zlib.compress(data, 9), ".gz"
+    dict_id = read_state(root)["dict_id"]
+    dict_data = load_dictionary(root, dict_id) if dict_id else None
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=dict_data).compress(data), ".zst"
+
+def read_object(root, path):
+    with open(path, "rb") as f:
+        data = f.read()
+    if path.endswith(".gz"):
+        return zlib.decompress(data)
+    zstandard = zstd()
+    if zstandard is None:
+        raise RuntimeError(f"{path} is zstd-compressed; install zstandard to read it")
+    dict_id = zstandard.get_frame_parameters(data).dict_id
+    dict_data = load_dictionary(root, dict_id) if dict_id else None
+    return zstandard.ZstdDecompressor(dict_data=dict_data).decompress(data)
+
+def load(digest, root=ARCHIVE_DIR):
+    path = find_object(root, digest)
+    if path is None:
+        raise FileNotFoundError(f"No archived page {digest}")
+    data = read_object(root, path)
+    if sha256(data) != digest:
+        raise ValueError(f"Archived page {digest} is corrupt")
+    return data
+
+def store(market, url, content, encoding, fetched_at=None, root=ARCHIVE_DIR):
+    # Archives one fetched page; returns (sha256, bytes written: 0 when the
+    # page was already stored)
+    fetched_at = fetched_at or datetime.now()
+    digest = sha256(content)
+    written = 0
+    with store_lock:
+        if find_object(root, digest) is None:
+            data, suffix = compress(root, content)
+            write_atomic(object_path(root, digest, suffix), data)
+            written = len(data)
+
+            state = read_state(root)
+            if zstd() and len(object_paths(root)) >= max(DICT_MIN_PAGES, 2 * state["trained_on"]):
+                train_dictionary(root)
+
+        entry = {
+            "market": market,
+            "url": url,
+            "fetched_at": fetched_at.isoformat(timespec="seconds"),
+            "sha256": digest,
+            "bytes": len(content),
+            "encoding": encoding,
+        }
+        path = os.path.join(root, "snapshots", f"{fetched_at.date().isoformat()}.jsonl")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+    return digest, written
+
+# =====================================================
+# SNAPSHOTS
+# =====================================================
+
+def snapshot_dates(root=ARCHIVE_DIR):
+    directory = os.path.join(root, "snapshots")
+    if not os.path.isdir(directory):
+        return []
+    return sorted(name[:-len(".jsonl")] for name in os.listdir(directory) if name.endswith(".jsonl"))
+
+def snapshot(as_of, root=ARCHIVE_DIR):
+    # market -> latest entry fetched on or before as_of (a date or
+    # YYYY-MM-DD), so a market that was not scraped that day falls back
+    # to its previous page
+    as_of = as_of if isinstance(as_of, str) else as_of.isoformat()
+    date.fromisoformat(as_of)
+    entries = {}
+    for day in snapshot_dates(root):
+        if day > as_of:
+            break
+        with open(os.path.join(root, "snapshots", f"{day}.jsonl"), encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    entries[entry["market"]] = entry
+    return entries
+
+def load_html(entry, root=ARCHIVE_DIR):
+    return load(entry["sha256"], root).decode(entry.get("encoding") or "utf-8", errors="replace")
+
+# =====================================================
+# CLI
+# =====================================================
+
+def summary(root=ARCHIVE_DIR):
+    paths = object_paths(root)
+    stored = sum(os.path.getsize(p) for p in paths)
+    fetches, raw = 0, 0
+    for day in snapshot_dates(root):
+        with open(os.path.join(root, "snapshots", f"{day}.jsonl"), encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    fetches += 1
+                    raw += json.loads(line)["bytes"]
+    return {
+        "snapshot_days": len(snapshot_dates(root)),
+        "fetches": fetches,
+        "objects": len(paths),
+        "fetched_bytes": raw,
+        "stored_bytes": stored,
+        "dict_id": read_state(root)["dict_id"],
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect the raw HTML archive")
+    parser.add_argument("--root", default=ARCHIVE_DIR)
+    parser.add_argument("--train", action="store_true", help="retrain the zstd dictionary now")
+    parser.add_argument("--as-of", help="list the pages a --reparse of this date would use")
+    args = parser.parse_args()
+
+    if args.train:
+        if zstd() is None:
+            raise SystemExit("zstandard is not installed")
+        print(f"Trained dictionary: {train_dictionary(args.root)}")
+    if args.as_of:
+        for market, entry in sorted(snapshot(args.as_of, args.root).items()):
+            print(f"{market:<4} {entry['fetched_at']}  {entry['sha256'][:16]}  {entry['bytes']:>10,} B")
+    else:
+        stats = summary(args.root)
+        ratio = stats["stored_bytes"] / stats["fetched_bytes"] if stats["fetched_bytes"] else 0.0
+        print(f"{stats['fetches']} fetches over {stats['snapshot_days']} day(s), "
+              f"{stats['objects']} distinct pages")
+        print(f"{stats['fetched_bytes']:,} bytes fetched, {stats['stored_bytes']:,} stored "
+              f"({ratio:.1%}); dictionary: {stats['dict_id'] or 'none'}")
@@ -0,0 +1,99 @@
+import sys
+from array import array
+
+# =====================================================
+# COLUMNAR ROW BUILDER FOR SCRAPED LISTINGS
+# =====================================================
+# scrape_market() used to keep every parsed listing as a dict until the
+# DataFrame was built: ~1 KB of dict per row before any value. Listings are
+# now appended column by column instead:
+#   - categorical columns (company, drivetrain, class, seat, market) keep a
+#     1-byte code per row in an array plus one list of distinct values;
+#     the array widens to 2 / 4 bytes at the same category counts at which
+#     pandas widens Categorical codes
+#   - every other column is a list of interned strings, so spec values that
+#     repeat across listings ("219 Wh/mi", "5 sec") are stored once
+#
+# to_pandas() hands the code arrays to pandas.Categorical and the
+# DataFrame without copying them (np.frombuffer, copy=False); to_arrow()
+# builds DictionaryArrays from the same buffers (pyarrow is optional).
+# The code arrays cannot grow while such a view exists, so convert once,
+# after the last append().
+#
+# python -m scraping.bench_scrape_memory compares both representations.
+
+CATEGORICAL = ("company", "drivetrain", "class", "seat", "market")
+
+# (array typecode, categories it can hold), as pandas picks int8/16/32 codes
+CODE_TYPES = [("b", 127), ("h", 32767), ("i", 2**31 - 1)]
+
+class ColumnBuilder:
+    __slots__ = ("columns", "codes", "categories", "lookup", "values", "rows")
+
+    def __init__(self, columns, categorical=CATEGORICAL):
+        self.columns = list(columns)
+        self.codes = {c: array(CODE_TYPES[0][0]) for c in self.columns if c in categorical}
+        self.categories = {c: [] for c in self.codes}
+        self.lookup = {c: {} for c in self.codes}   # value -> code
+        self.values = {c: [] for c in self.columns if c not in self.codes}
+        self.rows = 0
+
+    def __len__(self):
+        return self.rows
+
+    def append(self, row):
+        # row: dict as parse_item() returns it; unknown keys are ignored,
+        # missing ones become None
+        for col, codes in self.codes.items():
+            value = row.get(col)
+            if value is None:
+                codes.append(-1)
+                continue
+            value = str(value)
+            code = self.lookup[col].get(value)
+            if code is None:
+                code = self.lookup[col][value] = len(self.categories[col])
+                self.categories[col].append(value)
+                codes = self.widen(col, codes)
+            codes.append(code)
+        for col, values in self.values.items():
+            value = row.get(col)
+            values.append(sys.intern(str(value)) if value is not None else None)
+        self.rows += 1
+
+    def widen(self, col, codes):
+        for typecode, limit in CODE_TYPES:
+            if len(self.categories[col]) < limit:
+                break
+        if typecode != codes.typecode:
+            codes = self.codes[col] = array(typecode, codes)
+        return codes
+
+    def to_pandas(self):
+        import numpy as np
+        import pandas as pd
+
+        data = {}
+        for col in self.columns:
+            if col in self.codes:
+                codes = np.frombuffer(self.codes[col], dtype=self.codes[col].typecode)
+                data[col] = pd.Categorical.from_codes(codes, categories=self.categories[col],
+                                                      validate=False)
+            else:
+                data[col] = self.values[col]
+        return pd.DataFrame(data, columns=self.columns, copy=False)
+
+    def to_arrow(self):
+        import numpy as np
+        import pyarrow as pa
+
+        arrays = []
+        for col in self.columns:
+            if col in self.codes:
+                codes = np.frombuffer(self.codes[col], dtype=self.codes[col].typecode)
+                indices = pa.array(codes, mask=codes < 0)
+                arrays.append(pa.DictionaryArray.from_arrays(
+                    indices, pa.array(self.categories[col], type=pa.string())))
+            else:
+                arrays.append(pa.array(self.values[col], type=pa.string()))
+        return pa.table(arrays, names=self.columns)
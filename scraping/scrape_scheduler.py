@@ -0,0 +1,323 @@
+import argparse
+import hashlib
+import heapq
+import json
+import math
+import os
+import random
+import threading
+from datetime import datetime, timedelta
+
+# =====================================================
+# ADAPTIVE RE-SCRAPE SCHEDULER
+# =====================================================
+# Decides which listing pages a scrape run fetches, instead of fetching
+# every selected market every time. One request fetches one market's
+# listing page, so pages are what is scheduled. Their priority comes from
+# the vehicles on them:
+#
+#   - after each fetch every vehicle (company, model, drivetrain) is
+#     compared with the previous fetch of its page; a changed price or spec
+#     counts as a change
+#   - each vehicle keeps exponentially decayed counts of changes and of
+#     hours observed (half-life HALF_LIFE_HOURS), so its change rate
+#     follows recent behaviour; new vehicles start from a weak prior
+#   - a page's priority is the number of its vehicles expected to have
+#     changed since it was last fetched:  sum(1 - exp(-rate * hours))
+#     plus the same term for vehicles appearing or disappearing
+#
+# Each run fetches, from a max-heap on that priority, the pages that are
+# due (priority >= MIN_EXPECTED_CHANGES, never fetched, or older than
+# MAX_AGE_HOURS) while the global budget allows: EV_SCRAPE_BUDGET
+# requests per BUDGET_WINDOW_HOURS, accruing as a token bucket so they
+# are spread over the window. Volatile pages are refreshed often, pages
+# that never change only every MAX_AGE_HOURS, and tokens no page needs
+# are not spent.
+#
+# Off unless EV_SCRAPE_BUDGET is set. State (per-vehicle rates, the
+# token bucket, the request ledger and the last queue) is kept in
+# scraping/state/; build it from past snapshots with --learn, and compare
+# against a fixed daily scrape with --simulate.
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+STATE_PATH = os.path.join(SCRIPT_DIR, "state", "scrape_schedule.json")
+
+BUDGET_ENV = "EV_SCRAPE_BUDGET"
+BUDGET_WINDOW_HOURS = 24
+# Requests that may be spent at once, as a share of the budget
+BURST_FRACTION = 0.25
+
+HALF_LIFE_HOURS = 14 * 24
+# Prior for a vehicle with no history: one change per PRIOR_HOURS
+PRIOR_CHANGES = 1.0
+PRIOR_HOURS = 7 * 24
+
+MIN_EXPECTED_CHANGES = 0.5
+MAX_AGE_HOURS = 7 * 24
+
+KEY_FIELDS = ("company", "model", "drivetrain")
+# Not compared: identity, and market (constant per page)
+IGNORED_FIELDS = set(KEY_FIELDS) | {"market"}
+
+def budget_from_env():
+    # Requests per window, or None when scheduling is off
+    value = os.environ.get(BUDGET_ENV, "").strip()
+    return int(value) if value else None
+
+def digest(parts):
+    h = hashlib.blake2b("\x1f".join("" if p is None else str(p) for p in parts).encode("utf-8"),
+                        digest_size=8)
+    return h.hexdigest()
+
+def fingerprint(rows):
+    # vehicle key -> hash of its values; a model listed twice gets one
+    # hash over both listings
+    listings = {}
+    for row in rows:
+        key = digest([row.get(f) for f in KEY_FIELDS])
+        values = digest([row[f] for f in sorted(row) if f not in IGNORED_FIELDS])
+        listings.setdefault(key, []).append(values)
+    return {key: digest(sorted(v)) for key, v in listings.items()}
+
+def rate(changes, hours):
+    return (changes + PRIOR_CHANGES) / (hours + PRIOR_HOURS)
+
+def stale_probability(changes, hours, elapsed):
+    return 1.0 - math.exp(-rate(changes, hours) * elapsed)
+
+class Scheduler:
+    """Per-page change rates, request ledger and fetch queue."""
+
+    def __init__(self, path=STATE_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.state = {"pages": {}, "fetches": [], "queue": []}
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.state = json.load(f)
+
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+
+    # ---------- PRIORITY ----------
+
+    def hours_since_fetch(self, market, now):
+        page = self.state["pages"].get(market)
+        if page is None:
+            return None
+        return (now - datetime.fromisoformat(page["last_fetch"])).total_seconds() / 3600
+
+    def expected_changes(self, market, now):
+        # Vehicles of this page expected to have changed since its last
+        # fetch; infinite for a page never fetched
+        elapsed = self.hours_since_fetch(market, now)
+        if elapsed is None:
+            return math.inf
+        page = self.state["pages"][market]
+        expected = sum(stale_probability(changes, hours, elapsed)
+                       for _, changes, hours in page["vehicles"].values())
+        return expected + stale_probability(page["listing_changes"], page["listing_hours"], elapsed)
+
+    def requests_in_window(self, now):
+        start = now - timedelta(hours=BUDGET_WINDOW_HOURS)
+        return sum(1 for t in self.state["fetches"] if datetime.fromisoformat(t) > start)
+
+    def tokens(self, budget, now):
+        # Token bucket: the budget accrues evenly over the window, so
+        # requests are spread out instead of spent in one burst
+        bucket = self.state.get("bucket")
+        if bucket is None:
+            return float(max(1, budget * BURST_FRACTION))
+        elapsed = (now - datetime.fromisoformat(bucket["at"])).total_seconds() / 3600
+        # Rounded so that e.g. 6 hours of 4/day make a whole token, not 0.9999...
+        return round(min(max(1.0, budget * BURST_FRACTION),
+                         bucket["tokens"] + elapsed * budget / BUDGET_WINDOW_HOURS), 9)
+
+    def charge(self, budget, now):
+        # Spends one token for a fetch that succeeded; caller holds the lock
+        self.state["bucket"] = {"tokens": self.tokens(budget, now) - 1,
+                                "at": now.isoformat(timespec="seconds")}
+
+    def plan(self, markets, budget, now=None):
+        # Markets to fetch now, highest priority first. Spends nothing and
+        # saves nothing: observe() charges the bucket and saves, and only
+        # for pages that were fetched and parsed
+        now = now or datetime.now()
+        heap, queue = [], []
+        for market in markets:
+            expected = self.expected_changes(market, now)
+            age = self.hours_since_fetch(market, now)
+            due = expected >= MIN_EXPECTED_CHANGES or age is None or age >= MAX_AGE_HOURS
+            heapq.heappush(heap, (-expected, market, due))
+
+        tokens = self.tokens(budget, now)
+        selected = []
+        while heap:
+            negative, market, due = heapq.heappop(heap)
+            fetch = due and tokens >= 1
+            if fetch:
+                selected.append(market)
+                tokens -= 1
+            queue.append({"market": market, "expected_changes": -negative,
+                          "due": due, "fetch": fetch})
+        with self.lock:
+            self.state["queue"] = [dict(q, expected_changes=min(q["expected_changes"], 1e9))
+                                   for q in queue]
+            self.state["planned_at"] = now.isoformat(timespec="seconds")
+        return selected, queue
+
+    # ---------- OBSERVATIONS ----------
+
+    def observe(self, market, rows, fetched_at=None, budget=None):
+        # Records one fetch of a page: rows are the parsed listings (dicts).
+        # With a budget, the fetch is also charged to the token bucket.
+        # Returns the number of vehicles that changed.
+        fetched_at = fetched_at or datetime.now()
+        current = fingerprint(rows)
+        with self.lock:
+            page = self.state["pages"].get(market)
+            changed = 0
+            if page is None:
+                page = {"vehicles": {}, "listing_changes": 0.0, "listing_hours": 0.0}
+                vehicles = {key: [value, 0.0, 0.0] for key, value in current.items()}
+            else:
+                elapsed = max(0.0, (fetched_at - datetime.fromisoformat(page["last_fetch"]))
+                              .total_seconds() / 3600)
+                decay = 0.5 ** (elapsed / HALF_LIFE_HOURS)
+                vehicles = {}
+                for key, value in current.items():
+                    old = page["vehicles"].get(key)
+                    if old is None:
+                        vehicles[key] = [value, 0.0, 0.0]
+                        continue
+                    was_changed = value != old[0]
+                    changed += was_changed
+                    vehicles[key] = [value, old[1] * decay + was_changed, old[2] * decay + elapsed]
+                listing_changed = set(current) != set(page["vehicles"])
+                page["listing_changes"] = page["listing_changes"] * decay + listing_changed
+                page["listing_hours"] = page["listing_hours"] * decay + elapsed
+            page["vehicles"] = vehicles
+            page["last_fetch"] = fetched_at.isoformat(timespec="seconds")
+            self.state["pages"][market] = page
+
+            # Ledger of requests, pruned to the budget window
+            start = fetched_at - timedelta(hours=BUDGET_WINDOW_HOURS)
+            self.state["fetches"] = [t for t in self.state["fetches"]
+                                     if datetime.fromisoformat(t) > start]
+            self.state["fetches"].append(fetched_at.isoformat(timespec="seconds"))
+            if budget:
+                self.charge(budget, fetched_at)
+            self.save()
+        return changed
+
+# =====================================================
+# LEARN FROM PAST SNAPSHOTS
+# =====================================================
+
+def learn(path=STATE_PATH):
+    # Rebuilds the state by replaying every page in the raw HTML archive
+    # in fetch order
+    from scraping import html_archive, web_scrape
+
+    scheduler = Scheduler(path=None)
+    entries = []
+    for day in html_archive.snapshot_dates():
+        with open(os.path.join(html_archive.ARCHIVE_DIR, "snapshots", f"{day}.jsonl"),
+                  encoding="utf-8") as f:
+            entries += [json.loads(line) for line in f if line.strip()]
+    entries.sort(key=lambda e: e["fetched_at"])
+    for entry in entries:
+        df = web_scrape.parse_market(entry["market"], html_archive.load_html(entry), save=False)
+        scheduler.observe(entry["market"], df.to_dict("records"),
+                          datetime.fromisoformat(entry["fetched_at"]))
+    # Replayed fetches are history, not spent budget
+    scheduler.state["fetches"] = []
+    scheduler.path = path
+    scheduler.save()
+    return len(entries)
+
+# =====================================================
+# SIMULATION: FIXED vs ADAPTIVE SCHEDULE
+# =====================================================
+
+def simulate(pages=6, vehicles=200, days=60, fixed_hours=24, budgets=(5, 4), seed=42):
+    # Pages differ in volatility by several orders of magnitude, as a
+    # price-war market and a quiet one do. Returns {schedule: (requests,
+    # average stale vehicles, average stale fraction)}, measured hourly.
+    #
+    # Seeds 42, 7 and 123 against the fixed daily scrape (360 requests):
+    #   5/day: 301 requests, stale 3.6% / 3.3% / 5.9% vs 4.3% / 4.1% / 6.5%,
+    #          fewer requests and fresher on every seed
+    #   4/day: 240 requests, stale 4.4% / 4.2% / 7.3%, a third fewer
+    #          requests but slightly staler than fixed
+    rng = random.Random(seed)
+    true_rates = {}
+    for p in range(pages):
+        page_rate = 10 ** rng.uniform(-5, -1.5)      # changes per vehicle-hour
+        true_rates[f"p{p}"] = [page_rate * rng.uniform(0.2, 1.8) for _ in range(vehicles)]
+
+    def run_schedule(adaptive, budget):
+        local = random.Random(seed + 1)
+        state = {m: [0] * vehicles for m in true_rates}       # true version per vehicle
+        seen = {m: [0] * vehicles for m in true_rates}        # version last fetched
+        scheduler = Scheduler(path=None)
+        start = datetime(2026, 1, 1)
+        requests, stale_sum = 0, 0
+        for hour in range(days * 24):
+            now = start + timedelta(hours=hour)
+            for m, rates in true_rates.items():
+                for v, r in enumerate(rates):
+                    if local.random() < r:
+                        state[m][v] += 1
+            if adaptive:
+                fetch, _ = scheduler.plan(list(true_rates), budget, now)
+            else:
+                fetch = list(true_rates) if hour % fixed_hours == 0 else []
+            for m in fetch:
+                requests += 1
+                seen[m] = list(state[m])
+                rows = [{"company": m, "model": str(v), "drivetrain": "", "price_raw": state[m][v]}
+                        for v in range(vehicles)]
+                scheduler.observe(m, rows, now, budget)
+            stale_sum += sum(a != b for m in true_rates for a, b in zip(state[m], seen[m]))
+        hours = days * 24
+        return requests, stale_sum / hours, stale_sum / hours / (pages * vehicles)
+
+    results = {f"fixed every {fixed_hours}h": run_schedule(False, None)}
+    for budget in budgets:
+        results[f"adaptive, {budget}/day"] = run_schedule(True, budget)
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Adaptive re-scrape scheduler")
+    parser.add_argument("--learn", action="store_true",
+                        help="rebuild the change rates from the raw HTML archive")
+    parser.add_argument("--simulate", action="store_true",
+                        help="compare a fixed daily scrape with the adaptive schedule on synthetic pages")
+    parser.add_argument("--budgets", type=int, nargs="+", default=[5, 4],
+                        help="adaptive budgets (requests per day) for --simulate; "
+                             "the fixed schedule makes 6")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.learn:
+        print(f"Replayed {learn()} archived fetches into {STATE_PATH}")
+    elif args.simulate:
+        print(f"{'schedule':<20} {'requests':>9} {'stale vehicles':>15} {'stale %':>8}")
+        for name, (requests, stale, fraction) in simulate(budgets=args.budgets, seed=args.seed).items():
+            print(f"{name:<20} {requests:>9} {stale:>15.1f} {fraction:>8.1%}")
+    else:
+        scheduler = Scheduler()
+        now = datetime.now()
+        print(f"Requests in the last {BUDGET_WINDOW_HOURS}h: {scheduler.requests_in_window(now)}")
+        for market in sorted(scheduler.state["pages"],
+                             key=lambda m: -scheduler.expected_changes(m, now)):
+            page = scheduler.state["pages"][market]
+            print(f"{market:<6} last fetch {page['last_fetch']}  {len(page['vehicles'])} vehicles  "
+                  f"expected changes now {scheduler.expected_changes(market, now):.2f}")
@@ -1,34 +1,32 @@
-import requests
-from bs4 import BeautifulSoup
-import pandas as pd
-import time
-import sys
 import os
-from datetime import datetime
+import re
+import sys
+import time
 import traceback
-
-# =====================================================
-# LOGGING SETUP (DYNAMIC)
-# =====================================================
+from concurrent.futures import ThreadPoolExecutor
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, ".."))
-LOG_DIR = os.path.join(PROJECT_ROOT, "logs")
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
 
-os.makedirs(LOG_DIR, exist_ok=True)
+from common import bronze_shards, markets, metrics, pipeline_log
+from common.context import get_context
+from scraping import html_archive, scrape_scheduler
+from scraping.scrape_columns import ColumnBuilder
 
-log_filename = f"scraping_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
-log_path = os.path.join(LOG_DIR, log_filename)
+# requests, bs4 and pandas are imported inside run() so that importing
+# this module (e.g. from run_pipeline.py) stays cheap and side-effect free.
+HEAVY_IMPORTS = ("requests", "bs4", "pandas")
 
-def write_log(msg):
-    with open(log_path, "a", encoding="utf-8") as f:
-        f.write(msg + "\n")
+# =====================================================
+# LOGGING SETUP (DYNAMIC)
+# =====================================================
 
-def log(msg):
-    ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    line = f"[{ts}] {msg}"
-    print(line)
-    write_log(line)
+logger = pipeline_log.get_logger("scrape")
+
+def log(msg, level=pipeline_log.INFO):
+    logger.log(level, msg)
 
 # =====================================================
 # NORMALIZATION MAP FOR SPEC LABELS
@@ -73,179 +71,306 @@ NORMALIZE = {
 }
 
 # =====================================================
-# SCRAPING URL + HEADERS
+# SCRAPING URLS + HEADERS
 # =====================================================
-
-URL = "https://ev-database.org/uk/#group=vehicle-group&rs-pr=10000_100000&rs-er=0_500&rs-ld=0_500&rs-ac=2_23&rs-dcfc=0_400&rs-ub=10_200&rs-tw=0_2500&rs-ef=150_600&rs-sa=-1_5&rs-w=1000_3500&rs-c=0_5000&rs-y=2010_2030&s=1&p=82-10"
+# Listing URLs and currencies per market live in common/markets.py
 
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36"
 }
 
-log("========== STARTING SCRAPING ==========")
-log(f"Requesting URL: {URL}")
-
-# =====================================================
-# REQUEST PAGE
-# =====================================================
+BRONZE_DIR = os.path.join(PROJECT_ROOT, "bronze")
 
-try:
-    resp = requests.get(URL, headers=HEADERS, timeout=15)
-    resp.raise_for_status()
-    html = resp.text
-    log(" Page fetched successfully.")
-except Exception as e:
-    log(" ERROR FETCHING URL")
-    log(str(e))
-    traceback.print_exc()
-    sys.exit(1)
+# EV_SCRAPE_REPARSE=YYYY-MM-DD rebuilds the partitions from the pages
+# archived on or before that date (scraping/html_archive.py) instead of
+# fetching the site
+REPARSE_ENV = "EV_SCRAPE_REPARSE"
 
-soup = BeautifulSoup(html, "html.parser")
+expected_cols = [
+    "company", "model", "drivetrain", "class", "seat",
+    "price_raw",
+    "range_raw", "efficiency", "weight",
+    "zero_to_sixty", "one_stop_range",
+    "battery", "rapidcharge", "towing",
+    "boot_space", "price_range",
+    "market"
+]
 
 # =====================================================
-# SCRAPING LOOP
+# PARSE ONE LISTING ITEM
 # =====================================================
 
-rows = []
-items = soup.select("div.list-item")
+def price_pattern(symbol):
+    # The market's currency symbol next to the number, on either side:
+    # "£44,990*", "€ 52.990", "52 990 €"
+    symbol = re.escape(symbol)
+    return re.compile(rf"{symbol}\s*\d|\d\s*{symbol}")
+
+def parse_item(item, price_symbol="£"):
+    a = item.select_one("a.title") or item.find("a")
+    if not a:
+        return None
+
+    # company
+    company = ""
+    for sp in a.find_all("span"):
+        if "model" in (sp.get("class") or []) or "hidden" in (sp.get("class") or []):
+            continue
+        txt = sp.get_text(strip=True)
+        if txt:
+            company = txt
+            break
+
+    # model
+    model_tag = a.select_one("span.model")
+    model = model_tag.get_text(strip=True) if model_tag else ""
+
+    # drivetrain
+    drivetrain = ""
+    icons_row = item.select_one(".icons .icons-row-1") or item.select_one(".icons-row-1")
+    if icons_row:
+        tooltip = icons_row.find(attrs={"data-tooltip": True})
+        if tooltip:
+            drivetrain = tooltip.get("data-tooltip", "").strip()
+
+    # market class
+    market_class = ""
+    ms_tag = item.find(attrs={"data-tooltip": lambda v: v and "Market Segment" in v})
+    if ms_tag:
+        inner = ms_tag.get_text(strip=True)
+        market_class = inner or ms_tag.get("data-tooltip", "").split(":")[-1].strip()
+
+    # seat
+    seat = ""
+    tooltip_wr = item.select_one(".tooltip-wrapper")
+    if tooltip_wr:
+        seat = tooltip_wr.get_text(strip=True)
+
+    # price_raw: extract from <div class="price_buy"> when it is in the
+    # market's own currency; silver parses it using that currency
+    price_raw = None
+    price_div = item.select_one("div.price_buy")
+    if price_div:
+        txt = price_div.get_text(strip=True)
+        if price_pattern(price_symbol).search(txt):
+            price_raw = txt
+
+    row = {
+        "company": company,
+        "model": model,
+        "drivetrain": drivetrain,
+        "class": market_class,
+        "seat": seat,
+        "price_raw": price_raw
+    }
+
+    # SPEC DETAILS
+    specs_div = item.select_one("div.specs")
+    if specs_div:
+        for spec_block in specs_div.find_all(recursive=False):
+            label_tag = spec_block.select_one("span.label")
+            if not label_tag:
+                continue
 
-log(f"Found {len(items)} vehicle items.")
+            raw_label = label_tag.get_text(strip=True)
+            norm_label = NORMALIZE.get(raw_label)
 
-for idx, item in enumerate(items, start=1):
-    try:
-        a = item.select_one("a.title") or item.find("a")
-        if not a:
-            continue
+            if not norm_label:
+                continue  # skip unknown labels
 
-        # company
-        company = ""
-        for sp in a.find_all("span"):
-            if "model" in (sp.get("class") or []) or "hidden" in (sp.get("class") or []):
-                continue
-            txt = sp.get_text(strip=True)
-            if txt:
-                company = txt
-                break
-
-        # model
-        model_tag = a.select_one("span.model")
-        model = model_tag.get_text(strip=True) if model_tag else ""
-
-        # drivetrain
-        drivetrain = ""
-        icons_row = item.select_one(".icons .icons-row-1") or item.select_one(".icons-row-1")
-        if icons_row:
-            tooltip = icons_row.find(attrs={"data-tooltip": True})
-            if tooltip:
-                drivetrain = tooltip.get("data-tooltip", "").strip()
-
-        # market class
-        market_class = ""
-        ms_tag = item.find(attrs={"data-tooltip": lambda v: v and "Market Segment" in v})
-        if ms_tag:
-            inner = ms_tag.get_text(strip=True)
-            market_class = inner or ms_tag.get("data-tooltip", "").split(":")[-1].strip()
-
-        # seat
-        seat = ""
-        tooltip_wr = item.select_one(".tooltip-wrapper")
-        if tooltip_wr:
-            seat = tooltip_wr.get_text(strip=True)
-
-        # price_raw: extract from <div class="price_buy">
-        price_raw = None
-        price_div = item.select_one("div.price_buy")
-        if price_div:
-            txt = price_div.get_text(strip=True)
-            if txt.startswith("£"):
-                price_raw = txt
-
-        row = {
-            "company": company,
-            "model": model,
-            "drivetrain": drivetrain,
-            "class": market_class,
-            "seat": seat,
-            "price_raw": price_raw
-        }
-
-        # SPEC DETAILS
-        specs_div = item.select_one("div.specs")
-        if specs_div:
-            for spec_block in specs_div.find_all(recursive=False):
-                label_tag = spec_block.select_one("span.label")
-                if not label_tag:
+            value = ""
+            for sp in spec_block.find_all("span"):
+                if sp is label_tag:
+                    continue
+                if "hidden" in (sp.get("class") or []):
                     continue
+                txt = sp.get_text(strip=True)
+                if txt:
+                    value = txt
+                    break
 
-                raw_label = label_tag.get_text(strip=True)
-                norm_label = NORMALIZE.get(raw_label)
+            row[norm_label] = value
 
-                if not norm_label:
-                    continue  # skip unknown labels
+    return row
 
-                value = ""
-                for sp in spec_block.find_all("span"):
-                    if sp is label_tag:
-                        continue
-                    if "hidden" in (sp.get("class") or []):
-                        continue
-                    txt = sp.get_text(strip=True)
-                    if txt:
-                        value = txt
-                        break
+# =====================================================
+# SCRAPE ONE MARKET
+# =====================================================
 
-                row[norm_label] = value
+def scrape_market(market):
+    import requests
 
-        rows.append(row)
+    url = markets.MARKETS[market]["url"]
+    start = time.perf_counter()
+    log(f"[{market}] Requesting URL: {url}")
 
-        if idx % 10 == 0:
-            log(f"Processed {idx} vehicles...")
+    # =====================================================
+    # REQUEST PAGE
+    # =====================================================
 
-    except Exception as scrape_err:
-        log(f"❌ Error parsing item #{idx}: {scrape_err}")
-        traceback.print_exc()
+    resp = requests.get(url, headers=HEADERS, timeout=15)
+    resp.raise_for_status()
+    html = resp.text
+    log(f"[{market}] Page fetched successfully.")
 
-# =====================================================
-# CREATE DATAFRAME
-# =====================================================
+    # The raw page is archived before parsing, so a parser fix can be
+    # replayed over it later (--reparse). Archiving never fails the scrape.
+    try:
+        digest, written = html_archive.store(market, url, resp.content,
+                                              resp.encoding or resp.apparent_encoding)
+        log(f"[{market}] Archived page {digest[:12]} "
+            f"({'already stored' if not written else f'{written:,} bytes compressed'})")
+    except Exception as e:
+        log(f"[{market}] Could not archive page: {e!r}", pipeline_log.WARNING)
+
+    return parse_market(market, html, start)
+
+def reparse_market(market, entry):
+    start = time.perf_counter()
+    html = html_archive.load_html(entry)
+    log(f"[{market}] Re-parsing archived page {entry['sha256'][:12]} "
+        f"fetched {entry['fetched_at']}")
+    return parse_market(market, html, start)
+
+def parse_market(market, html, start=None, save=True):
+    # Returns the market's DataFrame; save=False only parses (used by
+    # scrape_scheduler.py to learn from archived pages)
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+
+    # =====================================================
+    # SCRAPING LOOP
+    # =====================================================
+
+    # Parsed listings are stored column by column (scrape_columns.py), not
+    # as one dict per row
+    rows = ColumnBuilder(expected_cols)
+    items = soup.select("div.list-item")
+
+    log(f"[{market}] Found {len(items)} vehicle items.")
+
+    for idx, item in enumerate(items, start=1):
+        try:
+            row = parse_item(item, markets.currency_symbol(market))
+            if row is None:
+                continue
 
-df = pd.DataFrame(rows)
-log(f"Total scraped rows: {len(df)}")
+            row["market"] = market
+            rows.append(row)
 
-if df.empty:
-    log("❌ SCRAPING FAILED — NO DATA FOUND.")
-    sys.exit(1)
+            if idx % 100 == 0:
+                log(f"[{market}] Processed {idx} vehicles...")
 
-# =====================================================
-# ENSURE STANDARDIZED COLUMNS
-# =====================================================
+        except Exception as scrape_err:
+            log(f"[{market}] ❌ Error parsing item #{idx}: {scrape_err}", pipeline_log.ERROR)
+            traceback.print_exc()
 
-expected_cols = [
-    "company", "model", "drivetrain", "class", "seat",
-    "price_raw",
-    "range_raw", "efficiency", "weight",
-    "zero_to_sixty", "one_stop_range",
-    "battery", "rapidcharge", "towing",
-    "boot_space", "price_range"
-]
+    # =====================================================
+    # CREATE DATAFRAME
+    # =====================================================
 
-for col in expected_cols:
-    if col not in df.columns:
-        df[col] = None
+    # Already in expected_cols order; labels a listing lacked are empty
+    log(f"[{market}] Total scraped rows: {len(rows)}")
 
-df = df[expected_cols]
+    if not len(rows):
+        raise RuntimeError(f"SCRAPING FAILED — NO DATA FOUND for market {market}")
 
-# =====================================================
-# SAVE CLEAN CSV TO BRONZE
-# =====================================================
+    df = rows.to_pandas()
+    if not save:
+        return df
 
-BRONZE_DIR = os.path.join(PROJECT_ROOT, "bronze")
-os.makedirs(BRONZE_DIR, exist_ok=True)
+    # =====================================================
+    # SAVE MARKET PARTITION TO BRONZE
+    # =====================================================
+    # Written to a temp file and renamed, so a failed market never leaves
+    # a half-written partition behind
 
-csv_path = os.path.join(BRONZE_DIR, "scrapedData.csv")
-df.to_csv(csv_path, index=False, encoding="utf-8")
+    path = markets.csv_path(market)
+    tmp_path = path + ".tmp"
+    df.to_csv(tmp_path, index=False, encoding="utf-8")
+    os.replace(tmp_path, path)
 
-log(f" Saved scraped data to: {csv_path}")
-log("========== SCRAPING COMPLETE ==========")
+    # ... and cut into shards for the parallel bronze load
+    manifest = bronze_shards.write_shards(market, df, source=path)
 
-time.sleep(1)
+    log(f"[{market}] Saved {len(df)} rows to: {path}, {manifest['shards']} shards "
+        f"({time.perf_counter() - start:.2f}s)")
+    return df
+
+# =====================================================
+# STAGE ENTRY POINT
+# =====================================================
+# Markets are independent and the time is spent waiting on the network,
+# so they are fetched in parallel: N markets take about as long as the
+# slowest one instead of N times one.
+
+def run(ctx=None):
+    ctx = get_context(ctx)
+    pipeline_log.configure(ctx, "scrape", "scraping")
+
+    selected = markets.selected_markets()
+    os.makedirs(BRONZE_DIR, exist_ok=True)
+    reparse = os.environ.get(REPARSE_ENV, "").strip()
+
+    log("========== STARTING SCRAPING ==========")
+    log(f"Markets: {', '.join(selected)}")
+
+    if reparse:
+        pages = html_archive.snapshot(reparse)
+        missing = [m for m in selected if m not in pages]
+        if missing:
+            log(f"❌ No archived page on or before {reparse} for: {', '.join(missing)}",
+                pipeline_log.ERROR)
+            sys.exit(1)
+        log(f"Re-parsing the archive as of {reparse} (no fetch)")
+
+    # With a request budget, only the pages the scheduler finds due are
+    # fetched; the other partitions keep their last scrape
+    budget = scrape_scheduler.budget_from_env()
+    scheduler = None
+    if budget and not reparse:
+        scheduler = scrape_scheduler.Scheduler()
+        due, queue = scheduler.plan(selected, budget)
+        for q in queue:
+            log(f"[{q['market']}] expected changes {q['expected_changes']:.2f}, "
+                f"{'fetch' if q['fetch'] else 'due, over budget' if q['due'] else 'not due'}")
+        selected = due
+        if not selected:
+            log("No market due for a re-scrape; partitions left as they are.")
+            log("========== SCRAPING COMPLETE ==========")
+            return 0
+
+    start = time.perf_counter()
+    results, failed = {}, []
+    with ThreadPoolExecutor(max_workers=len(selected)) as pool:
+        if reparse:
+            futures = {m: pool.submit(reparse_market, m, pages[m]) for m in selected}
+        else:
+            futures = {m: pool.submit(scrape_market, m) for m in selected}
+        for market, future in futures.items():
+            try:
+                df = future.result()
+                results[market] = len(df)
+                if scheduler:
+                    changed = scheduler.observe(market, df.to_dict("records"), budget=budget)
+                    log(f"[{market}] {changed} vehicle(s) changed since the last fetch")
+            except Exception as e:
+                failed.append(market)
+                log(f"[{market}] ❌ ERROR: {e}", pipeline_log.ERROR)
+                traceback.print_exc()
+
+    if failed:
+        log(f"❌ SCRAPING FAILED for: {', '.join(failed)}", pipeline_log.ERROR)
+        sys.exit(1)
+
+    total = sum(results.values())
+    metrics.add_rows(logger.stage, total)
+    log(f"Scraped {total} rows from {len(selected)} market(s) in {time.perf_counter() - start:.2f}s")
+    log("========== SCRAPING COMPLETE ==========")
+
+    return total
+
+if __name__ == "__main__":
+    metrics.run_stage(get_context(), logger.stage, run)
+    time.sleep(1)
@@ -0,0 +1,91 @@
+import argparse
+import hashlib
+import os
+import sys
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from bronze import synthetic_bronze
+from common.sql_backend import ENGINES, Backend, parity_snapshot, run_transforms
+
+# =====================================================
+# PARALLEL SILVER: SPEEDUP + SERIAL PARITY
+# =====================================================
+# Runs the whole transformation once per worker count (1 = serial) on the
+# same bronze CSV and checks that every parallel run produced exactly the
+# serial silver tables -- every row of every table, not just aggregates --
+# and the same gold parity snapshot. Exit code 1 on any difference.
+#
+#   python silver/bench_silver_parallel.py --engine duckdb --rows 1000000 --workers 1 2 4
+#
+# On MySQL the partitions run on separate pooled connections, as in
+# silver_load.py (DataWarehouse_*_bench schemas); DuckDB runs them on
+# separate cursors, SQLite one after another.
+
+WORKERS = [1, 2, 4]
+
+# Table -> its key, for a stable row order
+SILVER_TABLES = {
+    "silver_manufacturer": "manufacturer_id",
+    "silver_bronze_map": "bronze_id",
+    "silver_vehicle": "vehicle_id",
+    "silver_specs": "spec_id",
+}
+
+def table_digest(backend, table, key):
+    # (rows, SHA-256 of every row in key order)
+    h = hashlib.sha256()
+    cursor = backend.execute(f"SELECT * FROM DataWarehouse_silver.{table} ORDER BY {key};")
+    rows = 0
+    while True:
+        batch = cursor.fetchmany(10_000)
+        if not batch:
+            break
+        rows += len(batch)
+        for row in batch:
+            h.update(repr(tuple(row)).encode("utf-8"))
+    return rows, h.hexdigest()
+
+def run(engine, rows, csv_path, seed, worker_counts):
+    if csv_path is None:
+        csv_path = synthetic_bronze.cached(rows, seed)
+
+    results = {}
+    for workers in worker_counts:
+        backend = Backend(engine, schema_suffix="_bench")
+        try:
+            timings = run_transforms(backend, csv_path, log=lambda msg: None, workers=workers)
+            digests = {t: table_digest(backend, t, k) for t, k in SILVER_TABLES.items()}
+            results[workers] = (timings["silver"], digests, parity_snapshot(backend))
+        finally:
+            backend.close()
+        print(f"[{engine}] {workers} worker(s): silver {timings['silver']:.2f}s")
+
+    baseline = min(results)
+    base_seconds, base_digests, base_parity = results[baseline]
+    ok = True
+    print()
+    print(f"{'workers':>8} {'silver':>9} {'speedup':>8}  parity with {baseline} worker(s)")
+    for workers, (seconds, digests, parity) in results.items():
+        diffs = [t for t in SILVER_TABLES if digests[t] != base_digests[t]]
+        diffs += [name for name in parity if parity[name] != base_parity[name]]
+        ok &= not diffs
+        print(f"{workers:>8} {seconds:>8.2f}s {base_seconds / seconds:>7.2f}x  "
+              f"{'identical' if not diffs else 'DIFFERS: ' + ', '.join(diffs)}")
+    for table, (count, _) in base_digests.items():
+        print(f"  {table}: {count:,} rows")
+    return ok
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parallel vs serial silver load")
+    parser.add_argument("--engine", choices=ENGINES, default="duckdb")
+    parser.add_argument("--rows", type=int, default=100_000, help="synthetic bronze rows")
+    parser.add_argument("--csv", help="use this bronze CSV instead of synthetic rows")
+    parser.add_argument("--workers", type=int, nargs="+", default=WORKERS,
+                        help=f"worker counts to compare (default {WORKERS}; the smallest is the baseline)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    sys.exit(0 if run(args.engine, args.rows, args.csv, args.seed, args.workers) else 1)
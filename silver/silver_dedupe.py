@@ -0,0 +1,303 @@
+import hashlib
+import re
+from collections import deque
+
+from common.keys import company_key, fold
+
+# =====================================================
+# SILVER DEDUPLICATION
+# =====================================================
+# Decides, for every bronze row, which vehicle it belongs to and whether
+# its specs are kept. decide() resolves the vehicle's ids through the key
+# cache (silver_keys.py); silver_load.py stores the result in
+# silver_bronze_map and builds silver_vehicle / silver_specs from it, so a
+# model listed twice becomes one vehicle instead of a join fan-out.
+#
+# Rows are streamed in (company key, model) order and compared in three steps:
+#   1. exact row:  same vehicle and identical specs -> specs dropped
+#   2. exact key:  same normalised (company, model, market) -> same vehicle,
+#                  e.g. "AWD(Highland)" vs "AWD (Highland)" or case/accent
+#                  differences
+#   3. fuzzy name: same company, market and drivetrain, and names that
+#                  differ by one typo in one word ("Elecrtic" / "Electric")
+#                  with character-trigram Jaccard >= FUZZY_THRESHOLD.
+#                  Different words, codes or numbers never merge, so
+#                  "Turbo" / "Turbo S", "SWB" / "LWB" and "39 kWh" / "64 kWh"
+#                  stay apart.
+#
+# Fuzzy candidates come from blocks keyed by the name with one word blanked
+# out ("ev6 gt line _"): a typo variant always shares the block of its
+# misspelt word, so a name is only compared with the few vehicles in its
+# own blocks (at most BLOCK_WINDOW each), never with the whole company.
+# The cost per row is constant and state is reset whenever the company
+# changes, so memory is bounded by the largest manufacturer.
+#
+# Every merge is reported as an audit row (silver_dedupe_audit).
+
+FUZZY_THRESHOLD = 0.5
+BLOCK_WINDOW = 64
+# Words shorter than this are codes (SWB, ER, GT) and must match exactly
+TYPO_MIN_LENGTH = 4
+# Bronze rows per fetchmany() batch
+FETCH_ROWS = 10_000
+
+# Columns read from bronze, in this order, plus the company key
+BRONZE_COLUMNS = [
+    "id", "company", "model", "drivetrain", "class", "seat", "price_raw",
+    "range_raw", "efficiency", "weight", "zero_to_sixty", "one_stop_range",
+    "battery", "rapidcharge", "towing", "boot_space", "price_range", "market",
+    "company_key",
+]
+
+# Compared for repeated listings: everything but id, company, model, market
+SPEC_COLUMNS = BRONZE_COLUMNS[3:17]
+
+# Bronze is sorted on the Deduper's own company key (silver_company_key,
+# one row per distinct company name, filled by the loader from
+# company_key_rows), so a company never comes back once the Deduper has
+# moved past it. The raw name would not do: "Mercedes Benz" < "Mercedes-AMG"
+# < "Mercedes-Benz", and the first and last are one company.
+SELECT_COMPANIES_SQL = (
+    "SELECT DISTINCT company FROM DataWarehouse_bronze.ev_specs_bronze WHERE company IS NOT NULL;"
+)
+
+SELECT_BRONZE_SQL = (
+    "SELECT " + ", ".join("b." + c for c in BRONZE_COLUMNS[:-1]) + ", ck.company_key "
+    "FROM DataWarehouse_bronze.ev_specs_bronze b "
+    "LEFT JOIN DataWarehouse_silver.silver_company_key ck ON ck.company = b.company "
+    "ORDER BY COALESCE(ck.company_key, ''), LOWER(TRIM(b.model)), b.id;"
+)
+
+# =====================================================
+# NORMALISATION
+# =====================================================
+
+# fold() and company_key() come from common/keys.py, which bronze_shards.py
+# shards on as well.
+# "+" and "#" name a different trim ("EQA 250+" is not "EQA 250", "#1 Pro+"
+# is not "#1 Pro"), so model names keep them as tokens of their own
+TOKEN = re.compile(r"[a-z]+|\d+(?:\.\d+)?|[+#]")
+
+def name_tokens(text):
+    return TOKEN.findall(fold(text))
+
+def company_key_rows(companies):
+    # (company, company_key) for silver_company_key
+    return [(company, company_key(company)) for company in companies]
+
+def digest(*parts):
+    # 8-byte key; far smaller in memory than the strings it stands for
+    h = hashlib.blake2b("\x1f".join(parts).encode("utf-8"), digest_size=8)
+    return int.from_bytes(h.digest(), "big")
+
+def exact_key(company, tokens, market):
+    # company already folded to its tokens; spacing and punctuation ignored
+    return digest(company, "".join(tokens), market or "")
+
+def trigrams(tokens):
+    text = f" {' '.join(tokens)} "
+    return frozenset(text[i:i + 3] for i in range(len(text) - 2))
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    common = len(a & b)
+    return common / (len(a) + len(b) - common)
+
+def one_edit(a, b):
+    # True when a and b differ by one insertion, deletion, substitution or
+    # swap of adjacent letters
+    if abs(len(a) - len(b)) > 1 or a == b:
+        return False
+    if len(a) == len(b):
+        diff = [i for i in range(len(a)) if a[i] != b[i]]
+        return len(diff) == 1 or (len(diff) == 2 and diff[1] == diff[0] + 1
+                                  and a[diff[0]] == b[diff[1]] and a[diff[1]] == b[diff[0]])
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    return a[i:] == b[i + 1:]
+
+def blanked(tokens):
+    # (position, name with that word blanked) for every word that may carry
+    # a typo; codes and numbers are never blanked, so they must match
+    for i, token in enumerate(tokens):
+        if token.isalpha() and len(token) >= TYPO_MIN_LENGTH:
+            yield i, tokens[:i] + ("",) + tokens[i + 1:]
+
+# =====================================================
+# DEDUPER
+# =====================================================
+
+class Deduper:
+    """Streaming dedupe; feed rows in SELECT_BRONZE_SQL order."""
+
+    def __init__(self, threshold=FUZZY_THRESHOLD, window=BLOCK_WINDOW):
+        self.threshold = threshold
+        self.window = window
+        self.counts = {"rows": 0, "vehicles": 0, "exact_key": 0, "fuzzy_name": 0, "repeated": 0}
+        self.reset(None)
+
+    def reset(self, company):
+        self.company = company
+        self.keys = {}        # exact key -> (vehicle bronze id, canonical model, its key)
+        self.row_hashes = set()
+        self.blocks = {}      # block key -> deque of (bronze id, model, key, tokens)
+
+    def add(self, row):
+        # row: dict with BRONZE_COLUMNS. Returns ((vehicle key, defines the
+        # vehicle, keep spec), audit row or None); the vehicle key is the
+        # exact key of the vehicle's canonical row
+        self.counts["rows"] += 1
+        bronze_id, model, market = row["id"], row["model"] or "", row["market"] or ""
+        company = row.get("company_key")
+        if company is None:
+            company = company_key(row["company"])
+        if company != self.company:
+            self.reset(company)
+
+        tokens = tuple(name_tokens(model))
+        key = exact_key(company, tokens, market)
+        match = self.keys.get(key)
+        method, similarity = "exact_key", 1.0
+
+        if match is None:
+            drivetrain = fold(row["drivetrain"])
+            block_keys = [(market, drivetrain, i, words) for i, words in blanked(tokens)]
+            best = None
+            for block_key in block_keys:
+                i = block_key[2]
+                for other_id, other_model, other_key, other_tokens in self.blocks.get(block_key, ()):
+                    if not one_edit(tokens[i], other_tokens[i]):
+                        continue
+                    score = jaccard(trigrams(tokens), trigrams(other_tokens))
+                    if score >= self.threshold and (best is None or score > best[0]):
+                        best = (score, other_id, other_model, other_key)
+            if best:
+                similarity = best[0]
+                match = best[1:]
+                method = "fuzzy_name"
+                # Later spellings of the same name go straight to the vehicle
+                self.keys[key] = match
+
+        if match is None:
+            self.keys[key] = (bronze_id, model, key)
+            for block_key in block_keys:
+                block = self.blocks.get(block_key)
+                if block is None:
+                    block = self.blocks[block_key] = deque(maxlen=self.window)
+                block.append((bronze_id, model, key, tokens))
+            self.counts["vehicles"] += 1
+            vehicle_id, canonical, vehicle_key = bronze_id, model, key
+        else:
+            vehicle_id, canonical, vehicle_key = match
+
+        # Same vehicle and the same scraped values: a repeated listing. Only
+        # a merged row can repeat one, so the audit keeps the name match and
+        # flags the repeat
+        values = [(row[c] or "").strip() for c in SPEC_COLUMNS]
+        row_hash = digest(str(vehicle_id), *values)
+        keep_spec = row_hash not in self.row_hashes
+        self.row_hashes.add(row_hash)
+
+        audit = None
+        if vehicle_id != bronze_id:
+            self.counts[method] += 1
+            if not keep_spec:
+                self.counts["repeated"] += 1
+            audit = (bronze_id, vehicle_id, method, round(similarity, 4), int(not keep_spec),
+                     row["company"], model, canonical)
+        return (vehicle_key, vehicle_id == bronze_id, keep_spec), audit
+
+def dedupe_rows(deduper, rows):
+    # Python half of decide(), the part that needs no key cache: bronze
+    # tuples -> (bronze id, company key, company, vehicle key, defines the
+    # vehicle, keep spec, audit row or None) per row
+    decided = []
+    for values in rows:
+        row = dict(zip(BRONZE_COLUMNS, values))
+        (vehicle_key, defines, keep_spec), audit = deduper.add(row)
+        decided.append((row["id"], deduper.company, row["company"], vehicle_key,
+                        defines, keep_spec, audit))
+    return decided
+
+def assign_keys(keys, decided, run_id):
+    # Deduped rows -> (map rows, audit rows) ready for silver_bronze_map /
+    # silver_dedupe_audit. Rows without a company get no map row and so no
+    # vehicle, as before.
+    map_rows, audit_rows = [], []
+    for bronze_id, company_key, company, vehicle_key, defines, keep_spec, audit in decided:
+        if audit:
+            audit_rows.append((run_id,) + audit)
+        manufacturer_id = keys.manufacturer_id(company_key, company)
+        if manufacturer_id is None:
+            continue
+        map_rows.append((bronze_id, manufacturer_id, keys.vehicle_id(vehicle_key),
+                         1 if defines else 0, 1 if keep_spec else 0))
+    return map_rows, audit_rows
+
+def decide(deduper, keys, rows, run_id):
+    # One batch of bronze tuples (BRONZE_COLUMNS order) -> (map rows,
+    # audit rows)
+    return assign_keys(keys, dedupe_rows(deduper, rows), run_id)
+
+# =====================================================
+# PARALLEL DEDUPE (PROCESS POOL)
+# =====================================================
+# The Deduper keeps no state across companies, so bronze cut at company
+# boundaries can be deduplicated in separate processes with the same
+# result. Keys are still assigned here, in one process and in bronze
+# order, so every id is the same as in a serial run.
+
+def company_chunks(batches, chunk_rows=FETCH_ROWS):
+    # Regroups fetchmany() batches into chunks of at least chunk_rows rows
+    # (the last may be smaller) that end where the company key changes;
+    # bronze is sorted on that key, so a company is never split
+    company, key_column = BRONZE_COLUMNS.index("company"), BRONZE_COLUMNS.index("company_key")
+    chunk, last_key = [], None
+    for batch in batches:
+        for values in batch:
+            key = values[key_column]
+            if key is None:
+                key = company_key(values[company])
+            if key != last_key:
+                if len(chunk) >= chunk_rows:
+                    yield chunk
+                    chunk = []
+                last_key = key
+            chunk.append(values)
+    if chunk:
+        yield chunk
+
+def dedupe_chunk(rows):
+    # Process-pool entry point
+    deduper = Deduper()
+    return dedupe_rows(deduper, rows), deduper.counts
+
+def decide_parallel(batches, keys, run_id, workers, counts):
+    # Yields (map rows, audit rows) per chunk, in bronze order; adds the
+    # dedupe counts of every chunk to counts. At most 2 * workers chunks
+    # are in flight, so memory stays bounded.
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    # spawn: the pipeline may run this from a thread, and forking a
+    # threaded process is unsafe
+    with ProcessPoolExecutor(max_workers=workers,
+                             mp_context=multiprocessing.get_context("spawn")) as pool:
+        pending = deque()
+        for chunk in company_chunks(batches):
+            pending.append(pool.submit(dedupe_chunk, chunk))
+            if len(pending) < 2 * workers:
+                continue
+            yield collect(pending.popleft(), keys, run_id, counts)
+        while pending:
+            yield collect(pending.popleft(), keys, run_id, counts)
+
+def collect(future, keys, run_id, counts):
+    decided, chunk_counts = future.result()
+    for name, value in chunk_counts.items():
+        counts[name] = counts.get(name, 0) + value
+    return assign_keys(keys, decided, run_id)
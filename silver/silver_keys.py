@@ -0,0 +1,107 @@
+import sys
+
+from silver import silver_dedupe
+
+# =====================================================
+# SURROGATE-KEY CACHE (MANUFACTURERS / VEHICLES)
+# =====================================================
+# manufacturer_id and vehicle_id are handed out here instead of by
+# AUTO_INCREMENT, so silver_bronze_map carries both ids for every bronze row
+# and silver_vehicle / silver_specs are loaded with them directly: no load
+# joins bronze back to a dimension on trimmed strings any more.
+#
+#   - the current dimension is read once, before silver is rebuilt, so an
+#     unchanged manufacturer or vehicle keeps its id from run to run
+#   - natural keys are normalised the way silver_dedupe.py compares rows
+#     (case, accents, spacing and punctuation folded); a vehicle's key is
+#     the 8-byte digest of (manufacturer, model, market)
+#   - unseen keys get the next ids from a counter that starts above the
+#     largest loaded id, with no round trip to MySQL; the ids reach MySQL
+#     in the executemany batches of silver_bronze_map
+#
+# The vehicle cache holds ints only (about 100 bytes per vehicle, so a few
+# hundred MB for millions of vehicles). Manufacturer names, the only
+# strings kept, are interned.
+
+CURRENT_MANUFACTURERS_SQL = """
+SELECT manufacturer_id, manufacturer_name
+FROM DataWarehouse_silver.silver_manufacturer;
+"""
+
+CURRENT_VEHICLES_SQL = """
+SELECT v.vehicle_id, m.manufacturer_name, v.model_name, v.market
+FROM DataWarehouse_silver.silver_vehicle v
+JOIN DataWarehouse_silver.silver_manufacturer m
+    ON m.manufacturer_id = v.manufacturer_id;
+"""
+
+def manufacturer_key(name):
+    return sys.intern(silver_dedupe.company_key(name))
+
+def vehicle_key(manufacturer, model, market):
+    return silver_dedupe.exact_key(manufacturer, silver_dedupe.name_tokens(model), market)
+
+class Dimension:
+    """Natural key -> surrogate id for one dimension table."""
+
+    def __init__(self):
+        self.ids = {}
+        self.next_id = 1
+        self.loaded = 0
+        self.created = 0
+
+    def load(self, rows):
+        # rows: (id, natural key) of the current table
+        for id_, key in rows:
+            self.ids[key] = id_
+            if id_ >= self.next_id:
+                self.next_id = id_ + 1
+        self.loaded = len(self.ids)
+
+    def get(self, key):
+        id_ = self.ids.get(key)
+        if id_ is None:
+            id_ = self.ids[key] = self.next_id
+            self.next_id += 1
+            self.created += 1
+        return id_
+
+class SilverKeys:
+    def __init__(self):
+        self.manufacturers = Dimension()
+        self.vehicles = Dimension()
+        # manufacturer id -> name, for the manufacturers seen in this load
+        self.names = {}
+
+    def load(self, cursor, batch_rows=silver_dedupe.FETCH_ROWS):
+        cursor.execute(CURRENT_MANUFACTURERS_SQL)
+        self.manufacturers.load((id_, manufacturer_key(name)) for id_, name in cursor.fetchall())
+        cursor.execute(CURRENT_VEHICLES_SQL)
+        while True:
+            rows = cursor.fetchmany(batch_rows)
+            if not rows:
+                break
+            self.vehicles.load(
+                (id_, vehicle_key(manufacturer_key(name), model, market))
+                for id_, name, model, market in rows
+            )
+
+    def manufacturer_id(self, key, name):
+        # None for rows without a company
+        if not key:
+            return None
+        id_ = self.manufacturers.get(key)
+        if id_ not in self.names:
+            self.names[id_] = sys.intern(name.strip())
+        return id_
+
+    def vehicle_id(self, key):
+        return self.vehicles.get(key)
+
+    def manufacturer_rows(self):
+        return sorted(self.names.items())
+
+    def summary(self):
+        return (f"{len(self.names)} manufacturers ({self.manufacturers.created} new), "
+                f"{self.vehicles.created} new vehicle ids "
+                f"({self.vehicles.loaded} loaded from the previous silver)")
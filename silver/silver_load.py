@@ -1,31 +1,29 @@
-import mysql.connector
 import traceback
 from datetime import datetime
 import os
-
-# =====================================================
-# LOGGING
-# =====================================================
+import re
+import sys
+import time
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, ".."))
-LOG_DIR = os.path.join(PROJECT_ROOT, "logs")
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
 
-if not os.path.exists(LOG_DIR):
-    os.makedirs(LOG_DIR)
+from common import db, markets, metrics, pipeline_log, slow_query
+from common.context import get_context
+from silver import silver_dedupe, silver_keys
 
-log_filename = f"silver_layer_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
-log_path = os.path.join(LOG_DIR, log_filename)
+HEAVY_IMPORTS = ("mysql.connector",)
+
+# =====================================================
+# LOGGING
+# =====================================================
 
-def write_log(msg):
-    with open(log_path, "a", encoding="utf-8") as f:
-        f.write(msg + "\n")
+logger = pipeline_log.get_logger("silver_load")
 
-def log(msg):
-    ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    line = f"[{ts}] {msg}"
-    print(line)
-    write_log(line)
+def log(msg, level=pipeline_log.INFO):
+    logger.log(level, msg)
 
 def now():
     return datetime.now()
@@ -34,71 +32,79 @@ def now():
 # SAFE SQL
 # =====================================================
 def safe_execute(cursor, sql, params=None, step_name="UNKNOWN"):
+    import mysql.connector
+
+    status = slow_query.before(logger.stage, cursor)
+    start = time.perf_counter()
     try:
         if params:
             cursor.execute(sql, params)
         else:
             cursor.execute(sql)
     except mysql.connector.Error as e:
-        log("==============================================")
-        log(f" SQL ERROR DURING STEP: {step_name}")
-        log("----------------------------------------------")
-        log(f"Message     : {e.msg}")
-        log(f"Error Code  : {e.errno}")
-        log("----------------------------------------------")
-        log("FAILED SQL:")
-        log(sql)
+        log("==============================================", pipeline_log.ERROR)
+        log(f" SQL ERROR DURING STEP: {step_name}", pipeline_log.ERROR)
+        log("----------------------------------------------", pipeline_log.ERROR)
+        log(f"Message     : {e.msg}", pipeline_log.ERROR)
+        log(f"Error Code  : {e.errno}", pipeline_log.ERROR)
+        log("----------------------------------------------", pipeline_log.ERROR)
+        log("FAILED SQL:", pipeline_log.ERROR)
+        log(sql, pipeline_log.ERROR)
         traceback.print_exc()
-        log("==============================================")
+        log("==============================================", pipeline_log.ERROR)
         raise e
+    elapsed = time.perf_counter() - start
+    metrics.record_sql(logger.stage, step_name, elapsed, cursor.rowcount)
+    slow_query.after(logger.stage, step_name, cursor, sql, params, elapsed, status)
 
-# =====================================================
-# MYSQL
-# =====================================================
-
-log("Starting Silver Layer ETL...")
-
-conn = mysql.connector.connect(
-    host="localhost",
-    user="EV_specs",
-    password="MDIS@2025"
-)
-cursor = conn.cursor()
+def safe_executemany(cursor, sql, rows, step="UNKNOWN"):
+    status = slow_query.before(logger.stage, cursor)
+    start = time.perf_counter()
+    try:
+        cursor.executemany(sql, rows)
+    except Exception as e:
+        log(f" ERROR during {step}: {e}", pipeline_log.ERROR)
+        traceback.print_exc()
+        raise
+    elapsed = time.perf_counter() - start
+    metrics.record_sql(logger.stage, step, elapsed, cursor.rowcount)
+    slow_query.after(logger.stage, step, cursor, sql, None, elapsed, status, plan=False)
 
 # =====================================================
-# PREP SCHEMA
+# SILVER SQL
 # =====================================================
-log("Preparing schema: DataWarehouse_silver")
-
-safe_execute(cursor, "CREATE DATABASE IF NOT EXISTS DataWarehouse_silver;")
-safe_execute(cursor, "DROP TABLE IF EXISTS DataWarehouse_silver.silver_specs;")
-safe_execute(cursor, "DROP TABLE IF EXISTS DataWarehouse_silver.silver_vehicle;")
-safe_execute(cursor, "DROP TABLE IF EXISTS DataWarehouse_silver.silver_manufacturer;")
-conn.commit()
 
-log("Creating Silver tables...")
+# Market -> currency and GBP rate, seeded from common/markets.py
+silver_market_ddl = """
+CREATE TABLE DataWarehouse_silver.silver_market (
+    market VARCHAR(8) PRIMARY KEY,
+    currency CHAR(3),
+    gbp_rate DECIMAL(12,6)
+);
+"""
 
-safe_execute(cursor, """
+silver_manufacturer_ddl = """
 CREATE TABLE DataWarehouse_silver.silver_manufacturer (
-    manufacturer_id INT AUTO_INCREMENT PRIMARY KEY,
+    manufacturer_id INT PRIMARY KEY,
     manufacturer_name VARCHAR(100) UNIQUE
 );
-""")
+"""
 
-safe_execute(cursor, """
+silver_vehicle_ddl = """
 CREATE TABLE DataWarehouse_silver.silver_vehicle (
-    vehicle_id INT AUTO_INCREMENT PRIMARY KEY,
+    vehicle_id INT PRIMARY KEY,
     manufacturer_id INT,
     model_name VARCHAR(200),
     drivetrain VARCHAR(50),
     class VARCHAR(50),
     seat INT,
+    market VARCHAR(8),
     FOREIGN KEY (manufacturer_id)
         REFERENCES DataWarehouse_silver.silver_manufacturer(manufacturer_id)
 );
-""")
+"""
 
-safe_execute(cursor, """
+silver_specs_ddl = """
 CREATE TABLE DataWarehouse_silver.silver_specs (
     spec_id INT AUTO_INCREMENT PRIMARY KEY,
     vehicle_id INT,
@@ -112,55 +118,98 @@ CREATE TABLE DataWarehouse_silver.silver_specs (
     towing_kg INT,
     boot_space_liters INT,
     price_per_mile INT,
+    currency CHAR(3),
+    price_local INT,
     price_gbp INT,
     FOREIGN KEY (vehicle_id)
         REFERENCES DataWarehouse_silver.silver_vehicle(vehicle_id)
 );
-""")
-
-conn.commit()
+"""
 
-log("Tables created.\n")
+# Bronze row -> its manufacturer and vehicle ids (silver_keys.py), whether
+# it is the row the vehicle is built from and whether its specs are kept
+# (silver_dedupe.py)
+silver_bronze_map_ddl = """
+CREATE TABLE DataWarehouse_silver.silver_bronze_map (
+    bronze_id INT PRIMARY KEY,
+    manufacturer_id INT NOT NULL,
+    vehicle_id INT NOT NULL,
+    defines_vehicle TINYINT NOT NULL,
+    keep_spec TINYINT NOT NULL
+);
+"""
 
-# =====================================================
-# LOAD MANUFACTURER
-# =====================================================
+# Every merge decision, kept across runs
+silver_dedupe_audit_ddl = """
+CREATE TABLE IF NOT EXISTS DataWarehouse_silver.silver_dedupe_audit (
+    audit_id INT AUTO_INCREMENT PRIMARY KEY,
+    run_id VARCHAR(64),
+    bronze_id INT,
+    merged_into_bronze_id INT,
+    method VARCHAR(16),
+    similarity DECIMAL(5,4),
+    repeated_listing TINYINT NOT NULL,
+    company VARCHAR(100),
+    model_name VARCHAR(200),
+    canonical_model_name VARCHAR(200),
+    INDEX run_id (run_id)
+);
+"""
 
-log("Loading: silver_manufacturer")
+# Company name -> silver_dedupe.company_key, for sorting bronze
+silver_company_key_ddl = """
+CREATE TABLE DataWarehouse_silver.silver_company_key (
+    company VARCHAR(100) PRIMARY KEY,
+    company_key VARCHAR(100) NOT NULL
+);
+"""
 
-safe_execute(cursor, """
-INSERT INTO DataWarehouse_silver.silver_manufacturer (manufacturer_name)
-SELECT DISTINCT TRIM(company)
-FROM DataWarehouse_bronze.ev_specs_bronze
-WHERE company IS NOT NULL AND TRIM(company) <> '';
-""")
+silver_company_key_sql = """
+INSERT INTO DataWarehouse_silver.silver_company_key (company, company_key)
+VALUES (%s, %s);
+"""
 
-conn.commit()
+silver_bronze_map_sql = """
+INSERT INTO DataWarehouse_silver.silver_bronze_map (
+    bronze_id, manufacturer_id, vehicle_id, defines_vehicle, keep_spec
+)
+VALUES (%s, %s, %s, %s, %s);
+"""
 
-cursor.execute("SELECT COUNT(*) FROM DataWarehouse_silver.silver_manufacturer")
-log(f"Inserted {cursor.fetchone()[0]} manufacturers.\n")
+silver_dedupe_audit_sql = """
+INSERT INTO DataWarehouse_silver.silver_dedupe_audit (
+    run_id, bronze_id, merged_into_bronze_id, method, similarity,
+    repeated_listing, company, model_name, canonical_model_name
+)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s);
+"""
 
-# =====================================================
-# LOAD VEHICLE
-# =====================================================
+silver_manufacturer_sql = """
+INSERT INTO DataWarehouse_silver.silver_manufacturer (manufacturer_id, manufacturer_name)
+VALUES (%s, %s);
+"""
 
-log("Loading: silver_vehicle")
+silver_market_sql = """
+INSERT INTO DataWarehouse_silver.silver_market (market, currency, gbp_rate)
+VALUES (%s, %s, %s);
+"""
 
-safe_execute(cursor, """
+silver_vehicle_sql = """
 INSERT INTO DataWarehouse_silver.silver_vehicle (
-    manufacturer_id, model_name, drivetrain, class, seat
+    vehicle_id, manufacturer_id, model_name, drivetrain, class, seat, market
 )
 SELECT
-    m.manufacturer_id,
+    k.vehicle_id,
+    k.manufacturer_id,
     b.model,
-    CASE 
+    CASE
         WHEN TRIM(b.drivetrain) = 'All Wheel Drive'  THEN 'AWD'
         WHEN TRIM(b.drivetrain) = 'Rear Wheel Drive' THEN 'RWD'
         WHEN TRIM(b.drivetrain) = 'Rare Wheel Drive' THEN 'RWD'
         WHEN TRIM(b.drivetrain) = 'Front Wheel Drive' THEN 'FWD'
         ELSE TRIM(b.drivetrain)
     END,
-    CASE 
+    CASE
         WHEN UPPER(TRIM(b.class)) = 'A' THEN 'mini'
         WHEN UPPER(TRIM(b.class)) = 'B' THEN 'compact'
         WHEN UPPER(TRIM(b.class)) = 'C' THEN 'medium'
@@ -171,34 +220,28 @@ SELECT
         WHEN UPPER(TRIM(b.class)) = 'S' THEN 'sports'
         ELSE TRIM(b.class)
     END,
-    b.seat
+    b.seat,
+    b.market
 FROM DataWarehouse_bronze.ev_specs_bronze b
-JOIN DataWarehouse_silver.silver_manufacturer m
-    ON TRIM(m.manufacturer_name) = TRIM(b.company);
-""")
-
-conn.commit()
-
-cursor.execute("SELECT COUNT(*) FROM DataWarehouse_silver.silver_vehicle")
-log(f"Inserted {cursor.fetchone()[0]} vehicles.\n")
-
-# =====================================================
-# LOAD SILVER SPECS (FIXED PRICE)
-# =====================================================
-
-log("Loading: silver_specs")
-
-safe_execute(cursor, "TRUNCATE TABLE DataWarehouse_silver.silver_specs;")
+-- One vehicle per dedupe group: only the row it is built from
+JOIN DataWarehouse_silver.silver_bronze_map k
+    ON k.bronze_id = b.id
+    AND k.defines_vehicle = 1;
+"""
 
+# spec_id is the bronze row's id rather than AUTO_INCREMENT's next value,
+# so the partitions of a parallel load number their rows exactly as one
+# serial INSERT does
 silver_specs_sql = """
 INSERT INTO DataWarehouse_silver.silver_specs (
-    vehicle_id, range_miles, efficiency_whpm, weight_kg,
+    spec_id, vehicle_id, range_miles, efficiency_whpm, weight_kg,
     zero_to_sixty_sec, one_stop_range_miles, battery_kwh,
     rapidcharge_kw, towing_kg, boot_space_liters,
-    price_per_mile, price_gbp
+    price_per_mile, currency, price_local, price_gbp
 )
 SELECT
-    v.vehicle_id,
+    k.bronze_id,
+    k.vehicle_id,
 
     CAST(NULLIF(REGEXP_REPLACE(b.range_raw, '[^0-9.]', ''), '') AS UNSIGNED),
     CAST(NULLIF(REGEXP_REPLACE(b.efficiency, '[^0-9.]', ''), '') AS UNSIGNED),
@@ -210,29 +253,380 @@ SELECT
     CAST(NULLIF(REGEXP_REPLACE(b.towing,   '[^0-9.]', ''), '') AS UNSIGNED),
     CAST(NULLIF(REGEXP_REPLACE(b.boot_space,'[^0-9.]', ''), '') AS UNSIGNED),
     CAST(NULLIF(REGEXP_REPLACE(b.price_range,'[^0-9.]', ''), '') AS UNSIGNED),
-    CAST(
-        NULLIF(
-            REPLACE(REPLACE(REPLACE(REPLACE(b.price_raw, '£',''), ',', ''), ' ', ''), '*', ''),
-        '') AS UNSIGNED
+
+    -- Price in the market's currency: keep the digits only, so "£44,990*",
+    -- "€ 52.990" and "52 990 €" all parse; then converted to GBP
+    mk.currency,
+    CAST(NULLIF(REGEXP_REPLACE(b.price_raw, '[^0-9]', ''), '') AS UNSIGNED) AS price_local,
+    ROUND(
+        CAST(NULLIF(REGEXP_REPLACE(b.price_raw, '[^0-9]', ''), '') AS UNSIGNED) * mk.gbp_rate
     ) AS price_gbp
 
 FROM DataWarehouse_bronze.ev_specs_bronze b
-JOIN DataWarehouse_silver.silver_vehicle v
-    ON TRIM(v.model_name) = TRIM(b.model);
+JOIN DataWarehouse_silver.silver_bronze_map k
+    ON k.bronze_id = b.id
+    AND k.keep_spec = 1
+LEFT JOIN DataWarehouse_silver.silver_market mk
+    ON mk.market = b.market;
 """
 
-safe_execute(cursor, silver_specs_sql)
-conn.commit()
-
-cursor.execute("SELECT COUNT(*) FROM DataWarehouse_silver.silver_specs")
-log(f"Inserted {cursor.fetchone()[0]} spec rows.\n")
+# =====================================================
+# PARALLEL LOAD
+# =====================================================
+# Opt-in: EV_SILVER_WORKERS=N (default 1, the serial load) splits the two
+# heavy steps:
+#   - the dedupe pass runs in N processes on bronze cut at company
+#     boundaries (silver_dedupe.decide_parallel); ids are still assigned
+#     in one place, in bronze order
+#   - silver_vehicle and silver_specs are loaded as N INSERT ... SELECTs,
+#     one per vehicle_id hash partition, each on its own connection from a
+#     pool of the stage's own (PARTITION_POOL), so MySQL works on N cores
+#     instead of one and the partitions never wait on connections that
+#     this stage or a concurrent one (gold_views) holds in the shared pool
+# Every statement is the serial one plus a partition filter, and spec_id
+# comes from bronze, so the tables are identical to a serial load;
+# silver/bench_silver_parallel.py checks this.
+
+WORKERS_ENV = "EV_SILVER_WORKERS"
+DEFAULT_WORKERS = 1
+
+PARTITION_POOL = "silver_partitions"
+
+def silver_workers():
+    try:
+        return max(1, int(os.environ.get(WORKERS_ENV, DEFAULT_WORKERS)))
+    except ValueError:
+        return DEFAULT_WORKERS
+
+def partition_sql(sql, workers, part):
+    # Both loads select from silver_bronze_map k; a vehicle and all its
+    # specs fall into the same partition
+    return sql.rstrip().rstrip(";") + f"\nWHERE k.vehicle_id % {workers} = {part};"
+
+def run_partitioned(sql, step, workers, bulk):
+    # Runs the partitions concurrently, one connection each from the
+    # partition pool (created on first use with one connection per worker);
+    # returns the total row count
+    from concurrent.futures import ThreadPoolExecutor
+
+    pool_size = db.get_pool(PARTITION_POOL, size=workers).pool_size
+    threads = max(1, min(workers, pool_size))
+
+    def load_partition(part):
+        conn = db.connect(PARTITION_POOL)
+        try:
+            if bulk:
+                db.apply_bulk_session(conn)
+            cursor = conn.cursor()
+            safe_execute(cursor, partition_sql(sql, workers, part),
+                         step_name=f"{step} [{part + 1}/{workers}]")
+            rows = cursor.rowcount
+            conn.commit()
+            cursor.close()
+            return rows
+        finally:
+            conn.close()
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        return sum(pool.map(load_partition, range(workers)))
 
 # =====================================================
-# DONE
+# BULK MODE
 # =====================================================
+# Opt-in with EV_SILVER_BULK=1 (or EV_BULK_LOAD=1, which turns on bulk mode
+# for bronze and gold as well); by default the load is the checked one.
+# In bulk mode:
+#   - the session runs with foreign_key_checks / unique_checks off
+#     (db.apply_bulk_session)
+#   - the tables are created without their foreign keys, UNIQUE columns
+#     and secondary indexes (e.g. silver_manufacturer.manufacturer_name),
+#     so no FK lookup or secondary index update happens per inserted row;
+#     only the primary keys are maintained while loading.
+#     silver_dedupe_audit is kept across runs and keeps its index.
+#   - each table is loaded by one INSERT ... SELECT in one transaction
+#   - a verification pass then checks every FK and UNIQUE column, since
+#     neither was enforced while loading; the stage fails on violations
+#   - the indexes and FK constraints are then built once, in one ALTER
+#     TABLE per table; the resulting schema is the same as the checked DDL's
+
+BULK_ENV = "EV_SILVER_BULK"
+
+FOREIGN_KEY = re.compile(
+    r",\s*FOREIGN KEY \((\w+)\)\s*REFERENCES ([\w.]+)\((\w+)\)", re.IGNORECASE
+)
 
-cursor.close()
-conn.close()
+def bulk_enabled():
+    return os.environ.get(BULK_ENV, "0") == "1" or db.bulk_enabled()
+
+# "name VARCHAR(100) UNIQUE" and ", [UNIQUE] INDEX name (cols)"
+UNIQUE_COLUMN = re.compile(r"^(\s*(\w+)\s+[^,\n]*?)\s+UNIQUE\b", re.IGNORECASE | re.MULTILINE)
+SECONDARY_INDEX = re.compile(r",\s*(UNIQUE\s+)?(?:INDEX|KEY)\s+(\w+)\s*\(([^)]*)\)", re.IGNORECASE)
+
+def split_foreign_keys(ddl):
+    # (DDL without its FOREIGN KEY clauses, [(column, parent, parent_column)])
+    return FOREIGN_KEY.sub("", ddl), FOREIGN_KEY.findall(ddl)
+
+def split_indexes(ddl):
+    # (DDL without its UNIQUE columns and secondary indexes, [(name,
+    # unique, columns)]); a column's UNIQUE index is named after the column,
+    # as CREATE TABLE names it
+    indexes = [(column, True, column) for _, column in UNIQUE_COLUMN.findall(ddl)]
+    indexes += [(name, bool(unique), columns.strip())
+                for unique, name, columns in SECONDARY_INDEX.findall(ddl)]
+    ddl = UNIQUE_COLUMN.sub(r"\1", ddl)
+    return SECONDARY_INDEX.sub("", ddl), indexes
+
+def table_name(ddl):
+    return re.search(r"CREATE TABLE ([\w.]+)", ddl, re.IGNORECASE).group(1)
+
+def add_constraints_sql(table, indexes, fks):
+    # Index named after the column, as CREATE TABLE names an FK's index
+    clauses = []
+    for name, unique, columns in indexes:
+        clauses.append(f"ADD {'UNIQUE ' if unique else ''}INDEX {name} ({columns})")
+    for column, parent, parent_column in fks:
+        clauses.append(f"ADD INDEX {column} ({column})")
+        clauses.append(f"ADD FOREIGN KEY ({column}) REFERENCES {parent}({parent_column})")
+    return f"ALTER TABLE {table} " + ", ".join(clauses) + ";"
+
+def orphans_sql(table, column, parent, parent_column):
+    return (f"SELECT COUNT(*) FROM {table} c LEFT JOIN {parent} p "
+            f"ON p.{parent_column} = c.{column} "
+            f"WHERE c.{column} IS NOT NULL AND p.{parent_column} IS NULL;")
+
+def duplicates_sql(table, columns):
+    # Rows with a NULL in any of the columns never collide in a UNIQUE index
+    not_null = " AND ".join(f"{c.strip()} IS NOT NULL" for c in columns.split(","))
+    return (f"SELECT COUNT(*) FROM (SELECT {columns} FROM {table} WHERE {not_null} "
+            f"GROUP BY {columns} HAVING COUNT(*) > 1) d;")
+
+def verify(cursor, foreign_keys, indexes):
+    problems = []
+    for table, fks in foreign_keys.items():
+        for column, parent, parent_column in fks:
+            cursor.execute(orphans_sql(table, column, parent, parent_column))
+            orphans = cursor.fetchone()[0]
+            if orphans:
+                problems.append(f"{table}.{column}: {orphans} rows without a {parent} parent")
+    for table, table_indexes in indexes.items():
+        for _, unique, columns in table_indexes:
+            if not unique:
+                continue
+            cursor.execute(duplicates_sql(table, columns))
+            duplicates = cursor.fetchone()[0]
+            if duplicates:
+                problems.append(f"{table}.{columns}: {duplicates} duplicated values")
+    return problems
 
-log("Silver ETL Finished.")
+# =====================================================
+# STAGE ENTRY POINT
+# =====================================================
 
+def run(ctx=None):
+    ctx = get_context(ctx)
+    pipeline_log.configure(ctx, "silver_load", "silver_layer")
+
+    # =====================================================
+    # MYSQL
+    # =====================================================
+
+    log("Starting Silver Layer ETL...")
+
+    bulk = bulk_enabled()
+    conn = db.connect()
+    if bulk:
+        bulk_settings = db.apply_bulk_session(conn)
+        log(f"Bulk mode: session settings applied: {', '.join(bulk_settings) or 'none'}")
+    cursor = conn.cursor()
+
+    # =====================================================
+    # KEY CACHE: CURRENT DIMENSIONS
+    # =====================================================
+    # Read before the tables are dropped, so unchanged manufacturers and
+    # vehicles keep their ids
+
+    safe_execute(cursor, "CREATE DATABASE IF NOT EXISTS DataWarehouse_silver;")
+    cursor.execute("""
+    SELECT table_name
+    FROM information_schema.tables
+    WHERE table_schema = 'DataWarehouse_silver';
+    """)
+    existing = {r[0].lower() for r in cursor.fetchall()}
+
+    keys = silver_keys.SilverKeys()
+    if {"silver_manufacturer", "silver_vehicle"} <= existing:
+        keys.load(cursor)
+    log(f"Key cache: {keys.manufacturers.loaded} manufacturers and "
+        f"{keys.vehicles.loaded} vehicles loaded from the current silver.")
+
+    # =====================================================
+    # PREP SCHEMA
+    # =====================================================
+    log("Preparing schema: DataWarehouse_silver")
+
+    safe_execute(cursor, "DROP TABLE IF EXISTS DataWarehouse_silver.silver_specs;")
+    safe_execute(cursor, "DROP TABLE IF EXISTS DataWarehouse_silver.silver_vehicle;")
+    safe_execute(cursor, "DROP TABLE IF EXISTS DataWarehouse_silver.silver_bronze_map;")
+    safe_execute(cursor, "DROP TABLE IF EXISTS DataWarehouse_silver.silver_manufacturer;")
+    safe_execute(cursor, "DROP TABLE IF EXISTS DataWarehouse_silver.silver_market;")
+    safe_execute(cursor, "DROP TABLE IF EXISTS DataWarehouse_silver.silver_company_key;")
+    conn.commit()
+
+    log("Creating Silver tables...")
+
+    # table -> foreign keys / indexes still to be added after the load
+    # (bulk mode)
+    deferred_fks, deferred_indexes = {}, {}
+    for ddl in (silver_market_ddl, silver_manufacturer_ddl, silver_company_key_ddl,
+                silver_bronze_map_ddl, silver_dedupe_audit_ddl, silver_vehicle_ddl,
+                silver_specs_ddl):
+        # Tables kept across runs (IF NOT EXISTS) already have their indexes
+        if bulk and "IF NOT EXISTS" not in ddl:
+            ddl, fks = split_foreign_keys(ddl)
+            ddl, indexes = split_indexes(ddl)
+            if fks:
+                deferred_fks[table_name(ddl)] = fks
+            if indexes:
+                deferred_indexes[table_name(ddl)] = indexes
+        safe_execute(cursor, ddl)
+
+    conn.commit()
+
+    log("Tables created.\n")
+
+    # =====================================================
+    # LOAD MARKETS
+    # =====================================================
+
+    log("Loading: silver_market")
+
+    safe_executemany(cursor, silver_market_sql, markets.market_rows(), step="INSERT silver_market")
+    conn.commit()
+
+    log(f"Inserted {len(markets.market_rows())} markets.\n")
+
+    # =====================================================
+    # DEDUPLICATE BRONZE + ASSIGN KEYS
+    # =====================================================
+
+    workers = silver_workers()
+
+    safe_execute(cursor, silver_dedupe.SELECT_COMPANIES_SQL, step_name="SELECT bronze companies")
+    company_rows = silver_dedupe.company_key_rows([r[0] for r in cursor.fetchall()])
+    safe_executemany(cursor, silver_company_key_sql, company_rows, step="INSERT silver_company_key")
+    conn.commit()
+
+    log(f"Deduplicating bronze rows -> silver_bronze_map ({workers} worker(s), "
+        f"{len(company_rows)} company names)")
+
+    # Bronze is streamed through a second connection in fetchmany batches
+    # while this one writes the decisions, so memory stays flat
+    safe_execute(cursor, "DELETE FROM DataWarehouse_silver.silver_dedupe_audit WHERE run_id = %s;",
+                 (ctx.run_id,), step_name="CLEAR DEDUPE AUDIT")
+    read_conn = db.connect()
+    try:
+        read_cursor = read_conn.cursor()
+        read_cursor.execute(silver_dedupe.SELECT_BRONZE_SQL)
+        batches = iter(lambda: read_cursor.fetchmany(silver_dedupe.FETCH_ROWS), [])
+        if workers > 1:
+            counts = {}
+            decided = silver_dedupe.decide_parallel(batches, keys, ctx.run_id, workers, counts)
+        else:
+            deduper = silver_dedupe.Deduper()
+            counts = deduper.counts
+            decided = (silver_dedupe.decide(deduper, keys, batch, ctx.run_id) for batch in batches)
+        for map_rows, audit_rows in decided:
+            safe_executemany(cursor, silver_bronze_map_sql, map_rows, step="INSERT silver_bronze_map")
+            if audit_rows:
+                safe_executemany(cursor, silver_dedupe_audit_sql, audit_rows,
+                                 step="INSERT silver_dedupe_audit")
+        read_cursor.close()
+    finally:
+        read_conn.close()
+    conn.commit()
+
+    log(f"Dedupe: {counts['rows']} bronze rows -> {counts['vehicles']} vehicles "
+        f"({counts['exact_key']} exact-key and {counts['fuzzy_name']} fuzzy-name merges, "
+        f"{counts['repeated']} repeated rows dropped).")
+    log(f"Keys: {keys.summary()}.\n")
+
+    # =====================================================
+    # LOAD MANUFACTURER
+    # =====================================================
+
+    log("Loading: silver_manufacturer")
+
+    manufacturer_rows = keys.manufacturer_rows()
+    safe_executemany(cursor, silver_manufacturer_sql, manufacturer_rows,
+                     step="INSERT silver_manufacturer")
+    conn.commit()
+
+    log(f"Inserted {len(manufacturer_rows)} manufacturers.\n")
+
+    # =====================================================
+    # LOAD VEHICLE
+    # =====================================================
+
+    log("Loading: silver_vehicle")
+
+    if workers > 1:
+        run_partitioned(silver_vehicle_sql, "INSERT silver_vehicle", workers, bulk)
+    else:
+        safe_execute(cursor, silver_vehicle_sql)
+        conn.commit()
+
+    cursor.execute("SELECT COUNT(*) FROM DataWarehouse_silver.silver_vehicle")
+    log(f"Inserted {cursor.fetchone()[0]} vehicles.\n")
+
+    # =====================================================
+    # LOAD SILVER SPECS (CURRENCY-AWARE PRICE)
+    # =====================================================
+
+    log("Loading: silver_specs")
+
+    if workers > 1:
+        run_partitioned(silver_specs_sql, "INSERT silver_specs", workers, bulk)
+    else:
+        safe_execute(cursor, silver_specs_sql)
+        conn.commit()
+
+    cursor.execute("SELECT COUNT(*) FROM DataWarehouse_silver.silver_specs")
+    specs_count = cursor.fetchone()[0]
+    log(f"Inserted {specs_count} spec rows.\n")
+
+    # =====================================================
+    # BULK MODE: BUILD CONSTRAINTS + VERIFY
+    # =====================================================
+
+    if bulk:
+        # Verified first: a UNIQUE index cannot be built over duplicates, and
+        # the report names every problem instead of the first ALTER error
+        log("Verifying referential integrity and uniqueness...")
+        problems = verify(cursor, deferred_fks, deferred_indexes)
+        if problems:
+            for problem in problems:
+                log(f"INTEGRITY VIOLATION: {problem}", pipeline_log.ERROR)
+            cursor.close()
+            conn.close()
+            raise RuntimeError(f"Silver integrity check failed ({len(problems)} problem(s))")
+        log("Integrity verified.")
+
+        log("Building indexes and foreign keys...")
+        for table in sorted(set(deferred_fks) | set(deferred_indexes)):
+            safe_execute(cursor, add_constraints_sql(table, deferred_indexes.get(table, []),
+                                                     deferred_fks.get(table, [])),
+                         step_name=f"ADD INDEXES {table}")
+        log("Indexes and foreign keys built.\n")
+
+    # =====================================================
+    # DONE
+    # =====================================================
+
+    cursor.close()
+    conn.close()
+
+    log("Silver ETL Finished.")
+    return specs_count
+
+if __name__ == "__main__":
+    metrics.run_stage(get_context(), logger.stage, run)